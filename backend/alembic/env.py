@@ -89,6 +89,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection, target_metadata=target_metadata, render_as_batch=True,
+            # リビジョンごとにコミットする（CREATE INDEX CONCURRENTLY を autocommit で実行するため、app/db/migration_ops.py）
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,27 @@
+"""add (highlight_id, page_num) index to highlight_rects
+
+Revision ID: a4d8e2c6f9b5
+Revises: f1c6a9e3b7d4
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from app.db.migration_ops import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2c6f9b5'
+down_revision: Union[str, None] = 'f1c6a9e3b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # highlights(document_file_id, ...) で絞ったハイライトごとに、指定ページの矩形の有無をこのインデックスで確かめる
+    create_index_concurrently('ix_highlight_rects_highlight_id_page_num', 'highlight_rects',
+                              ['highlight_id', 'page_num'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_highlight_rects_highlight_id_page_num', 'highlight_rects')
@@ -0,0 +1,54 @@
+"""add llm_jobs table
+
+Revision ID: b3e91c7d2a10
+Revises: f4b6c1234567
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e91c7d2a10'
+down_revision: Union[str, None] = 'f4b6c1234567'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('llm_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('job_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default='queued', nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('locked_by', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('llm_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_llm_jobs_document_id'), ['document_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_llm_jobs_user_id'), ['user_id'], unique=False)
+        batch_op.create_index('ix_llm_jobs_status_created_at', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('llm_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_llm_jobs_status_created_at')
+        batch_op.drop_index(batch_op.f('ix_llm_jobs_user_id'))
+        batch_op.drop_index(batch_op.f('ix_llm_jobs_document_id'))
+
+    op.drop_table('llm_jobs')
@@ -0,0 +1,42 @@
+"""add packed rect columns to highlights
+
+Revision ID: b7e3f9a1c5d8
+Revises: a4d8e2c6f9b5
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f9a1c5d8'
+down_revision: Union[str, None] = 'a4d8e2c6f9b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既定値なしの NULL 許容列の追加はテーブルを書き換えない
+    # 既存の矩形の移し替えは app/scripts/pack_highlight_rects.py で行う（NULL の間は highlight_rects から読む）
+    op.add_column('highlights', sa.Column('rect_pages', postgresql.ARRAY(sa.SmallInteger()), nullable=True))
+    op.add_column('highlights', sa.Column('rect_coords', postgresql.ARRAY(sa.REAL()), nullable=True))
+    op.add_column('highlights', sa.Column('rect_types', postgresql.ARRAY(sa.String()), nullable=True))
+
+
+def downgrade() -> None:
+    # packed 形式の矩形は列と一緒に失われるため、残っている間は中止する
+    bind = op.get_bind()
+    packed = bind.execute(sa.text("SELECT 1 FROM highlights WHERE rect_pages IS NOT NULL LIMIT 1")).first()
+    if packed is not None:
+        raise RuntimeError(
+            "packed 形式の矩形が残っています。先に python app/scripts/pack_highlight_rects.py --unpack で"
+            " highlight_rects に戻してから downgrade してください"
+        )
+
+    op.drop_column('highlights', 'rect_types')
+    op.drop_column('highlights', 'rect_coords')
+    op.drop_column('highlights', 'rect_pages')
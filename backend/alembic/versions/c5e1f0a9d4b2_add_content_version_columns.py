@@ -0,0 +1,29 @@
+"""add content_version to documents and document_files
+
+Revision ID: c5e1f0a9d4b2
+Revises: b3e91c7d2a10
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1f0a9d4b2'
+down_revision: Union[str, None] = 'b3e91c7d2a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 定数の既定値を持つ列の追加は PostgreSQL 11 以降ではテーブルを書き換えない
+    op.add_column('document_files', sa.Column('content_version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('documents', sa.Column('content_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'content_version')
+    op.drop_column('document_files', 'content_version')
@@ -0,0 +1,36 @@
+"""add composite indexes for keyset pagination
+
+Revision ID: d2a7c4e8b1f3
+Revises: c5e1f0a9d4b2
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from app.db.migration_ops import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c4e8b1f3'
+down_revision: Union[str, None] = 'c5e1f0a9d4b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (絞り込み列, created_at, id) の順で、キーセットの条件と並び順をインデックスだけで解決する
+    create_index_concurrently('ix_documents_user_id_created_at_id', 'documents',
+                              ['user_id', 'created_at', 'id'], postgresql_where='deleted_at IS NULL')
+    create_index_concurrently('ix_highlights_document_file_id_created_at_id', 'highlights',
+                              ['document_file_id', 'created_at', 'id'])
+    create_index_concurrently('ix_comments_highlight_id_created_at_id', 'comments',
+                              ['highlight_id', 'created_at', 'id'])
+    create_index_concurrently('ix_comments_author_created_at_id', 'comments',
+                              ['author', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_comments_author_created_at_id', 'comments')
+    drop_index_concurrently('ix_comments_highlight_id_created_at_id', 'comments')
+    drop_index_concurrently('ix_highlights_document_file_id_created_at_id', 'highlights')
+    drop_index_concurrently('ix_documents_user_id_created_at_id', 'documents')
@@ -0,0 +1,32 @@
+"""convert document_formatted_texts.formatted_data to jsonb
+
+Revision ID: e8b3d5f2a6c1
+Revises: d2a7c4e8b1f3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3d5f2a6c1'
+down_revision: Union[str, None] = 'd2a7c4e8b1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 型変更はテーブルを書き換える（ACCESS EXCLUSIVE ロック）。ドキュメント数分の行しかないため一度に変換する
+    op.alter_column('document_formatted_texts', 'formatted_data',
+                    type_=postgresql.JSONB(), existing_type=sa.JSON(),
+                    postgresql_using='formatted_data::jsonb')
+
+
+def downgrade() -> None:
+    op.alter_column('document_formatted_texts', 'formatted_data',
+                    type_=sa.JSON(), existing_type=postgresql.JSONB(),
+                    postgresql_using='formatted_data::json')
@@ -2,7 +2,8 @@
 
 from fastapi import APIRouter
 
-from app.api.endpoints import auth, users, documents, document_files, highlights, comments, openai, s3, logs
+from app.api.endpoints import auth, users, documents, document_files, highlights, comments, openai, s3, logs, llm_jobs, search, debug
+from app.core.query_profiler import QUERY_PROFILER_DEBUG_ENDPOINT
 
 api_router = APIRouter()
 api_router.include_router(auth.router, tags=["auth"], prefix="/api/v1/auth")
@@ -13,4 +14,10 @@ api_router.include_router(highlights.router, tags=["highlights"], prefix="/api/v
 api_router.include_router(comments.router, tags=["comments"], prefix="/api/v1/comments")
 api_router.include_router(openai.router, tags=["openai"], prefix="/api/v1/openai")
 api_router.include_router(s3.router, tags=["s3"], prefix="/api/v1/s3")
-api_router.include_router(logs.router, tags=["logs"], prefix="/api/v1/logs")
\ No newline at end of file
+api_router.include_router(logs.router, tags=["logs"], prefix="/api/v1/logs")
+api_router.include_router(llm_jobs.router, tags=["llm-jobs"], prefix="/api/v1/llm-jobs")
+api_router.include_router(search.router, tags=["search"], prefix="/api/v1/search")
+
+# デバッグ用（QUERY_PROFILER_DEBUG_ENDPOINT=true のときのみ公開）
+if QUERY_PROFILER_DEBUG_ENDPOINT:
+    api_router.include_router(debug.router, tags=["debug"], prefix="/api/v1/debug")
@@ -1,14 +1,21 @@
 from typing import Annotated, Generator
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
 from app.db.base import get_session
 from app.core.security import oauth2_scheme, decode_access_token
+from app.core.user_cache import user_cache
 from app.models.users import User
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+# アプリの前にある信頼できるプロキシの段数（Render のロードバランサー = 1）。0 なら X-Forwarded-For を使わない
+# 各プロキシは X-Forwarded-For の末尾に接続元を追加するため、末尾からこの段数目が実際のクライアントになる
+# （それより前の値はクライアントが自由に付けられるため信用しない）
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "1"))
+
 # ----------------------------------------------------
 # データベースセッションを取得し、クローズする
 # ----------------------------------------------------
@@ -23,34 +30,62 @@ def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     session: Session = Depends(get_db),
 ) -> User:
-    """トークンからユーザーを取得"""
+    """トークンからユーザーを取得（キャッシュにあればDBを参照しない）"""
     try:
-        logger.info("Starting get_current_user")
         payload = decode_access_token(token)
         
         if not payload:
-            logger.error("Payload is None")
             raise HTTPException(status_code=401, detail="Invalid token")
         
         user_id = payload.get("user_id")
-        logger.info(f"Extracted user_id: {user_id}")
         
         if user_id is None:
-            logger.error("user_id is None")
+            logger.warning("user_id is missing in token payload")
             raise HTTPException(status_code=401, detail="Invalid token payload")
         
+        user = user_cache.get(user_id)
+        if user:
+            return user
+        
         user = session.exec(
             select(User).where(User.id == user_id)
         ).first()
         
         if not user:
-            logger.error(f"User not found for user_id: {user_id}")
+            logger.warning(f"User not found for user_id: {user_id}")
             raise HTTPException(status_code=404, detail="User not found")
         
-        logger.info(f"Successfully retrieved user: {user.email}")
+        user_cache.set(user)
+        logger.debug(f"Resolved user {user_id} from database")
         return user
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error in get_current_user: {e}", exc_info=True)
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+def get_client_ip(request: Request) -> str:
+    """クライアントのIPアドレス（信頼できるプロキシが付けた X-Forwarded-For から取得）"""
+    if TRUSTED_PROXY_COUNT > 0:
+        forwarded = [
+            address.strip()
+            for value in request.headers.getlist("x-forwarded-for")
+            for address in value.split(",")
+            if address.strip()
+        ]
+        if len(forwarded) >= TRUSTED_PROXY_COUNT:
+            return forwarded[-TRUSTED_PROXY_COUNT]
+    return request.client.host if request.client else "unknown"
+
+def get_rate_limit_key(request: Request) -> str:
+    """
+    レート制限用のキーを取得
+    - 有効なアクセストークンがあれば user_id 単位
+    - なければクライアントIPアドレス単位（プロキシ経由の場合は X-Forwarded-For のアドレス）
+    """
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = decode_access_token(authorization[7:].strip())
+        if payload and payload.get("user_id") is not None:
+            return f"user:{payload['user_id']}"
+    return f"ip:{get_client_ip(request)}"
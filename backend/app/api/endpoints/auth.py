@@ -3,8 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from sqlmodel import Session
-from app.crud.user import create_user, authenticate_user_by_email
-from app.core.security import create_access_token, create_refresh_token, get_password_hash
+from app.crud.user import create_user_async, authenticate_user_by_email_async
+from app.core.security import create_access_token, create_refresh_token
 from app.schemas.auth import Token, UserSignupSchema, LoginRequest, SelectDocumentRequest
 from app.api.deps import get_db, get_current_user
 from app.models import User
@@ -22,12 +22,15 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/signup", response_model=Token, status_code=status.HTTP_201_CREATED)
-def signup(
+async def signup(
     user_in: UserSignupSchema,
     session: Session = Depends(get_db),
     response: Response = None
 ):
-    """新規ユーザー作成 + JWT発行"""
+    """
+    新規ユーザー作成 + JWT発行
+    bcryptは専用の実行プールで計算し、DBアクセスはスレッドプールで実行する
+    """
     try:
         # バリデーション実行
         validate_email(user_in.email)
@@ -48,7 +51,7 @@ def signup(
         )
 
     try:
-        db_user = create_user(session=session, user_in=user_in)
+        db_user = await create_user_async(session=session, user_in=user_in)
         logger.info(f"User {db_user.email} created successfully with ID {db_user.id}")
     except HTTPException as e:
         # create_user内でHTTPExceptionが発生した場合はそのまま再送出
@@ -109,12 +112,15 @@ def signup(
         )
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     login_req: LoginRequest,
     session: Session = Depends(get_db),
     response: Response = None
 ):
-    """メールアドレス + パスワードでJWTを発行"""
+    """
+    メールアドレス + パスワードでJWTを発行
+    bcryptは専用の実行プールで計算し、DBアクセスはスレッドプールで実行する
+    """
     logger.info(f"Attempting to log in user: {login_req.email}")
 
     # 入力バリデーション
@@ -133,7 +139,7 @@ def login_for_access_token(
         )
 
     try:
-        user = authenticate_user_by_email(session, login_req.email, login_req.password)
+        user = await authenticate_user_by_email_async(session, login_req.email, login_req.password)
         
         if not user:
             logger.warning(f"Authentication failed for user: {login_req.email}")
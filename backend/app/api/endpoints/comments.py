@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
 from sqlmodel import Session
 from typing import List, Optional
 from app.db.base import get_session
+from app.api.deps import get_current_user
+from app.models import User
 from app.crud import comment as crud_comment
 from app.crud import llm_comment_metadata as crud_llm_metadata
+from app.crud import content_version as crud_version
 from app.schemas.comment import CommentCreate, CommentUpdate, CommentRead
 from app.schemas.llm_comment_metadata import LLMCommentMetadataCreate
 from app.utils.constants import LLM_AUTHOR_LOWER, COMMENT_PURPOSE
+from app.core.serialization import model_list_response
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, set_next_cursor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -53,6 +59,9 @@ def create_comment_endpoint(
                 LLMCommentMetadataCreate(suggestion_reason=comment_in.suggestion_reason)
             )
             logger.info(f"LLM metadata saved: comment_id={comment.id}, suggestion_reason={comment_in.suggestion_reason[:50]}...")
+
+        if comment.highlight_id is not None:
+            crud_version.bump_file_version_for_highlight(session, comment.highlight_id)
         
         return comment
     except HTTPException:
@@ -73,9 +82,10 @@ def create_comment_endpoint(
 @router.get("/highlight/{highlight_id}", response_model=List[CommentRead])
 def read_comments_by_highlight(
     highlight_id: int, 
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    if_none_match: Optional[str] = Header(default=None)
 ):
-    """ハイライトに紐づくコメント一覧を取得"""
+    """ハイライトに紐づくコメント一覧を取得（ファイルの版数による ETag / 304 に対応）"""
     try:
         if highlight_id <= 0:
             raise HTTPException(
@@ -83,10 +93,16 @@ def read_comments_by_highlight(
                 detail="無効なハイライトIDです"
             )
 
+        version = crud_version.get_file_version_for_highlight(session, highlight_id)
+        etag = make_etag("highlight", highlight_id, version) if version is not None else None
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
         logger.info(f"Fetching comments for highlight_id={highlight_id}")
         comments = crud_comment.get_comments_by_highlight(session, highlight_id)
         logger.info(f"Found {len(comments)} comments for highlight_id={highlight_id}")
-        return comments
+        response = model_list_response(CommentRead, comments)
+        return set_etag(response, etag) if etag else response
     except HTTPException:
         raise
     except Exception as e:
@@ -96,6 +112,71 @@ def read_comments_by_highlight(
             detail="コメント取得中にエラーが発生しました"
         )
 
+@router.get("/file/{file_id}", response_model=List[CommentRead])
+def read_comments_by_file(
+    file_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(default=None, description="前のページの X-Next-Cursor"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    ファイル内のコメントを作成順に取得（続きがある場合は X-Next-Cursor ヘッダーを付ける）
+    ログインユーザーのドキュメントのファイルでなければ空を返す
+    """
+    try:
+        if file_id <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="無効なファイルIDです"
+            )
+        comments, next_cursor = crud_comment.get_comments_page_by_file(
+            session, file_id, current_user.id, cursor, limit
+        )
+        return set_next_cursor(model_list_response(CommentRead, comments), next_cursor)
+    except HTTPException:
+        raise
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無効なカーソルです"
+        )
+    except Exception as e:
+        logger.error(f"Error fetching comments for file {file_id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="コメント取得中にエラーが発生しました"
+        )
+
+@router.get("/author/{author}", response_model=List[CommentRead])
+def read_comments_by_author(
+    author: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(default=None, description="前のページの X-Next-Cursor"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    投稿者のコメントを作成順に取得（続きがある場合は X-Next-Cursor ヘッダーを付ける）
+    ログインユーザーのドキュメントに付いたコメントだけを返す
+    """
+    try:
+        comments, next_cursor = crud_comment.get_comments_page_by_user(
+            session, author, current_user.id, cursor, limit
+        )
+        return set_next_cursor(model_list_response(CommentRead, comments), next_cursor)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無効なカーソルです"
+        )
+    except Exception as e:
+        logger.error(f"Error fetching comments for author {author}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="コメント取得中にエラーが発生しました"
+        )
+
 @router.get("/{comment_id}", response_model=CommentRead)
 def read_comment_endpoint(
     comment_id: int, 
@@ -169,6 +250,7 @@ def update_comment_endpoint(
             )
         
         updated_comment = crud_comment.update_comment(session, comment, comment_in)
+        crud_version.bump_file_version_for_comment(session, comment_id)
         logger.info(f"Comment updated successfully: ID={comment_id}")
         return updated_comment
     except HTTPException:
@@ -223,6 +305,7 @@ def delete_comment_endpoint(
                 detail="LLM子コメントの削除理由を入力してください"
             )
 
+        highlight_id = comment.highlight_id
         try:
             crud_comment.delete_comment(session, comment_id, reason)
         except ValueError as e:
@@ -232,6 +315,8 @@ def delete_comment_endpoint(
                 detail=str(e)
             )
 
+        if highlight_id is not None:
+            crud_version.bump_file_version_for_highlight(session, highlight_id)
         logger.info(f"Comment deleted (soft/hard) successfully: ID={comment_id}")
         return None
     except HTTPException:
@@ -269,6 +354,7 @@ def restore_latest_soft_deleted_llm_endpoint(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="復元可能なLLMコメントがありません"
             )
+        crud_version.bump_file_version_for_comment(session, restored.id)
         return restored
     except HTTPException:
         raise
@@ -316,6 +402,8 @@ def create_or_update_llm_metadata_endpoint(
             session, comment_id, metadata_in
         )
         
+        # 削除理由の設定はコメント一覧（ソフトデリート済みを除外）を変える
+        crud_version.bump_file_version_for_comment(session, comment_id)
         logger.info(f"LLM metadata saved: comment_id={comment_id}")
         return {
             "id": metadata.id,
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from app.core.query_profiler import query_stats
+
+router = APIRouter()
+
+@router.get("/queries")
+def read_query_stats():
+    """エンドポイント別のクエリ数・時間と、直近のリクエスト（N+1の疑いを含む）を返す"""
+    return query_stats.snapshot()
+
+@router.delete("/queries")
+def reset_query_stats():
+    """クエリ計測結果をリセット"""
+    query_stats.reset()
+    return {"status": "success"}
@@ -7,6 +7,7 @@ from app.models import User, DocumentFile
 from app.schemas.document_file import DocumentFileCreate, DocumentFileRead
 from app.crud import document_file as crud_document_file
 from app.crud import document as crud_document
+from app.core.serialization import model_list_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -95,7 +96,7 @@ def read_files_by_document_endpoint(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
     document_id: int
-) -> List[DocumentFile]:
+):
     """
     ドキュメントIDに紐づくファイル一覧を取得（作成日時の降順）
     """
@@ -127,7 +128,7 @@ def read_files_by_document_endpoint(
         # ファイル一覧を取得（作成日時の降順でソート）
         files = crud_document_file.get_document_files(session, document_id)
         logger.info(f"Found {len(files)} files for document {document_id}")
-        return files
+        return model_list_response(DocumentFileRead, files)
         
     except HTTPException:
         raise
@@ -1,20 +1,27 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, delete
-from typing import List
+from typing import List, Optional
 from sqlalchemy.exc import IntegrityError
 from app.db.base import get_session
 from app.crud import document as crud_document
 from app.crud import document_file as crud_document_file
 from app.crud import document_formatted_text as crud_formatted_text
+from app.crud import content_version as crud_version
 from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentRead, CompletionStageUpdate
 from app.schemas.document_file import DocumentFileRead
-from app.schemas.document_formatted_text import DocumentFormattedTextCreate, DocumentFormattedTextRead, DocumentFormattedTextUpdate
+from app.schemas.document_formatted_text import (
+    DocumentFormattedTextCreate, DocumentFormattedTextRead, DocumentFormattedTextUpdate,
+    FormattedTextChunksRead, FormattedTextChunkPatch, FormattedTextChunkPatchResult,
+)
 from app.api.deps import get_current_user
-from app.models import User, DocumentFile, Highlight, HighlightRect, Comment, DocumentFormattedText, LLMCommentMetadata
-from app.services.pdf_export_service import PDFExportService
+from app.models import User, DocumentFile, Highlight, HighlightRect, Comment, DocumentFormattedText, LLMCommentMetadata, LLMJob
+from app.core.metrics import PDF_EXPORT_DURATION, observe_duration
+from app.core.serialization import model_list_response
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
 from app.utils.s3 import fetch_pdf_bytes, delete_s3_files
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, set_next_cursor
 
 router = APIRouter()
 
@@ -33,13 +40,23 @@ if not logger.handlers:
 def read_documents(
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(default=None, description="前のページの X-Next-Cursor"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
 ):
-    """ユーザーのドキュメント一覧を取得"""
+    """
+    ユーザーのドキュメント一覧を新しい順に取得
+    続きがある場合は X-Next-Cursor ヘッダーのカーソルを cursor に渡して次のページを取得する
+    """
     try:
         logger.info(f"[GET /documents] User {current_user.id} requesting documents")
-        documents = crud_document.get_documents_by_user(session, current_user.id)
+        documents, next_cursor = crud_document.get_documents_page_by_user(session, current_user.id, cursor, limit)
         logger.info(f"[GET /documents] Returning {len(documents)} documents")
-        return documents
+        return set_next_cursor(model_list_response(DocumentRead, documents), next_cursor)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無効なカーソルです"
+        )
     except Exception as e:
         logger.error(f"[GET /documents] Error fetching documents for user {current_user.id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -159,8 +176,12 @@ async def export_pdf_with_comments(
 
         # PDFにコメントを追加
         try:
+            # reportlab / PyPDF2 の import は重いため、エクスポート時に行う
+            from app.services.pdf_export_service import PDFExportService
+
             service = PDFExportService(db)
-            output_pdf = service.export_pdf_with_comments(pdf_bytes, file_id)
+            with observe_duration(PDF_EXPORT_DURATION):
+                output_pdf = service.export_pdf_with_comments(pdf_bytes, file_id)
             size = output_pdf.getbuffer().nbytes
             logger.info(f"[Export][Backend] Export done. bytes={size}, filename={document_file.file_name}")
         except Exception as e:
@@ -500,6 +521,11 @@ def delete_document(
             logger.info(f"[DELETE /documents/{document_id}] Deleting formatted text")
             delete_formatted_text_stmt = delete(DocumentFormattedText).where(DocumentFormattedText.document_id == document_id)
             session.exec(delete_formatted_text_stmt)
+
+            # ドキュメントのLLMジョブ（分析結果）を削除
+            logger.info(f"[DELETE /documents/{document_id}] Deleting LLM jobs")
+            delete_llm_jobs_stmt = delete(LLMJob).where(LLMJob.document_id == document_id)
+            session.exec(delete_llm_jobs_stmt)
             
             session.commit()
             logger.info(f"[DELETE /documents/{document_id}] Related data deleted successfully")
@@ -598,7 +624,7 @@ def list_document_files_for_document(
 
         files = crud_document_file.get_document_files(session, document_id)
         logger.info(f"[GET /documents/{document_id}/document-files] Found {len(files)} files")
-        return files
+        return model_list_response(DocumentFileRead, files)
 
     except HTTPException:
         raise
@@ -656,6 +682,8 @@ def save_formatted_text(
             # 新規作成
             logger.info(f"[POST /documents/{document_id}/formatted-text] Creating new formatted text")
             formatted_text = crud_formatted_text.create_formatted_text(session, formatted_text_in)
+
+        crud_version.bump_document_version(session, document_id)
         
         logger.info(f"[POST /documents/{document_id}/formatted-text] Formatted text saved successfully")
         return formatted_text
@@ -673,10 +701,15 @@ def save_formatted_text(
 @router.get("/{document_id}/formatted-text", response_model=DocumentFormattedTextRead)
 def get_formatted_text(
     document_id: int,
+    response: Response,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(default=None),
 ):
-    """フォーマット済みテキストを取得"""
+    """
+    フォーマット済みテキストを取得
+    ドキュメントの版数から ETag を返し、If-None-Match が一致すれば本文を取得せずに 304 を返す
+    """
     try:
         if document_id <= 0:
             raise HTTPException(
@@ -699,6 +732,10 @@ def get_formatted_text(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="このドキュメントへのアクセス権限がありません"
             )
+
+        etag = make_etag("formatted-text", document_id, document.content_version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
         
         formatted_text = crud_formatted_text.get_formatted_text_by_document(session, document_id)
         
@@ -709,6 +746,7 @@ def get_formatted_text(
             )
         
         logger.info(f"[GET /documents/{document_id}/formatted-text] Formatted text found")
+        set_etag(response, etag)
         return formatted_text
     
     except HTTPException:
@@ -720,3 +758,114 @@ def get_formatted_text(
             detail="フォーマット済みテキストの取得中にエラーが発生しました"
         )
 
+@router.get("/{document_id}/formatted-text/chunks", response_model=FormattedTextChunksRead)
+def get_formatted_text_chunks(
+    document_id: int,
+    response: Response,
+    start: int = Query(default=0, ge=0, description="先頭チャンクの位置（0始まり）"),
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """
+    フォーマット済みテキストのチャンク配列のうち [start, start + limit) だけを取得
+    本文全体を読み込まずにDB側で切り出す。ETag は formatted-text と同じくドキュメントの版数から作る
+    """
+    try:
+        if document_id <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="無効なドキュメントIDです"
+            )
+
+        document = crud_document.get_document(session, document_id)
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="ドキュメントが見つかりません"
+            )
+
+        if document.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="このドキュメントへのアクセス権限がありません"
+            )
+
+        etag = make_etag("formatted-text", document_id, document.content_version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        chunk_range = crud_formatted_text.get_chunk_range(session, document_id, start, limit)
+        if chunk_range is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="フォーマット済みテキストが見つかりません"
+            )
+
+        total, chunks = chunk_range
+        set_etag(response, etag)
+        return FormattedTextChunksRead(document_id=document_id, total=total, start=start, chunks=chunks)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[GET /documents/{document_id}/formatted-text/chunks] Error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="フォーマット済みテキストの取得中にエラーが発生しました"
+        )
+
+@router.patch("/{document_id}/formatted-text", response_model=FormattedTextChunkPatchResult)
+def patch_formatted_text(
+    document_id: int,
+    patch_in: FormattedTextChunkPatch,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    フォーマット済みテキストをチャンク単位で更新（id が一致するチャンクの text を置き換える）
+    変更したチャンクだけを送受信する。1つでも存在しない id があれば何も更新せず 404 を返す
+    """
+    try:
+        if document_id <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="無効なドキュメントIDです"
+            )
+
+        document = crud_document.get_document(session, document_id)
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="ドキュメントが見つかりません"
+            )
+
+        if document.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="このドキュメントへのアクセス権限がありません"
+            )
+
+        logger.info(f"[PATCH /documents/{document_id}/formatted-text] Updating {len(patch_in.chunks)} chunks")
+        changes = [chunk.model_dump() for chunk in patch_in.chunks]
+        updated, missing = crud_formatted_text.patch_chunks(session, document_id, changes)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"チャンクが見つかりません: {missing}"
+            )
+
+        crud_version.bump_document_version(session, document_id)
+        return FormattedTextChunkPatchResult(document_id=document_id, chunks=updated)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[PATCH /documents/{document_id}/formatted-text] Error: {str(e)}", exc_info=True)
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="フォーマット済みテキストの保存中にエラーが発生しました"
+        )
+
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 from app.db.base import get_session
 from pydantic import BaseModel
 import json
@@ -13,7 +13,12 @@ from app.schemas.llm_comment_metadata import LLMCommentMetadataCreate
 from app.schemas.highlight_rect import HighlightRectCreate
 from app.crud import highlight as crud_highlight
 from app.crud import highlight_rect as crud_highlight_rect
+from app.crud import content_version as crud_version
+from app.core.serialization import model_list_response
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
 from app.utils.constants import LLM_AUTHOR_LOWER, COMMENT_PURPOSE
+from app.utils.pagination import MAX_PAGE_SIZE, InvalidCursor, set_next_cursor
+from app.utils.validators import ValidationError, parse_bbox, parse_page_ranges
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
@@ -129,6 +134,7 @@ def create_highlight_with_memo(
         
         # 2. ハイライト矩形を作成
         logger.info(f"Creating {len(highlight_data.rects)} highlight rectangles...")
+        rects_in = []
         for idx, rect_data in enumerate(highlight_data.rects):
             # 使用するelement_typeを決定（トップレベル > rect個別 > デフォルト）
             final_element_type = highlight_data.element_type or rect_data.element_type or 'unknown'
@@ -145,16 +151,17 @@ def create_highlight_with_memo(
                 element_type=final_element_type
             )
             logger.info(f"Rect input data: {rect_in.model_dump()}")
-            
-            db_rect = crud_highlight_rect.create_highlight_rect(session, rect_in)
-            
-            if not db_rect or not db_rect.id:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"矩形データ #{idx + 1} の作成に失敗しました"
-                )
-            
-            logger.info(f"Rect created with ID: {db_rect.id}")
+            rects_in.append(rect_in)
+        
+        db_rects = crud_highlight_rect.create_highlight_rects(session, db_highlight, rects_in)
+        
+        if len(db_rects) != len(rects_in):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="矩形データの作成に失敗しました"
+            )
+        
+        logger.info(f"Rects created: {len(db_rects)}")
         
         # 3. ルートコメント(メモ)を作成
         logger.info("Creating root comment...")
@@ -188,10 +195,13 @@ def create_highlight_with_memo(
             logger.info(f"LLM metadata saved: comment_id={db_comment.id}, suggestion_reason={highlight_data.suggestion_reason[:50]}...")
 
         
+        # 一覧の ETag を更新（すべての書き込みの後）
+        crud_version.bump_file_version(session, db_highlight.document_file_id)
+
         # 4. 作成したハイライトと矩形を返す
         logger.info("Fetching created highlight and rects...")
         session.refresh(db_highlight)
-        rects = crud_highlight_rect.get_rects_by_highlight(session, db_highlight.id)
+        rects = crud_highlight_rect.get_rects_for_highlights(session, [db_highlight])[db_highlight.id]
         
         logger.info(f"Retrieved {len(rects)} rects for highlight {db_highlight.id}")
         
@@ -239,25 +249,55 @@ def create_highlight_with_memo(
 def get_highlights_by_file_endpoint(
     *,
     session: Session = Depends(get_session),
-    file_id: int
+    file_id: int,
+    cursor: Optional[str] = Query(default=None, description="前のページの X-Next-Cursor"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE, description="省略時は全件"),
+    pages: Optional[str] = Query(default=None, description="PDFのページ範囲（例: 3-5, 1,4-6）"),
+    bbox: Optional[str] = Query(default=None, description="矩形範囲 x1,y1,x2,y2（PDF座標）"),
+    if_none_match: Optional[str] = Header(default=None)
 ):
-    """特定ファイルのすべてのハイライトと、紐づく全コメントを取得"""
+    """
+    特定ファイルのハイライトを作成順に、紐づく全コメントとともに取得
+    limit を指定するとページ単位で返し、続きがある場合は X-Next-Cursor ヘッダーにカーソルを付ける
+    pages / bbox を指定すると、表示中のページ（と範囲）に矩形を持つハイライトだけを返す（矩形は全ページ分を含む）
+    ファイルの版数から ETag を返し、If-None-Match が一致すれば一覧を取得せずに 304 を返す
+    """
     try:
         if file_id <= 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="無効なファイルIDです"
             )
+
+        try:
+            page_ranges = parse_page_ranges(pages) if pages else None
+            bounding_box = parse_bbox(bbox) if bbox else None
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=e.message
+            )
+
+        version = crud_version.get_file_version(session, file_id)
+        etag = make_etag("file", file_id, version) if version is not None else None
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified(etag)
         
         logger.info(f"[with-comments] Fetching highlights for file_id: {file_id}")
-        highlights = crud_highlight.get_highlights_by_file(session, file_id)
+        highlights, next_cursor = crud_highlight.get_highlights_page_by_file(
+            session, file_id, cursor, limit, pages=page_ranges, bbox=bounding_box
+        )
         logger.info(f"[with-comments] Found {len(highlights)} highlights")
+        # 矩形とコメントはハイライト数によらずまとめて取得する
+        highlight_ids = [hl.id for hl in highlights]
+        rects_by_highlight = crud_highlight_rect.get_rects_for_highlights(session, highlights)
+        comments_by_highlight = crud_comment.get_active_comments_by_highlights(session, highlight_ids)
 
         result: List[HighlightWithComments] = []
         for hl in highlights:
             try:
-                rects = crud_highlight_rect.get_rects_by_highlight(session, hl.id)
-                comments = crud_comment.get_active_comments_by_highlight(session, hl.id) or []
+                rects = rects_by_highlight[hl.id]
+                comments = comments_by_highlight[hl.id]
 
                 highlight_read = HighlightRead(
                     id=hl.id,
@@ -270,19 +310,7 @@ def get_highlights_by_file_endpoint(
                     rects=rects
                 )
 
-                comment_reads = [
-                    CommentRead(
-                        id=c.id,
-                        highlight_id=c.highlight_id,
-                        parent_id=c.parent_id,
-                        author=c.author,
-                        text=c.text,
-                        purpose=c.purpose,
-                        created_at=c.created_at,
-                        updated_at=c.updated_at
-                    )
-                    for c in comments
-                ]
+                comment_reads = [CommentRead.model_validate(c) for c in comments]
 
                 result.append(HighlightWithComments(
                     highlight=highlight_read,
@@ -294,10 +322,17 @@ def get_highlights_by_file_endpoint(
                 continue
 
         logger.info(f"[with-comments] Returning {len(result)} highlights with comments")
-        return result
+        # 組み立て済みのモデルをそのままシリアライズ（response_model による再検証を行わない）
+        response = set_next_cursor(model_list_response(HighlightWithComments, result), next_cursor)
+        return set_etag(response, etag) if etag else response
         
     except HTTPException:
         raise
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無効なカーソルです"
+        )
     except Exception as e:
         logger.error(f"Error fetching highlights for file {file_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -331,7 +366,9 @@ def delete_highlight_endpoint(
             )
         
         # ハイライトを削除（関連コメントも削除される）
+        file_id = highlight.document_file_id
         crud_highlight.delete_highlight(session, highlight_id)
+        crud_version.bump_file_version(session, file_id)
         
         logger.info(f"Highlight {highlight_id} deleted successfully")
         return None
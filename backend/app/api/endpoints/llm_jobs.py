@@ -0,0 +1,171 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import ValidationError
+from sqlmodel import Session
+from typing import List, Optional
+from app.db.base import get_session
+from app.api.deps import get_current_user
+from app.api.endpoints.openai import LLM_TASKS, parse_llm_task_payload
+from app.crud import document as crud_document
+from app.crud import llm_job as crud_llm_job
+from app.models import User, LLMJob
+from app.schemas.llm_job import LLMJobCreate, LLMJobRead, LLMJobResultRead
+from app.core.serialization import model_list_response
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+def _get_own_job(session: Session, job_id: int, current_user: User) -> LLMJob:
+    """ジョブを取得し、所有者であることを確認"""
+    if job_id <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無効なジョブIDです"
+        )
+
+    job = crud_llm_job.get_job(session, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ジョブが見つかりません"
+        )
+
+    if job.user_id != current_user.id:
+        logger.warning(f"[LLM Jobs] User {current_user.id} not authorized for job {job_id}")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="このジョブへのアクセス権限がありません"
+        )
+    return job
+
+@router.post("/", response_model=LLMJobRead, status_code=status.HTTP_202_ACCEPTED)
+def submit_llm_job(
+    job_in: LLMJobCreate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """LLM分析ジョブを投入（処理はワーカーで非同期に実行）"""
+    try:
+        if job_in.job_type not in LLM_TASKS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="不正なジョブ種別が指定されました"
+            )
+
+        document = crud_document.get_document(session, job_in.document_id)
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="ドキュメントが見つかりません"
+            )
+
+        if document.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="このドキュメントへのアクセス権限がありません"
+            )
+
+        # ワーカーで失敗しないよう、投入時点でpayloadを検証する
+        try:
+            parse_llm_task_payload(job_in.job_type, job_in.payload)
+        except ValidationError as e:
+            logger.warning(f"[POST /llm-jobs] Invalid payload for {job_in.job_type}: {e.error_count()} errors")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ジョブの入力内容に誤りがあります"
+            )
+
+        job = crud_llm_job.create_job(session, current_user.id, job_in)
+        logger.info(f"[POST /llm-jobs] User {current_user.id} submitted job {job.id} ({job.job_type})")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[POST /llm-jobs] Error: {str(e)}", exc_info=True)
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="ジョブの投入中にエラーが発生しました"
+        )
+
+@router.get("/document/{document_id}", response_model=List[LLMJobRead])
+def list_llm_jobs_for_document(
+    document_id: int,
+    job_type: Optional[str] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """ドキュメントに紐づくジョブ一覧を取得（作成日時の降順）"""
+    try:
+        if document_id <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="無効なドキュメントIDです"
+            )
+
+        document = crud_document.get_document(session, document_id)
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="ドキュメントが見つかりません"
+            )
+
+        if document.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="このドキュメントへのアクセス権限がありません"
+            )
+
+        return model_list_response(LLMJobRead, crud_llm_job.get_jobs_by_document(session, document_id, job_type))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[GET /llm-jobs/document/{document_id}] Error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="ジョブ一覧の取得中にエラーが発生しました"
+        )
+
+@router.get("/{job_id}", response_model=LLMJobRead)
+def read_llm_job(
+    job_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """ジョブの状態を取得（ポーリング用）"""
+    try:
+        return _get_own_job(session, job_id, current_user)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[GET /llm-jobs/{job_id}] Error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="ジョブの取得中にエラーが発生しました"
+        )
+
+@router.get("/{job_id}/result", response_model=LLMJobResultRead)
+def read_llm_job_result(
+    job_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """ジョブの結果を取得（完了前は409）"""
+    try:
+        job = _get_own_job(session, job_id, current_user)
+
+        if job.status not in (crud_llm_job.JOB_STATUS_SUCCEEDED, crud_llm_job.JOB_STATUS_FAILED):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="ジョブはまだ完了していません"
+            )
+
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[GET /llm-jobs/{job_id}/result] Error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="ジョブ結果の取得中にエラーが発生しました"
+        )
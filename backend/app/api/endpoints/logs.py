@@ -1,12 +1,23 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from typing import List, Optional, Any
+from typing_extensions import NotRequired, TypedDict
 import logging
+import os
+import zlib
 from app.core.logging import user_log_buffer
 from datetime import datetime
 
 router = APIRouter()
 
+# NDJSONで受け付ける本文の上限（展開後のバイト数）
+LOG_INGEST_MAX_BYTES = int(os.getenv("LOG_INGEST_MAX_BYTES", str(5 * 1024 * 1024)))
+# バッファが満杯のときにクライアントへ返す再送までの秒数
+LOG_INGEST_RETRY_AFTER_SECONDS = int(os.getenv("LOG_INGEST_RETRY_AFTER_SECONDS", "5"))
+
+ACCEPTED_LOG_TYPES = ('user_action', 'llm_analysis')
+
 # ============ ログデータモデル ============
 
 class LogData(BaseModel):
@@ -28,6 +39,129 @@ class BatchLogRequest(BaseModel):
     logs: List[LogData]
     batchTimestamp: str
 
+class LogRecord(TypedDict):
+    """NDJSON受付用（検証結果をそのままdictとして扱う）"""
+    timestamp: str
+    type: str
+    action: NotRequired[Optional[str]]
+    details: NotRequired[Optional[dict]]
+    analysisType: NotRequired[Optional[str]]
+    feedback: NotRequired[Optional[dict]]
+    documentId: NotRequired[Optional[int]]
+    fileId: NotRequired[Optional[int]]
+    highlightCount: NotRequired[Optional[int]]
+    commentCount: NotRequired[Optional[int]]
+    userAgent: str
+    url: str
+    userId: NotRequired[Optional[str]]
+
+# 検証器は起動時に1回だけ構築する
+_log_record_adapter = TypeAdapter(LogRecord)
+
+# ============ ヘルパー ============
+
+class InvalidNdjsonLine(ValueError):
+    """NDJSONの行がログ1件として正しくない"""
+
+    def __init__(self, line_number: int, error_count: int):
+        super().__init__(f"line {line_number}: {error_count} errors")
+        self.line_number = line_number
+        self.error_count = error_count
+
+def _format_log(log_data: LogData, received_at: str) -> dict:
+    """LogDataを保存用のdictに変換"""
+    if log_data.type == 'user_action':
+        return {
+            'timestamp': log_data.timestamp,
+            'type': log_data.type,
+            'action': log_data.action,
+            'details': log_data.details or {},
+            'userAgent': log_data.userAgent,
+            'url': log_data.url,
+            'userId': log_data.userId or 'anonymous',
+            'source': 'frontend',
+            'received_at': received_at
+        }
+    # LLM分析ログ
+    return {
+        'timestamp': log_data.timestamp,
+        'type': log_data.type,
+        'analysisType': log_data.analysisType,
+        'userId': log_data.userId or 'anonymous',
+        'documentId': log_data.documentId,
+        'fileId': log_data.fileId,
+        'highlightCount': log_data.highlightCount,
+        'commentCount': log_data.commentCount,
+        'feedback': log_data.feedback or {},
+        'userAgent': log_data.userAgent,
+        'url': log_data.url,
+        'source': 'frontend',
+        'received_at': received_at
+    }
+
+def _enqueue_or_429(logs: List[dict]):
+    """ログをまとめてバッファに追加。満杯なら429を返す"""
+    if logs and not user_log_buffer.add_many(logs):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="ログの受付が混み合っています。しばらくしてから再送してください",
+            headers={"Retry-After": str(LOG_INGEST_RETRY_AFTER_SECONDS)},
+        )
+
+def _too_large():
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="ログが大きすぎます")
+
+async def _read_body(request: Request, content_encoding: str) -> bytes:
+    """
+    本文を少しずつ読み、（gzipの場合は展開しながら）上限を超えた時点で 413 を返す
+    本文全体をメモリに読み込んでから大きさを確かめることはしない
+    """
+    gzipped = content_encoding in ("gzip", "x-gzip")
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    received = 0
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        # 圧縮後の大きさも展開後の上限で抑える
+        if received > LOG_INGEST_MAX_BYTES:
+            raise _too_large()
+        if decompressor is not None:
+            try:
+                # 上限 + 1 バイトまでしか展開しない（それを超える展開結果は読まずに 413 にする）
+                chunk = decompressor.decompress(chunk, LOG_INGEST_MAX_BYTES - size + 1)
+            except zlib.error:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="gzipの展開に失敗しました")
+        size += len(chunk)
+        if size > LOG_INGEST_MAX_BYTES:
+            raise _too_large()
+        chunks.append(chunk)
+    if decompressor is not None and not decompressor.eof:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="gzipの展開に失敗しました")
+    return b"".join(chunks)
+
+def _parse_ndjson(data: bytes) -> List[dict]:
+    """NDJSONを1行ずつ検証してdictのリストにする（1行に複数のJSONがある行は不正として扱う）"""
+    records = []
+    for line_number, line in enumerate(data.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            records.append(_log_record_adapter.validate_json(line))
+        except ValidationError as e:
+            raise InvalidNdjsonLine(line_number, e.error_count()) from e
+
+    received_at = datetime.utcnow().isoformat()
+    logs = []
+    for record in records:
+        if record['type'] not in ACCEPTED_LOG_TYPES:
+            continue
+        record['userId'] = record.get('userId') or 'anonymous'
+        record['source'] = 'frontend'
+        record['received_at'] = received_at
+        logs.append(record)
+    return logs
+
 # ============ ログエンドポイント ============
 
 @router.post("/")
@@ -37,44 +171,36 @@ async def receive_frontend_logs(request: BatchLogRequest):
         return {"status": "success", "received": 0}
 
     try:
-        for log_data in request.logs:
-            if log_data.type == 'user_action':
-                # 既存のユーザアクションログ処理
-                formatted_log = {
-                    'timestamp': log_data.timestamp,
-                    'type': log_data.type,
-                    'action': log_data.action,
-                    'details': log_data.details or {},
-                    'userAgent': log_data.userAgent,
-                    'url': log_data.url,
-                    'userId': log_data.userId or 'anonymous',
-                    'source': 'frontend',
-                    'received_at': datetime.utcnow().isoformat()
-                }
-                
-                await user_log_buffer.add_log(formatted_log)
-
-            elif log_data.type == 'llm_analysis':
-                # LLM分析ログの処理
-                formatted_log = {
-                    'timestamp': log_data.timestamp,
-                    'type': log_data.type,
-                    'analysisType': log_data.analysisType,
-                    'userId': log_data.userId or 'anonymous',
-                    'documentId': log_data.documentId,
-                    'fileId': log_data.fileId,
-                    'highlightCount': log_data.highlightCount,
-                    'commentCount': log_data.commentCount,
-                    'feedback': log_data.feedback or {},
-                    'userAgent': log_data.userAgent,
-                    'url': log_data.url,
-                    'source': 'frontend',
-                    'received_at': datetime.utcnow().isoformat()
-                }
-                
-                await user_log_buffer.add_log(formatted_log)
-
+        received_at = datetime.utcnow().isoformat()
+        logs = [
+            _format_log(log_data, received_at)
+            for log_data in request.logs
+            if log_data.type in ACCEPTED_LOG_TYPES
+        ]
+        _enqueue_or_429(logs)
         return {"status": "success", "received": len(request.logs)}
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"[receive_frontend_logs] Failed to process batch: {str(e)}", exc_info=True)
-        return {"status": "error", "detail": str(e), "received": 0}
\ No newline at end of file
+        return {"status": "error", "detail": str(e), "received": 0}
+
+@router.post("/ndjson")
+async def receive_frontend_logs_ndjson(request: Request):
+    """
+    NDJSON形式（1行1ログ、Content-Encoding: gzip 可）でログを受け取り
+    検証済みのバッチをまとめてバッファに追加し、満杯の場合は 429 + Retry-After を返す
+    """
+    data = await _read_body(request, request.headers.get("content-encoding", "").lower())
+    try:
+        # 大きなバッチの検証でイベントループを塞がないようにする
+        logs = await run_in_threadpool(_parse_ndjson, data)
+    except InvalidNdjsonLine as e:
+        logging.warning(f"[receive_frontend_logs_ndjson] Invalid log at {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ログの形式が正しくありません（{e.line_number}行目）"
+        )
+
+    _enqueue_or_429(logs)
+    return {"status": "success", "received": len(logs)}
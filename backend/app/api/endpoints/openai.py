@@ -1,10 +1,22 @@
 from typing import List, Optional, Any
 import json
+import math
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
-from openai import OpenAI
+from app.api.deps import get_rate_limit_key
+from app.core.rate_limit import (
+    llm_scheduler,
+    estimate_tokens,
+    RateLimitExceeded,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BULK,
+)
+from app.core.singleflight import SingleFlight, make_key
+from app.core.metrics import OPENAI_REQUEST_DURATION, OPENAI_TOKENS, observe_duration
+from app.core.registry import services
+from app.services.llm_transport import LLMTransportError
 from app.utils.constants import (
     FORMAT_DATA_SYSTEM_PROMPT,
     OPTION_SYSTEM_PROMPT,
@@ -15,11 +27,11 @@ from app.utils.constants import (
 
 import os
 
-api_key = os.getenv("OPENAI_SECRET_KEY")
-if not api_key:
-    raise RuntimeError("OPENAI_SECRET_KEY is not defined.")
+# 応答をストリーミングで受け取るか（組み立ててから返すため、レスポンスの形は変わらない）
+LLM_STREAM_RESPONSES = os.getenv("LLM_STREAM_RESPONSES", "false").lower() == "true"
 
-client = OpenAI(api_key=api_key)
+# 同一内容の同時リクエストを1回のOpenAI呼び出しにまとめる
+chat_flight = SingleFlight("openai_chat")
 
 router = APIRouter()
 
@@ -81,7 +93,36 @@ class DeliberationDialogueRequest(BaseModel):
     userInput: DialogueInput = Field(..., alias="userInput")
 
 
-def _call_chat(model: str, system_prompt: str, user_content: str, temperature: Optional[float] = None, as_json: bool = False):
+def _call_chat(
+    model: str,
+    system_prompt: str,
+    user_content: str,
+    temperature: Optional[float] = None,
+    as_json: bool = False,
+    rate_key: Optional[str] = None,
+    priority: str = PRIORITY_BULK,
+):
+    tokens = estimate_tokens(system_prompt, user_content)
+    try:
+        # ユーザー単位の制限は共有された呼び出しも含めて数える
+        llm_scheduler.check_user(rate_key, tokens)
+
+        # 同じ内容のリクエストが実行中であれば、その結果を共有する
+        key = make_key(model, system_prompt, user_content, temperature, as_json)
+
+        def _upstream_call():
+            with llm_scheduler.upstream_slot(priority, tokens):
+                return _create_chat_completion(model, system_prompt, user_content, temperature, as_json)
+
+        return chat_flight.do(key, _upstream_call)
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="リクエストが集中しています。しばらくしてから再度お試しください",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+def _create_chat_completion(model: str, system_prompt: str, user_content: str, temperature: Optional[float] = None, as_json: bool = False):
     try:
         kwargs = {
             "model": model,
@@ -99,58 +140,127 @@ def _call_chat(model: str, system_prompt: str, user_content: str, temperature: O
         if as_json:
             kwargs["response_format"] = {"type": "json_object"}
         
-        resp = client.chat.completions.create(**kwargs)
-        return {"analysis": resp.choices[0].message.content}
+        # LLM_TRANSPORT で送信先を切り替える（openai / record / replay / synthetic、app/services/llm_transport.py）
+        llm_transport = services.get("llm_transport")
+        with observe_duration(OPENAI_REQUEST_DURATION, model=model):
+            if LLM_STREAM_RESPONSES:
+                result = llm_transport.stream(kwargs)
+            else:
+                result = llm_transport.complete(kwargs)
+        OPENAI_TOKENS.labels(model=model, kind="prompt").inc(result.prompt_tokens or 0)
+        OPENAI_TOKENS.labels(model=model, kind="completion").inc(result.completion_tokens or 0)
+        return {"analysis": result.content}
+    except LLMTransportError as e:
+        # 上流のレート制限はクライアントにも再試行を促す
+        if e.status_code == 429:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="リクエストが集中しています。しばらくしてから再度お試しください",
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after or 1)))},
+            )
+        # 上流の失敗（エラー応答・replay の記録なしなど）はこのサーバーの不具合ではないため 5xx のゲートウェイエラーにする
+        # タイムアウトは 504、それ以外は 502。500 はこのサーバー内の想定外のエラーにだけ使う
+        gateway_status = status.HTTP_504_GATEWAY_TIMEOUT if e.status_code == 504 else status.HTTP_502_BAD_GATEWAY
+        raise HTTPException(status_code=gateway_status, detail=f"Failed to call OpenAI: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to call OpenAI: {str(e)}")
 
-@router.post("/format-data")
-def format_data(req: FormatDataRequest):
+@router.get("/stats")
+def get_chat_stats():
+    """OpenAI呼び出しの共有（coalescing）とスケジューラの状況を取得"""
+    return {
+        "coalescing": chat_flight.stats(),
+        "scheduler": llm_scheduler.stats(),
+    }
+
+def _format_data_content(req: FormatDataRequest) -> str:
     user_json = req.model_dump(by_alias=True)["pdfTextData"]
+    return json.dumps(user_json, ensure_ascii=False)
+
+def _analyze_content(req: Any) -> str:
+    return req.userInput if isinstance(req.userInput, str) else str(req.userInput)
+
+def _dialogue_content(req: Any) -> str:
+    user_json = req.model_dump(by_alias=True)["userInput"]
+    return str(user_json)
+
+# LLMタスクの定義（HTTPエンドポイントとジョブワーカーで共有）
+LLM_TASKS = {
+    "format-data": {
+        "request_model": FormatDataRequest,
+        "model": "gpt-4o-mini",
+        "temperature": 0.0,
+        "system_prompt": FORMAT_DATA_SYSTEM_PROMPT,
+        "priority": PRIORITY_BULK,
+        "build_content": _format_data_content,
+    },
+    "option-analyze": {
+        "request_model": OptionAnalyzeRequest,
+        "model": "gpt-5",
+        "temperature": None,
+        "system_prompt": OPTION_SYSTEM_PROMPT,
+        "priority": PRIORITY_BULK,
+        "build_content": _analyze_content,
+    },
+    "option-dialogue": {
+        "request_model": OptionDialogueRequest,
+        "model": "gpt-5",
+        "temperature": None,
+        "system_prompt": OPTION_DIALOGUE_SYSTEM_PROMPT,
+        "priority": PRIORITY_INTERACTIVE,
+        "build_content": _dialogue_content,
+    },
+    "deliberation-analyze": {
+        "request_model": DeliberationAnalyzeRequest,
+        "model": "gpt-5",
+        "temperature": None,
+        "system_prompt": DELIBERATION_SYSTEM_PROMPT,
+        "priority": PRIORITY_BULK,
+        "build_content": _analyze_content,
+    },
+    "deliberation-dialogue": {
+        "request_model": DeliberationDialogueRequest,
+        "model": "gpt-5",
+        "temperature": None,
+        "system_prompt": DELIBERATION_DIALOGUE_SYSTEM_PROMPT,
+        "priority": PRIORITY_INTERACTIVE,
+        "build_content": _dialogue_content,
+    },
+}
+
+def run_llm_task(task: str, req: BaseModel, rate_key: Optional[str] = None):
+    """定義済みのLLMタスクを実行"""
+    spec = LLM_TASKS[task]
     return _call_chat(
-        model="gpt-4o-mini",
-        temperature=0.0,
-        system_prompt=FORMAT_DATA_SYSTEM_PROMPT,
-        user_content=json.dumps(user_json, ensure_ascii=False),
+        model=spec["model"],
+        temperature=spec["temperature"],
+        system_prompt=spec["system_prompt"],
+        user_content=spec["build_content"](req),
         as_json=True,
+        rate_key=rate_key,
+        priority=spec["priority"],
     )
 
+def parse_llm_task_payload(task: str, payload: dict) -> BaseModel:
+    """ジョブのpayloadをタスクのリクエストモデルで検証"""
+    return LLM_TASKS[task]["request_model"].model_validate(payload)
+
+@router.post("/format-data")
+def format_data(req: FormatDataRequest, rate_key: str = Depends(get_rate_limit_key)):
+    return run_llm_task("format-data", req, rate_key=rate_key)
+
 @router.post("/option-analyze")
-def option_analyze(req: OptionAnalyzeRequest):
-    user_content = req.userInput if isinstance(req.userInput, str) else str(req.userInput)
-    return _call_chat(
-        model="gpt-5",
-        system_prompt=OPTION_SYSTEM_PROMPT,
-        user_content=user_content,
-        as_json=True,
-    )
+def option_analyze(req: OptionAnalyzeRequest, rate_key: str = Depends(get_rate_limit_key)):
+    return run_llm_task("option-analyze", req, rate_key=rate_key)
 
 @router.post("/option-dialogue")
-def option_dialogue(req: OptionDialogueRequest):
-    user_json = req.model_dump(by_alias=True)["userInput"]
-    return _call_chat(
-        model="gpt-5",
-        system_prompt=OPTION_DIALOGUE_SYSTEM_PROMPT,
-        user_content=str(user_json),
-        as_json=True,
-    )
+def option_dialogue(req: OptionDialogueRequest, rate_key: str = Depends(get_rate_limit_key)):
+    return run_llm_task("option-dialogue", req, rate_key=rate_key)
 
 @router.post("/deliberation-analyze")
-def deliberation_analyze(req: DeliberationAnalyzeRequest):
-    user_content = req.userInput if isinstance(req.userInput, str) else str(req.userInput)
-    return _call_chat(
-        model="gpt-5",
-        system_prompt=DELIBERATION_SYSTEM_PROMPT,
-        user_content=user_content,
-        as_json=True,
-    )
+def deliberation_analyze(req: DeliberationAnalyzeRequest, rate_key: str = Depends(get_rate_limit_key)):
+    return run_llm_task("deliberation-analyze", req, rate_key=rate_key)
 
 @router.post("/deliberation-dialogue")
-def deliberation_dialogue(req: DeliberationDialogueRequest):
-    user_json = req.model_dump(by_alias=True)["userInput"]
-    return _call_chat(
-        model="gpt-5",
-        system_prompt=DELIBERATION_DIALOGUE_SYSTEM_PROMPT,
-        user_content=str(user_json),
-        as_json=True,
-    )
\ No newline at end of file
+def deliberation_dialogue(req: DeliberationDialogueRequest, rate_key: str = Depends(get_rate_limit_key)):
+    return run_llm_task("deliberation-dialogue", req, rate_key=rate_key)
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, status
 from sqlalchemy.orm import Session
-import boto3
-from botocore.exceptions import ClientError, BotoCoreError
 import os
 from datetime import datetime
 from app.api.deps import get_db, get_current_user
 from app.models import User
+from app.utils.s3 import get_s3_client
 import logging
 from fastapi.responses import StreamingResponse
 from typing import Optional
@@ -17,17 +16,15 @@ router = APIRouter()
 # ロガーの設定
 logger = logging.getLogger(__name__)
 
-# S3クライアントの初期化
-try:
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        region_name=os.getenv('AWS_REGION', 'ap-northeast-1')
-    )
-except Exception as e:
-    logger.error(f"Failed to initialize S3 client: {str(e)}")
-    s3_client = None
+
+def _s3_client_or_none():
+    """S3クライアントを取得（初回呼び出し時に作成、作成できなければ None）"""
+    try:
+        return get_s3_client()
+    except Exception as e:
+        logger.error(f"Failed to initialize S3 client: {str(e)}")
+        return None
+
 
 BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
@@ -42,10 +39,14 @@ async def upload_pdf(
     """
     PDFファイルをS3にアップロードする
     """
+    # botocore は import が重いため、使う時に読み込む（app/utils/s3.py と同じ）
+    from botocore.exceptions import ClientError, BotoCoreError
+
     try:
         logger.info(f"[POST /s3/upload] User {current_user.id} started PDF upload: {file.filename}")
 
         # S3クライアントの初期化チェック
+        s3_client = _s3_client_or_none()
         if s3_client is None:
             logger.error("[POST /s3/upload] S3 client is not initialized")
             raise HTTPException(
@@ -214,6 +215,8 @@ async def get_file(
     """
     S3 からファイルを取得してストリーミング返却
     """
+    from botocore.exceptions import ClientError
+
     if not key:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -221,6 +224,7 @@ async def get_file(
         )
 
     # クライアント初期化チェック
+    s3_client = _s3_client_or_none()
     if s3_client is None:
         logger.error("[GET /s3/get-file] S3 client is not initialized")
         raise HTTPException(
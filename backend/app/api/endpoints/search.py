@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session
+from typing import List, Optional
+from app.db.base import get_session
+from app.api.deps import get_current_user
+from app.models import User
+from app.crud import search as crud_search
+from app.schemas.search import AnnotationSearchResult
+from app.core.serialization import model_list_response
+from app.utils.pagination import InvalidCursor, set_next_cursor
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/annotations", response_model=List[AnnotationSearchResult])
+def search_annotations(
+    q: str = Query(min_length=1, max_length=200, description="検索語（ハイライト本文・メモ・コメントの部分一致）"),
+    document_id: Optional[int] = Query(default=None, description="指定時はこのドキュメント内のみ検索"),
+    cursor: Optional[str] = Query(default=None, description="前のページの X-Next-Cursor"),
+    limit: int = Query(default=20, ge=1, le=100),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    ログインユーザーのドキュメントのハイライト・メモ・コメントを検索
+    一致度（本文 > メモ > コメント）の高い順に返し、続きがある場合は X-Next-Cursor ヘッダーを付ける
+    """
+    try:
+        if not q.strip():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="検索語を入力してください"
+            )
+        results, next_cursor = crud_search.search_annotations(
+            session, current_user.id, q, document_id=document_id, cursor=cursor, limit=limit
+        )
+        logger.info(f"[GET /search/annotations] user={current_user.id} document={document_id} hits={len(results)}")
+        return set_next_cursor(model_list_response(AnnotationSearchResult, results), next_cursor)
+    except HTTPException:
+        raise
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無効なカーソルです"
+        )
+    except Exception as e:
+        logger.error(f"Error searching annotations for user {current_user.id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="検索中にエラーが発生しました"
+        )
@@ -8,6 +8,7 @@ from app.models import User
 from app.schemas.auth import User as AuthUser
 from app.schemas.user import UserCreate, UserRead, UserUpdate
 from app.api.deps import get_current_user
+from app.core.user_cache import user_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -198,6 +199,7 @@ def update_user_data(
             )
         
         updated_user = update_user(session=session, user=db_user, user_in=user_in)
+        user_cache.invalidate(user_id)
         
         if not updated_user:
             raise HTTPException(
@@ -255,6 +257,7 @@ def delete_user_data(
             return None
         
         delete_user(session=session, user=db_user)
+        user_cache.invalidate(user_id)
         logger.info(f"[DELETE /users/{user_id}] User deleted successfully")
         return None
     except HTTPException:
@@ -0,0 +1,178 @@
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import HTTP_RESPONSE_BYTES
+
+try:
+    import brotli
+except ImportError:  # brotli が無い環境では gzip のみ
+    brotli = None
+
+# レスポンス圧縮（nginx を経由しない Render などの環境向け）
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# これより小さいレスポンスは圧縮しない（圧縮のCPU時間とヘッダーの増加に見合わない）
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# brotli は品質を上げるとCPU時間が大きく増えるため、動的なレスポンスでは 4〜5 程度にする
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# 既に圧縮済みの形式・逐次送信が必要な形式は圧縮しない
+SKIP_CONTENT_TYPES = (
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/octet-stream",
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "text/event-stream",
+)
+
+
+def parse_accept_encoding(value: str) -> dict:
+    """Accept-Encoding を {エンコーディング: q値} にする"""
+    result = {}
+    for item in value.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, val = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        result[name] = q
+    return result
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """対応するエンコーディングのうち q値が最大のもの（同じなら br を優先）"""
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits=31: gzip 形式（ヘッダー・CRC付き）
+            self._gz = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.finish()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_FINISH)
+
+
+def _is_compressible(headers: Headers, status: int) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return not any(content_type.startswith(skip) for skip in SKIP_CONTENT_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encoding に応じて br / gzip でレスポンスを圧縮するASGIミドルウェア
+    - 1回で送られるレスポンスは COMPRESSION_MINIMUM_SIZE 未満なら圧縮しない
+    - StreamingResponse はチャンクごとに圧縮して流す（Content-Length は削除）
+    - PDF・画像など圧縮済みの形式と、Content-Encoding 設定済みのレスポンスはそのまま返す
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message.get("headers", []))
+                passthrough = not _is_compressible(headers, message["status"])
+                if not passthrough:
+                    # 圧縮するかどうかは本文の大きさで決まるため、キャッシュは常に Accept-Encoding で分ける
+                    MutableHeaders(scope=start_message).add_vary_header("Accept-Encoding")
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if passthrough:
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # 圧縮後の本文はバイト列が異なるため、強いETagは弱いETagにする
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["Content-Length"]
+                    chunk = compressor.compress(body)
+                else:
+                    chunk = compressor.finish(body)
+                    headers["Content-Length"] = str(len(chunk))
+                await send(start_message)
+                start_message = None
+            else:
+                chunk = compressor.compress(body) if more_body else compressor.finish(body)
+
+            HTTP_RESPONSE_BYTES.labels(encoding=encoding, kind="original").inc(len(body))
+            HTTP_RESPONSE_BYTES.labels(encoding=encoding, kind="sent").inc(len(chunk))
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
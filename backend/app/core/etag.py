@@ -0,0 +1,38 @@
+from typing import Optional
+
+from fastapi import Response, status
+
+# ブラウザにキャッシュさせつつ、毎回 If-None-Match で再検証させる
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(kind: str, resource_id: int, version: int) -> str:
+    """版数（content_version）から弱いETagを作る（例: W/"file-12-v5"）"""
+    return f'W/"{kind}-{resource_id}-v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match が etag に一致するか（弱い比較。W/ の有無は区別しない）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+    return response
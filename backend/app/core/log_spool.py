@@ -0,0 +1,213 @@
+import fcntl
+import gzip
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 送信前のログを書き込むローカルのスプールディレクトリ
+LOG_SPOOL_DIR = os.getenv("LOG_SPOOL_DIR", "logs/spool")
+# fsync をまとめる単位（件数・秒数のどちらかに達したら fsync する）
+LOG_SPOOL_FSYNC_RECORDS = int(os.getenv("LOG_SPOOL_FSYNC_RECORDS", "100"))
+LOG_SPOOL_FSYNC_INTERVAL_SECONDS = float(os.getenv("LOG_SPOOL_FSYNC_INTERVAL_SECONDS", "1"))
+# オブジェクトキーに含めるワーカー識別子（複数ワーカー・複数ホストでのキー衝突を防ぐ）
+LOG_WORKER_ID = os.getenv("LOG_WORKER_ID") or socket.gethostname()
+
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".seg"
+LOCK_FILE = ".lock"
+
+# 送信関数: (オブジェクトキー, gzip済みNDJSON) -> 成功したか
+Uploader = Callable[[str, bytes], bool]
+
+
+class LogSpool:
+    """
+    ログのローカル先行書き込み（write-ahead spool）
+    - ログは追記専用のセグメントファイル（NDJSON）に書き込み、fsync は件数・時間でまとめる
+    - seal したセグメントを送信し、送信が確認できたものだけを削除する
+    - プロセスごとに専用ディレクトリを使い、ロックファイルを flock で保持する
+      ロックが取れるディレクトリは終了済みプロセスのものとみなし、起動時に引き取って再送する
+    """
+
+    def __init__(self, log_type: str, directory: str = LOG_SPOOL_DIR):
+        self.log_type = log_type
+        self.base_dir = os.path.join(directory, log_type)
+        self.instance = f"{LOG_WORKER_ID}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.dir = os.path.join(self.base_dir, self.instance)
+
+        self._lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._file = None
+        self._path: Optional[str] = None
+        self._seq = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.records_in_segment = 0
+
+    # ===== 書き込み =====
+
+    def _open(self):
+        """プロセス専用ディレクトリを作成してロックを取得"""
+        if self._lock_fd is not None:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(self.dir, LOCK_FILE), os.O_CREAT | os.O_RDWR, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+    def _new_segment(self):
+        self._open()
+        self._seq += 1
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        self._path = os.path.join(self.dir, f"{stamp}-{self._seq:06d}{OPEN_SUFFIX}")
+        self._file = open(self._path, "a", encoding="utf-8")
+        self.records_in_segment = 0
+
+    def append(self, records: Iterable[dict]):
+        """ログを現在のセグメントに追記（fsync はまとめて行う）"""
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        if not lines:
+            return
+        count = lines.count("\n")
+        with self._lock:
+            if self._file is None:
+                self._new_segment()
+            self._file.write(lines)
+            self.records_in_segment += count
+            self._unsynced += count
+            if self._unsynced >= LOG_SPOOL_FSYNC_RECORDS:
+                self._sync_locked()
+
+    def maybe_sync(self):
+        """前回の fsync から一定時間が経っていれば fsync する"""
+        with self._lock:
+            if self._unsynced and time.monotonic() - self._last_sync >= LOG_SPOOL_FSYNC_INTERVAL_SECONDS:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def seal(self) -> Optional[str]:
+        """現在のセグメントを確定して送信対象にする"""
+        with self._lock:
+            if self._file is None:
+                return None
+            self._sync_locked()
+            self._file.close()
+            sealed = self._path[: -len(OPEN_SUFFIX)] + SEALED_SUFFIX
+            os.rename(self._path, sealed)
+            self._file = None
+            self._path = None
+            self.records_in_segment = 0
+            return sealed
+
+    # ===== 送信 =====
+
+    @staticmethod
+    def _sealed_segments(directory: str) -> List[str]:
+        try:
+            names = sorted(n for n in os.listdir(directory) if n.endswith(SEALED_SUFFIX))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(directory, n) for n in names]
+
+    def _segment_key(self, path: str, instance: str) -> str:
+        """セグメント名から決定的なオブジェクトキーを生成（再送しても同じキーになる）"""
+        name = os.path.basename(path)[: -len(SEALED_SUFFIX)]
+        stamp, seq = name.rsplit("-", 1)
+        created = datetime.strptime(stamp, "%Y%m%d-%H%M%S")
+        return (
+            f"{self.log_type}/{created.strftime('%Y/%m/%d')}/"
+            f"{created.strftime('%H%M%S')}-{instance}-{seq}.ndjson.gz"
+        )
+
+    @staticmethod
+    def _read_segment(path: str) -> Tuple[bytes, int]:
+        """セグメントを読み込む（異常終了で途中まで書かれた最終行は除く）"""
+        with open(path, "rb") as f:
+            data = f.read()
+        if data and not data.endswith(b"\n"):
+            data = data[: data.rfind(b"\n") + 1]
+        return data, data.count(b"\n")
+
+    def _upload_dir(self, directory: str, instance: str, upload: Uploader) -> Tuple[int, bool]:
+        """ディレクトリ内の確定済みセグメントを古い順に送信。送信件数と全件成功したかを返す"""
+        uploaded = 0
+        for path in self._sealed_segments(directory):
+            data, count = self._read_segment(path)
+            if count and not upload(self._segment_key(path, instance), gzip.compress(data)):
+                return uploaded, False
+            os.remove(path)
+            uploaded += count
+        return uploaded, True
+
+    def upload_pending(self, upload: Uploader) -> Tuple[int, bool]:
+        """自プロセスの確定済みセグメントを送信"""
+        return self._upload_dir(self.dir, self.instance, upload)
+
+    def pending_segments(self) -> int:
+        """送信待ちの確定済みセグメント数"""
+        return len(self._sealed_segments(self.dir))
+
+    # ===== 起動時の再送 =====
+
+    def recover(self, upload: Uploader) -> int:
+        """
+        終了済みプロセスのスプールを引き取って送信する
+        書き込み途中のセグメントも確定扱いにし、送信しきれた場合のみディレクトリを削除する
+        """
+        try:
+            instances = [n for n in os.listdir(self.base_dir) if n != self.instance]
+        except FileNotFoundError:
+            return 0
+
+        recovered = 0
+        for instance in instances:
+            directory = os.path.join(self.base_dir, instance)
+            lock_path = os.path.join(directory, LOCK_FILE)
+            try:
+                fd = os.open(lock_path, os.O_RDWR)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # 稼働中のプロセスが保持している
+                    continue
+
+                for name in os.listdir(directory):
+                    if name.endswith(OPEN_SUFFIX):
+                        path = os.path.join(directory, name)
+                        os.rename(path, path[: -len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+
+                count, complete = self._upload_dir(directory, instance, upload)
+                recovered += count
+                if complete:
+                    shutil.rmtree(directory, ignore_errors=True)
+            finally:
+                os.close(fd)
+
+        if recovered:
+            logger.info(f"[LogSpool:{self.log_type}] Replayed {recovered} logs from previous processes")
+        return recovered
+
+    def close(self):
+        """セグメントを確定してロックを解放"""
+        self.seal()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
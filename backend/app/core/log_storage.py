@@ -0,0 +1,110 @@
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from .r2_client import get_r2_client
+
+# ログの保存先: "r2"（Cloudflare R2） or "local"（ローカルディレクトリ、開発・分析用）
+LOG_STORAGE_BACKEND = os.getenv("LOG_STORAGE_BACKEND", "r2")
+LOG_STORAGE_LOCAL_DIR = os.getenv("LOG_STORAGE_LOCAL_DIR", "logs/storage")
+
+
+class LogStorage(ABC):
+    """ログ保存先の基底クラス（キーは '/' 区切り）"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str = "application/json",
+            content_encoding: Optional[str] = None) -> bool:
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def list_keys(self, prefix: str) -> List[str]:
+        """prefix で始まるキーを辞書順で返す"""
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+
+class R2LogStorage(LogStorage):
+    """Cloudflare R2に保存"""
+
+    def __init__(self):
+        self.r2_client = get_r2_client()
+
+    def put(self, key: str, data: bytes, content_type: str = "application/json",
+            content_encoding: Optional[str] = None) -> bool:
+        return self.r2_client.upload_log(key, data, content_type=content_type, content_encoding=content_encoding)
+
+    def get(self, key: str) -> bytes:
+        res = self.r2_client.client.get_object(Bucket=self.r2_client.bucket_name, Key=key)
+        return res["Body"].read()
+
+    def list_keys(self, prefix: str) -> List[str]:
+        keys = []
+        paginator = self.r2_client.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.r2_client.bucket_name, Prefix=prefix):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []))
+        return sorted(keys)
+
+    def delete(self, key: str):
+        self.r2_client.client.delete_object(Bucket=self.r2_client.bucket_name, Key=key)
+
+
+class LocalLogStorage(LogStorage):
+    """ローカルディレクトリに保存（キーをそのまま相対パスとして使う）"""
+
+    def __init__(self, root: str = LOG_STORAGE_LOCAL_DIR):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid log key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: str = "application/json",
+            content_encoding: Optional[str] = None) -> bool:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 書き込み途中のファイルが読まれないよう、一時ファイルから置き換える
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            # 置き換えた後で元のファイルを消す呼び出し（compact_logs.py など）があるため、ディスクに書き切ってから置き換える
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return True
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def list_keys(self, prefix: str) -> List[str]:
+        keys = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if ".tmp-" in name:
+                    continue
+                key = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def get_log_storage() -> LogStorage:
+    """LOG_STORAGE_BACKEND に応じた保存先を返す"""
+    if LOG_STORAGE_BACKEND == "local":
+        return LocalLogStorage()
+    return R2LogStorage()
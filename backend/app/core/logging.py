@@ -1,112 +1,325 @@
 import asyncio
-import json
 import logging
+import os
+import queue
+import threading
 import time
 from datetime import datetime
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
-from typing import Callable, List
-from .r2_client import get_r2_client
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import List, Optional
+from .log_storage import get_log_storage
+from .log_spool import LogSpool, LOG_SPOOL_FSYNC_INTERVAL_SECONDS
+from .metrics import (
+    HTTP_REQUEST_DURATION,
+    LOG_BUFFER_DROPPED,
+    LOG_BUFFER_FAILED_UPLOADS,
+    LOG_BUFFER_PENDING_SEGMENTS,
+    LOG_BUFFER_QUEUE_DEPTH,
+    LOG_BUFFER_SPILLED,
+)
 
 # ロガー設定
 api_logger = logging.getLogger("api_access")
 user_logger = logging.getLogger("user_action")
 
+# 送信待ちログの上限件数（バッファごと）
+LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+# 上限に達したときの扱い: "spill"（送信スレッドにスプールへ書き込ませる） or "drop"（破棄）
+LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "spill")
+# "spill" で送信スレッドへ渡す待ちの上限件数（これを超えた分は破棄する）
+LOG_OVERFLOW_MAX_SIZE = int(os.getenv("LOG_OVERFLOW_MAX_SIZE", "100000"))
+# 終了時に残りのログを書き込み・送信するまで待つ最大時間（秒）
+LOG_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("LOG_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+# 送信スレッドへの停止指示
+_STOP = object()
+
 class LogBuffer:
-    """ログバッファの基底クラス"""
+    """
+    ログバッファの基底クラス
+    - 追加は上限付きキューへの put_nowait のみで、リクエスト処理を待たせない
+    - 専用スレッドがキューのログをローカルのスプール（LogSpool）へ書き込み、
+      batch_size 件または batch_interval_seconds ごとにセグメントを確定して保存先（R2など）へ送信する
+    - 送信形式は gzip 圧縮した NDJSON（1行1ログ）。送信に失敗したセグメントは次回に再送する
+    - キューが満杯の場合は LOG_OVERFLOW_POLICY に従って送信スレッドへの受け渡しリストに積むか破棄する
+      （呼び出し元のスレッドではファイルに書き込まない）
+    """
     
-    def __init__(self, log_type: str, batch_size: int = 100, batch_interval_seconds: int = 300):
+    def __init__(self, log_type: str, batch_size: int = 100, batch_interval_seconds: int = 300,
+                 max_queue_size: int = LOG_QUEUE_MAX_SIZE):
         self.log_type = log_type  # 'api_access' or 'user_action'
-        self.buffer: List[dict] = []
-        self.lock = asyncio.Lock()
         self.batch_size = batch_size
         self.batch_interval_seconds = batch_interval_seconds
-        self.batch_task = None
-        self.r2_client = get_r2_client()
-    
+        self.max_queue_size = max_queue_size
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        # 保存先（R2 の場合は boto3 クライアント）は最初の送信時に作成する
+        self._storage = None
+
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self.spool: Optional[LogSpool] = None
+        # キューからあふれたログの受け渡しリスト（送信スレッドがスプールへ書き込む）
+        self._overflow_lock = threading.Lock()
+        self._overflow_logs: List[dict] = []
+
+        self.dropped = 0
+        self.spilled = 0
+        self.uploaded_logs = 0
+        self.failed_uploads = 0
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_log_storage()
+        return self._storage
+
+    @storage.setter
+    def storage(self, value):
+        self._storage = value
+
+    def _ensure_started(self):
+        """スプールと送信スレッドを用意（fork後の子プロセスでは作り直す）"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # 親プロセスのキューとスレッドは引き継がない
+                self.queue = queue.Queue(maxsize=self.max_queue_size)
+                self._overflow_lock = threading.Lock()
+                self._overflow_logs = []
+            self._pid = os.getpid()
+            self.spool = LogSpool(self.log_type)
+            self._thread = threading.Thread(
+                target=self._run, name=f"log-uploader-{self.log_type}", daemon=True
+            )
+            self._thread.start()
+
+    def add_log_nowait(self, log_data: dict) -> bool:
+        """
+        ログを送信キューに追加（ブロックしない。イベントループ・スレッドのどちらからでも呼べる）
+        キューが満杯で破棄した場合は False を返す
+        """
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(log_data)
+            return True
+        except queue.Full:
+            return self._overflow([log_data])
+
     async def add_log(self, log_data: dict):
         """ログをバッファに追加"""
-        async with self.lock:
-            self.buffer.append(log_data)
-            
-            # バッファサイズがしきい値に達したら即座に送信
-            if len(self.buffer) >= self.batch_size:
-                await self.flush_buffer()
-            # バッチタスクがなければスケジュール
-            elif self.batch_task is None or self.batch_task.done():
-                self.batch_task = asyncio.create_task(self.schedule_flush())
-    
-    async def schedule_flush(self):
-        """定期的にバッファをフラッシュ"""
-        try:
-            await asyncio.sleep(self.batch_interval_seconds)
-            async with self.lock:
-                if self.buffer:
-                    await self.flush_buffer()
-        except asyncio.CancelledError:
-            pass
-    
-    async def flush_buffer(self):
-        """バッファ内のログをR2に送信"""
-        if not self.buffer:
+        self.add_log_nowait(log_data)
+
+    def add_many(self, logs: List[dict]) -> bool:
+        """
+        複数のログをまとめて送信キューに追加（ブロックしない）
+        キューの空きが足りない場合は1件も追加せずに False を返す（呼び出し側で再送させる）
+        """
+        self._ensure_started()
+        if self.max_queue_size and self.queue.qsize() + len(logs) > self.max_queue_size:
+            return False
+        for i, log_data in enumerate(logs):
+            try:
+                self.queue.put_nowait(log_data)
+            except queue.Full:
+                # 確認後に他の呼び出しで埋まった場合は残りを送信スレッドへ渡す
+                self._overflow(logs[i:])
+                break
+        return True
+
+    def _overflow(self, logs: List[dict]) -> bool:
+        """キューに入らなかったログを受け渡しリストに積む（呼び出し元のスレッドでファイルに書き込まない）"""
+        if LOG_OVERFLOW_POLICY == "spill":
+            with self._overflow_lock:
+                if len(self._overflow_logs) + len(logs) <= LOG_OVERFLOW_MAX_SIZE:
+                    self._overflow_logs.extend(logs)
+                    return True
+        self.dropped += len(logs)
+        LOG_BUFFER_DROPPED.labels(self.log_type).inc(len(logs))
+        if self.dropped == len(logs) or self.dropped % 1000 < len(logs):
+            logging.warning(f"[{self.log_type}] Log queue is full, dropped {self.dropped} logs so far")
+        return False
+
+    def _take_overflow(self) -> List[dict]:
+        with self._overflow_lock:
+            logs, self._overflow_logs = self._overflow_logs, []
+        return logs
+
+    def _spill(self, logs: List[dict]):
+        """ログをスプールへ書き込む（送信スレッド・終了処理から呼ばれる）"""
+        if not logs:
             return
-        
-        logs_to_send = self.buffer.copy()
-        self.buffer.clear()
-        
         try:
-            # タイムスタンプベースのキーを生成
-            timestamp = datetime.utcnow()
-            key = f"{self.log_type}/{timestamp.strftime('%Y/%m/%d')}/{timestamp.strftime('%H%M%S')}-{int(time.time() * 1000)}.json"
-            
-            # JSON形式でログをまとめる
-            log_data = {
-                "logs": logs_to_send,
-                "batch_timestamp": timestamp.isoformat(),
-                "count": len(logs_to_send)
-            }
-            
-            # R2にアップロード
-            success = self.r2_client.upload_log(key, json.dumps(log_data, ensure_ascii=False))
-            
-            if not success:
-                logging.error(f"[{self.log_type}] Failed to upload logs to R2")
-        
+            self.spool.append(logs)
+            self.spilled += len(logs)
+            LOG_BUFFER_SPILLED.labels(self.log_type).inc(len(logs))
+        except Exception as e:
+            self.dropped += len(logs)
+            LOG_BUFFER_DROPPED.labels(self.log_type).inc(len(logs))
+            logging.error(f"[{self.log_type}] Failed to spill {len(logs)} logs: {str(e)}")
+
+    def _upload(self, key: str, body: bytes) -> bool:
+        try:
+            return self.storage.put(
+                key, body, content_type="application/x-ndjson", content_encoding="gzip"
+            )
         except Exception as e:
             logging.error(f"[{self.log_type}] Failed to flush logs: {str(e)}", exc_info=True)
+            return False
+
+    def _flush(self):
+        """現在のセグメントを確定し、未送信のセグメントを送信（送信スレッドから呼ばれる）"""
+        self.spool.seal()
+        uploaded, complete = self.spool.upload_pending(self._upload)
+        self.uploaded_logs += uploaded
+        if not complete:
+            self.failed_uploads += 1
+            LOG_BUFFER_FAILED_UPLOADS.labels(self.log_type).inc()
+            logging.error(
+                f"[{self.log_type}] Failed to upload logs, "
+                f"{self.spool.pending_segments()} segments kept for retry"
+            )
+
+    def _update_gauges(self):
+        """滞留数のメトリクスを更新（送信スレッドから呼ばれる。ログの追加ごとには書き込まない）"""
+        stats = self.stats()
+        LOG_BUFFER_QUEUE_DEPTH.labels(self.log_type).set(stats["queued"])
+        LOG_BUFFER_PENDING_SEGMENTS.labels(self.log_type).set(stats["pending_segments"])
+
+    def _run(self):
+        """送信スレッド本体"""
+        try:
+            self.uploaded_logs += self.spool.recover(self._upload)
+        except Exception as e:
+            logging.error(f"[{self.log_type}] Failed to replay spooled logs: {str(e)}", exc_info=True)
+
+        deadline = time.monotonic() + self.batch_interval_seconds
+        while True:
+            timeout = min(max(0.0, deadline - time.monotonic()), LOG_SPOOL_FSYNC_INTERVAL_SECONDS)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            try:
+                if item is _STOP:
+                    self._spill(self._take_overflow())
+                    self._flush()
+                    return
+                if item is not None:
+                    self.spool.append([item])
+                self._spill(self._take_overflow())
+                self.spool.maybe_sync()
+                self._update_gauges()
+
+                if self.spool.records_in_segment >= self.batch_size or time.monotonic() >= deadline:
+                    self._flush()
+                    deadline = time.monotonic() + self.batch_interval_seconds
+            except Exception as e:
+                logging.error(f"[{self.log_type}] Log uploader error: {str(e)}", exc_info=True)
+
+    def shutdown(self, timeout: float = LOG_SHUTDOWN_TIMEOUT_SECONDS):
+        """キューに残ったログを書き込み・送信して送信スレッドを停止（ブロックする）"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+        except queue.Full:
+            pass
+
+        # 時間内に処理しきれなかったログはスプールに残し、次回起動時に再送する
+        # （終了処理はイベントループ外で呼ばれるため、ここではスプールへ直接書き込む）
+        remaining: List[dict] = self._take_overflow()
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        self._spill(remaining)
+        if not self._thread.is_alive():
+            self.spool.close()
+        self._thread = None
+
+    def stats(self) -> dict:
+        """キューの滞留数や破棄・退避件数を返す"""
+        return {
+            "queued": self.queue.qsize() + len(self._overflow_logs),
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "uploaded_logs": self.uploaded_logs,
+            "failed_uploads": self.failed_uploads,
+            "pending_segments": self.spool.pending_segments() if self.spool else 0,
+        }
 
 # グローバルバッファインスタンス
 api_log_buffer = LogBuffer('api_access', batch_size=100, batch_interval_seconds=180)
 user_log_buffer = LogBuffer('user_action', batch_size=50, batch_interval_seconds=180)
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """APIアクセスログを記録するミドルウェア"""
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        start_time = time.time()
-        
-        # リクエスト処理
-        response = await call_next(request)
-        
-        # レスポンス時間を計算
-        duration = (time.time() - start_time) * 1000  # ミリ秒
-        
-        # ログデータを作成
-        log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'type': 'api',
-            'method': request.method,
-            'path': request.url.path,
-            'status': response.status_code,
-            'duration': duration,
-            'userAgent': request.headers.get('user-agent', ''),
-            'source': 'backend'
-        }
-        
-        # バッファに追加
-        await api_log_buffer.add_log(log_data)
-        
-        return response
+class LoggingMiddleware:
+    """
+    APIアクセスログを記録するASGIミドルウェア
+    レスポンス本体はラップせずに send を中継し、ステータスと送信バイト数だけを記録する
+    （StreamingResponse もそのまま流れる）
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        bytes_sent = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, bytes_sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = (time.perf_counter() - start_time) * 1000  # ミリ秒
+
+            # ルーティング後に設定されるパステンプレート（例: /api/v1/documents/{document_id}）
+            route = scope.get("route")
+            user_agent = ""
+            for name, value in scope.get("headers", []):
+                if name == b"user-agent":
+                    user_agent = value.decode("latin-1")
+                    break
+
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", None) or "unmatched",
+                status=status_code,
+            ).observe(duration / 1000)
+
+            api_log_buffer.add_log_nowait({
+                'timestamp': datetime.utcnow().isoformat(),
+                'type': 'api',
+                'method': scope["method"],
+                'path': scope["path"],
+                'route': getattr(route, "path", None),
+                'status': status_code,
+                'duration': duration,
+                'bytes': bytes_sent,
+                'userAgent': user_agent,
+                'source': 'backend'
+            })
 
 # ユーザー操作ログ用ヘルパー関数
 def log_user_action(action: str, user_id: str = None, details: dict = None):
@@ -118,8 +331,7 @@ def log_user_action(action: str, user_id: str = None, details: dict = None):
         "details": details or {},
     }
     
-    # 非同期タスクとして追加
-    asyncio.create_task(user_log_buffer.add_log(log_data))
+    user_log_buffer.add_log_nowait(log_data)
 
 def setup_loggers():
     """ロガーのセットアップ（コンソール出力用）"""
@@ -137,5 +349,8 @@ def setup_loggers():
 
 async def shutdown_loggers():
     """アプリケーション終了時にバッファをフラッシュ"""
-    await api_log_buffer.flush_buffer()
-    await user_log_buffer.flush_buffer()
\ No newline at end of file
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        loop.run_in_executor(None, api_log_buffer.shutdown),
+        loop.run_in_executor(None, user_log_buffer.shutdown),
+    )
\ No newline at end of file
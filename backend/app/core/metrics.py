@@ -0,0 +1,223 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# /metrics を保護するトークン（Authorization: Bearer <token> が必要。未設定なら /metrics は 404 を返す）
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# 複数ワーカー（gunicorn）で動かす場合に、各ワーカーが値を書き込むディレクトリ（prometheus_client の multiprocess モード）
+# prometheus_client の import 前に設定されている必要があるため、entrypoint.sh で export する
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+# ===== アプリ共通のメトリクス =====
+# ゲージは multiprocess モードでは生きているワーカーの値の合計（livesum）にする
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+HTTP_RESPONSE_BYTES = Counter(
+    "http_response_bytes_total", "Response body bytes before (original) and after (sent) compression",
+    ["encoding", "kind"],
+)
+
+DB_QUERIES = Counter("db_queries_total", "Number of SQL statements executed")
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Connection checkouts that timed out")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out",
+                            multiprocess_mode="livesum")
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured pool size", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened beyond pool size",
+                         multiprocess_mode="livesum")
+
+S3_REQUEST_DURATION = Histogram(
+    "s3_request_duration_seconds", "S3/R2 API call latency", ["client", "operation", "outcome"],
+)
+S3_BYTES = Counter("s3_bytes_total", "Bytes transferred to/from S3/R2", ["client", "operation", "direction"])
+
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds", "OpenAI API call latency", ["model", "outcome"],
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+OPENAI_TOKENS = Counter("openai_tokens_total", "Tokens reported by OpenAI usage", ["model", "kind"])
+
+PDF_EXPORT_DURATION = Histogram(
+    "pdf_export_duration_seconds", "PDF export (annotation rendering) time", ["outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+LOG_BUFFER_QUEUE_DEPTH = Gauge("log_buffer_queue_depth", "Logs waiting in the LogBuffer queue", ["log_type"],
+                               multiprocess_mode="livesum")
+LOG_BUFFER_DROPPED = Counter("log_buffer_dropped_total", "Logs dropped because the queue was full", ["log_type"])
+LOG_BUFFER_SPILLED = Counter("log_buffer_spilled_total", "Logs spooled outside the queue (queue full or left at shutdown)",
+                             ["log_type"])
+LOG_BUFFER_FAILED_UPLOADS = Counter("log_buffer_failed_uploads_total", "Failed log upload attempts", ["log_type"])
+LOG_BUFFER_PENDING_SEGMENTS = Gauge("log_buffer_pending_segments", "Spool segments waiting for upload", ["log_type"],
+                                    multiprocess_mode="livesum")
+
+
+@contextmanager
+def observe_duration(histogram: Histogram, **labels):
+    """with observe_duration(...): の処理時間を記録する（outcome ラベルは例外の有無で success / error にする）"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - started)
+
+
+# ===== DB =====
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    接続取得の待ち時間を計測する QueuePool
+    プールの状態は接続の貸し出し・返却のたびに書き込む（multiprocess モードでは収集時に他のワーカーの値を読めないため）
+    """
+
+    def _update_gauges(self):
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_SIZE.set(self.size())
+        DB_POOL_OVERFLOW.set(max(0, self.overflow()))
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception as e:
+            if e.__class__.__name__ == "TimeoutError":
+                DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+
+def install_db_metrics(engine: Engine):
+    """エンジンにクエリ数・時間の計測を登録（プールの状態は InstrumentedQueuePool が記録する）"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERIES.inc()
+        start_times = conn.info.get("metrics_query_start")
+        if start_times:
+            DB_QUERY_DURATION.observe(time.perf_counter() - start_times.pop())
+
+
+# ===== S3 / R2 =====
+
+def _body_length(body) -> Optional[int]:
+    if body is None:
+        return None
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    try:
+        position = body.tell()
+        body.seek(0, os.SEEK_END)
+        length = body.tell() - position
+        body.seek(position)
+        return length
+    except Exception:
+        return None
+
+
+def instrument_boto3_client(client, client_label: str):
+    """boto3クライアントのAPI呼び出しごとに時間・転送量を記録する（botocoreのイベントを利用）"""
+    events = client.meta.events
+    service = client.meta.service_model.service_id.hyphenize()
+
+    def _before_call(params, model, context, **kwargs):
+        context["metrics_started"] = time.perf_counter()
+        context["metrics_operation"] = model.name
+        if model.name in ("PutObject", "UploadPart"):
+            length = _body_length(params.get("body") or params.get("Body"))
+            if length:
+                S3_BYTES.labels(client=client_label, operation=model.name, direction="out").inc(length)
+
+    def _after_call(http_response, parsed, model, context, **kwargs):
+        started = context.get("metrics_started")
+        outcome = "success" if http_response is not None and http_response.status_code < 400 else "error"
+        if started is not None:
+            S3_REQUEST_DURATION.labels(client=client_label, operation=model.name, outcome=outcome).observe(
+                time.perf_counter() - started
+            )
+        if model.name == "GetObject" and outcome == "success":
+            length = (parsed or {}).get("ContentLength")
+            if length:
+                S3_BYTES.labels(client=client_label, operation=model.name, direction="in").inc(length)
+
+    def _after_call_error(context, **kwargs):
+        # 通信エラー（タイムアウト・接続失敗など）
+        started = context.get("metrics_started")
+        if started is not None:
+            S3_REQUEST_DURATION.labels(
+                client=client_label, operation=context.get("metrics_operation", ""), outcome="error"
+            ).observe(time.perf_counter() - started)
+
+    events.register(f"before-call.{service}", _before_call)
+    events.register(f"after-call.{service}", _after_call)
+    events.register(f"after-call-error.{service}", _after_call_error)
+    return client
+
+
+# ===== 複数ワーカー =====
+# PROMETHEUS_MULTIPROC_DIR を設定すると、各ワーカーが値を <dir>/*.db に書き込み、
+# /metrics を受けたワーカーが全ファイルを合算して返す（prometheus_client.multiprocess）
+
+def clear_multiproc_dir():
+    """前回の起動時のファイルを削除（gunicorn の起動時に呼ぶ）"""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        if name.endswith(".db"):
+            os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
+
+def mark_process_dead(pid: int):
+    """終了したワーカーのゲージを集計から外す（gunicorn のマスタープロセスから呼ぶ）"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> bytes:
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,226 @@
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# リクエストごとのクエリ計測を行うか（開発・テスト用。本番では有効にしない）
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "false").lower() == "true"
+# 計測結果を Server-Timing ヘッダーでクライアントに返すか（DB時間・クエリ数が外部に見えるため開発時のみ）
+QUERY_PROFILER_SERVER_TIMING = os.getenv("QUERY_PROFILER_SERVER_TIMING", "false").lower() == "true"
+# 計測結果を返すデバッグ用エンドポイントを公開するか（本番では無効にする）
+QUERY_PROFILER_DEBUG_ENDPOINT = os.getenv("QUERY_PROFILER_DEBUG_ENDPOINT", "false").lower() == "true"
+# 1リクエスト内で同じ形のクエリがこの回数以上実行されたら N+1 の疑いとして記録する
+QUERY_PROFILER_REPEAT_THRESHOLD = int(os.getenv("QUERY_PROFILER_REPEAT_THRESHOLD", "5"))
+# デバッグ用に保持する直近のリクエスト数
+QUERY_PROFILER_HISTORY_SIZE = int(os.getenv("QUERY_PROFILER_HISTORY_SIZE", "200"))
+
+# :name の形のパラメータ（PostgreSQL のキャスト ::jsonb などは対象外）
+_PARAM_RE = re.compile(r"%\(\w+\)s|\?|\$\d+|(?<!:):\w+")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """パラメータ・数値・IN句の要素数を取り除いたクエリの形"""
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _IN_LIST_RE.sub("(?+)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+class RequestProfile:
+    """1リクエスト分のクエリ計測結果"""
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.shapes: Dict[str, List[float]] = {}  # shape -> [回数, 合計ms]
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed_ms: float):
+        shape = statement_shape(statement)
+        with self._lock:
+            self.query_count += 1
+            self.query_ms += elapsed_ms
+            entry = self.shapes.get(shape)
+            if entry is None:
+                self.shapes[shape] = [1, elapsed_ms]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed_ms
+
+    @property
+    def endpoint(self) -> str:
+        """予算・集計に使うキー（例: GET /api/v1/highlights/file/{file_id}）"""
+        return f"{self.method} {self.route or self.path}"
+
+    def repeated_shapes(self, threshold: int = QUERY_PROFILER_REPEAT_THRESHOLD) -> List[dict]:
+        """同じ形で threshold 回以上実行されたクエリ（N+1 の疑い）"""
+        with self._lock:
+            return [
+                {"statement": shape, "count": int(count), "total_ms": round(total, 2)}
+                for shape, (count, total) in sorted(self.shapes.items(), key=lambda kv: -kv[1][0])
+                if count >= threshold
+            ]
+
+    def summary(self) -> dict:
+        return {
+            "endpoint": self.endpoint,
+            "path": self.path,
+            "status": self.status,
+            "query_count": self.query_count,
+            "query_ms": round(self.query_ms, 2),
+            "repeated": self.repeated_shapes(),
+        }
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "query_profile", default=None
+)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries(profile: Optional[RequestProfile] = None) -> Iterator[RequestProfile]:
+    """ブロック内で実行されたクエリを profile に記録する（スクリプト・テスト用）"""
+    profile = profile or RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class QueryStats:
+    """直近のリクエストと、エンドポイント別の集計を保持する"""
+
+    def __init__(self, history_size: int = QUERY_PROFILER_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._recent: Deque[dict] = deque(maxlen=history_size)
+        self._endpoints: Dict[str, dict] = {}
+        self._listeners: List[Callable[[RequestProfile], None]] = []
+
+    def add_listener(self, listener: Callable[[RequestProfile], None]):
+        """リクエスト完了ごとに呼ばれるコールバックを登録（テストの予算チェック用）"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[RequestProfile], None]):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def finish(self, profile: RequestProfile):
+        summary = profile.summary()
+        if summary["repeated"]:
+            top = summary["repeated"][0]
+            logger.warning(
+                f"[QueryProfiler] Possible N+1 in {profile.endpoint}: "
+                f"{top['count']}x {top['statement'][:200]}"
+            )
+
+        with self._lock:
+            self._recent.append(summary)
+            stats = self._endpoints.setdefault(profile.endpoint, {
+                "requests": 0, "queries": 0, "query_ms": 0.0, "max_queries": 0, "n_plus_one": 0,
+            })
+            stats["requests"] += 1
+            stats["queries"] += profile.query_count
+            stats["query_ms"] += profile.query_ms
+            stats["max_queries"] = max(stats["max_queries"], profile.query_count)
+            if summary["repeated"]:
+                stats["n_plus_one"] += 1
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener(profile)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    **stats,
+                    "query_ms": round(stats["query_ms"], 2),
+                    "avg_queries": round(stats["queries"] / stats["requests"], 2),
+                }
+                for endpoint, stats in sorted(self._endpoints.items(), key=lambda kv: -kv[1]["queries"])
+            }
+            return {"endpoints": endpoints, "recent": list(self._recent)}
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._endpoints.clear()
+
+
+query_stats = QueryStats()
+
+
+def install_query_profiler(engine: Engine):
+    """エンジンにクエリ計測用のイベントを登録"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is None:
+            return
+        start_times = conn.info.get("query_start_times")
+        if not start_times:
+            return
+        profile.record(statement, (time.perf_counter() - start_times.pop()) * 1000)
+
+
+class QueryProfilerMiddleware:
+    """
+    リクエストごとにクエリ数・時間を計測するASGIミドルウェア
+    QUERY_PROFILER_SERVER_TIMING=true の場合は結果を Server-Timing ヘッダー（db;dur=...;desc="N queries"）で返す
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not QUERY_PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            if message["type"] == "http.response.start" and QUERY_PROFILER_SERVER_TIMING:
+                timing = f'db;dur={profile.query_ms:.1f};desc="{profile.query_count} queries"'
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None)
+            query_stats.finish(profile)
@@ -1,7 +1,7 @@
 import os
-import boto3
-from botocore.client import Config
-from typing import Optional
+from .metrics import instrument_boto3_client
+from .registry import services
+from typing import Optional, Union
 
 class R2Client:
     """Cloudflare R2クライアント"""
@@ -15,6 +15,10 @@ class R2Client:
     
     def __init__(self):
         if not hasattr(self, 'client'):
+            # boto3 の import は重いため、クライアント作成時に行う
+            import boto3
+            from botocore.client import Config
+
             self.client = boto3.client(
                 's3',
                 endpoint_url=os.getenv('R2_ENDPOINT_URL'),
@@ -23,22 +27,30 @@ class R2Client:
                 config=Config(signature_version='s3v4'),
                 region_name='auto'
             )
+            instrument_boto3_client(self.client, "r2")
             self.bucket_name = os.getenv('R2_BUCKET_NAME')
     
-    def upload_log(self, key: str, data: str) -> bool:
+    def upload_log(self, key: str, data: Union[str, bytes], content_type: str = 'application/json',
+                   content_encoding: Optional[str] = None) -> bool:
         """ログデータをR2にアップロード"""
         try:
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=key,
-                Body=data.encode('utf-8'),
-                ContentType='application/json'
-            )
+            params = {
+                'Bucket': self.bucket_name,
+                'Key': key,
+                'Body': data.encode('utf-8') if isinstance(data, str) else data,
+                'ContentType': content_type,
+            }
+            if content_encoding:
+                params['ContentEncoding'] = content_encoding
+            self.client.put_object(**params)
             return True
         except Exception as e:
             print(f"Failed to upload to R2: {str(e)}")
             return False
 
+services.register("r2", R2Client)
+
+
 def get_r2_client() -> R2Client:
-    """R2クライアントのシングルトンインスタンスを取得"""
-    return R2Client()
\ No newline at end of file
+    """R2クライアントのシングルトンインスタンスを取得（初回呼び出し時に作成）"""
+    return services.get("r2")
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 優先度クラス（値が小さいほど優先）
+PRIORITY_INTERACTIVE = "interactive"  # 対話（dialogue）
+PRIORITY_BULK = "bulk"                # 分析・整形などの一括処理
+PRIORITY_ORDER = {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 1}
+
+# ユーザー単位の上限（1分あたり）
+LLM_USER_REQUESTS_PER_MINUTE = int(os.getenv("LLM_USER_REQUESTS_PER_MINUTE", "20"))
+LLM_USER_TOKENS_PER_MINUTE = int(os.getenv("LLM_USER_TOKENS_PER_MINUTE", "60000"))
+# 全体の上限（1分あたり、OpenAIのレート制限より少し低めに設定する）
+LLM_GLOBAL_REQUESTS_PER_MINUTE = int(os.getenv("LLM_GLOBAL_REQUESTS_PER_MINUTE", "300"))
+LLM_GLOBAL_TOKENS_PER_MINUTE = int(os.getenv("LLM_GLOBAL_TOKENS_PER_MINUTE", "400000"))
+# 同時実行数と、そのうち一括処理が使える上限（残りは対話用に確保）
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_BULK_MAX_CONCURRENCY = int(os.getenv("LLM_BULK_MAX_CONCURRENCY", "6"))
+# 実行枠を待つ最大時間（秒）。超えた場合は Retry-After 付きで拒否する
+LLM_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("LLM_MAX_QUEUE_WAIT_SECONDS", "20"))
+# ユーザーごとのバケットを保持する上限数
+LLM_USER_BUCKETS_MAX = 10000
+# 同じ上限を共有するプロセス数（gunicorn の複数ワーカー）。全体の上限と同時実行数はワーカー数で等分する
+# ユーザー単位の上限は、同じ接続が同じワーカーに届きやすいため等分しない（最大でワーカー数倍まで緩くなる）
+LLM_RATE_LIMIT_WORKERS = max(1, int(os.getenv("LLM_RATE_LIMIT_WORKERS", os.getenv("WEB_CONCURRENCY", "1"))))
+
+
+class RateLimitExceeded(Exception):
+    """レート制限または実行待ちのタイムアウト"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """トークンバケット（capacity まで貯まり、毎秒 refill_per_second ずつ回復）"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount を消費できるまでの秒数（0なら即時消費可能）"""
+        self._refill(now)
+        # バケット容量を超える要求は満タン時に通す（大きな文書が永久に拒否されないように）
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        """consume した分を戻す（使わなかった枠の返却）"""
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+def _per_minute_bucket(limit: int) -> TokenBucket:
+    return TokenBucket(capacity=limit, refill_per_second=limit / 60.0)
+
+
+def _worker_share(limit: int) -> int:
+    """全体の上限のうち、このプロセスが使える分"""
+    return max(1, limit // LLM_RATE_LIMIT_WORKERS)
+
+
+def estimate_tokens(*texts: str) -> int:
+    """
+    トークン数の概算
+    UTF-8で3バイトあたり1トークンとみなす（英文は約3文字、日本語は約1文字で1トークン）
+    """
+    return sum(math.ceil(len(t.encode("utf-8")) / 3) for t in texts if t)
+
+
+class LLMScheduler:
+    """
+    LLM呼び出しのレート制限と優先度付きスケジューリング
+    - ユーザー単位・全体のトークンバケット（リクエスト数・トークン数）
+    - 同時実行枠を優先度順（対話 > 一括処理）に割り当てる
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._global_requests = _per_minute_bucket(_worker_share(LLM_GLOBAL_REQUESTS_PER_MINUTE))
+        self._global_tokens = _per_minute_bucket(_worker_share(LLM_GLOBAL_TOKENS_PER_MINUTE))
+        self.max_concurrency = _worker_share(LLM_MAX_CONCURRENCY)
+        self.bulk_max_concurrency = min(self.max_concurrency, _worker_share(LLM_BULK_MAX_CONCURRENCY))
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._running_bulk = 0
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+
+        self._rejected = 0
+        self._timed_out = 0
+
+    def _get_user_buckets(self, user_key: str) -> Tuple[TokenBucket, TokenBucket]:
+        buckets = self._user_buckets.get(user_key)
+        if buckets is None:
+            if len(self._user_buckets) >= LLM_USER_BUCKETS_MAX:
+                # 古いものから破棄（dictは挿入順）
+                self._user_buckets.pop(next(iter(self._user_buckets)))
+            buckets = (
+                _per_minute_bucket(LLM_USER_REQUESTS_PER_MINUTE),
+                _per_minute_bucket(LLM_USER_TOKENS_PER_MINUTE),
+            )
+            self._user_buckets[user_key] = buckets
+        return buckets
+
+    def _take(self, buckets: List[Tuple[TokenBucket, float]], scope: str):
+        """全バケットから同時に消費する（どれか1つでも不足なら消費せずに拒否）"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(bucket.wait_time(amount, now) for bucket, amount in buckets)
+            if wait > 0:
+                self._rejected += 1
+                raise RateLimitExceeded(f"{scope} rate limit exceeded", wait)
+            for bucket, amount in buckets:
+                bucket.consume(amount)
+
+    def _refund(self, buckets: List[Tuple[TokenBucket, float]]):
+        with self._lock:
+            for bucket, amount in buckets:
+                bucket.refund(amount)
+
+    def check_user(self, user_key: Optional[str], tokens: int):
+        """ユーザー単位のレート制限（共有された呼び出しも1リクエストとして数える）"""
+        if not user_key:
+            return
+        with self._lock:
+            requests_bucket, tokens_bucket = self._get_user_buckets(user_key)
+        self._take([(requests_bucket, 1), (tokens_bucket, tokens)], "user")
+
+    def _can_run(self, priority: int) -> bool:
+        if self._running >= self.max_concurrency:
+            return False
+        if priority == PRIORITY_ORDER[PRIORITY_BULK] and self._running_bulk >= self.bulk_max_concurrency:
+            return False
+        return True
+
+    @contextmanager
+    def upstream_slot(self, priority_class: str, tokens: int):
+        """
+        OpenAIへの実際の呼び出し1件分の実行枠を確保する
+        全体のレート制限を確認した上で、優先度順に同時実行枠を割り当てる
+        実行枠を待ちきれずに拒否した場合は、消費した全体のレート制限の枠を返す
+        """
+        charged = [(self._global_requests, 1), (self._global_tokens, tokens)]
+        self._take(charged, "global")
+
+        priority = PRIORITY_ORDER.get(priority_class, PRIORITY_ORDER[PRIORITY_BULK])
+        entry = (priority, next(self._seq))
+        deadline = time.monotonic() + LLM_MAX_QUEUE_WAIT_SECONDS
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                # 自分が先頭（最優先）かつ空き枠がある場合のみ実行する
+                while not (self._waiters[0] == entry and self._can_run(priority)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timed_out += 1
+                        self._refund(charged)
+                        raise RateLimitExceeded("LLM queue wait timed out", LLM_MAX_QUEUE_WAIT_SECONDS / 2)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # 先頭が入れ替わった可能性があるため待機者を起こす
+                self._cond.notify_all()
+
+            self._running += 1
+            if priority == PRIORITY_ORDER[PRIORITY_BULK]:
+                self._running_bulk += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                if priority == PRIORITY_ORDER[PRIORITY_BULK]:
+                    self._running_bulk -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """実行中・待機中の件数や拒否数を返す"""
+        with self._cond:
+            return {
+                "running": self._running,
+                "running_bulk": self._running_bulk,
+                "waiting": len(self._waiters),
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+
+llm_scheduler = LLMScheduler()
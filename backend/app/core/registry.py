@@ -0,0 +1,64 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    重いクライアント（boto3 / OpenAI など）を初回利用時に作成して保持する
+    各モジュールは import 時に register で作り方だけを登録し、使う時に get で取得する
+    （import 時に作成しないことで、起動・テスト収集を速くし、未設定の外部サービスで起動が失敗しないようにする）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._creating: Dict[str, threading.Lock] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._creating.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        try:
+            creating = self._creating[name]
+        except KeyError:
+            raise KeyError(f"Service not registered: {name}") from None
+        # 同じサービスの同時作成を防ぐ（他のサービスの作成は待たせない）
+        with creating:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self._instances[name] = instance
+                logger.debug(f"[Registry] Created {name} in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return instance
+
+    def override(self, name: str, instance: Any):
+        """作成済みのインスタンスを差し替える（テスト・ベンチマーク用）"""
+        with self._lock:
+            self._creating.setdefault(name, threading.Lock())
+            self._instances[name] = instance
+
+    def reset(self, name: str):
+        """作成済みのインスタンスを破棄する（次の get で作り直す）"""
+        with self._lock:
+            self._instances.pop(name, None)
+
+    def created(self) -> List[str]:
+        return list(self._instances)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._factories)
+
+
+services = ServiceRegistry()
@@ -1,6 +1,8 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
+from typing import Optional, Tuple
+from jose import JWTError, ExpiredSignatureError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 import os
@@ -13,8 +15,26 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))  # デフォルト60分
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))  # デフォルト7日
 
+# bcryptのコスト（work factor）。変更するとログイン時に既存ハッシュを新しいコストで再ハッシュする
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt計算用スレッド数の上限（CPUコア数を超えて並列化しても速くならない）
+PASSWORD_HASH_MAX_WORKERS = int(os.getenv("PASSWORD_HASH_MAX_WORKERS", str(os.cpu_count() or 1)))
+
 # パスワードハッシュ化の設定 (Bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max を同じ値にすることで、コストが異なるハッシュは needs_update 扱いになる
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt専用の実行プール（リクエスト処理スレッドやイベントループを塞がないように分離する）
+_password_hash_executor = ThreadPoolExecutor(
+    max_workers=max(1, PASSWORD_HASH_MAX_WORKERS),
+    thread_name_prefix="password-hash",
+)
 
 # ===== パスワードユーティリティ =====
 
@@ -24,6 +44,22 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """パスワードを検証し、コストが変わっていれば新しいハッシュも返す（不要なら None）"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def _run_password_hash(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_hash_executor, fn, *args)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash をbcrypt専用プールで実行"""
+    return await _run_password_hash(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password をbcrypt専用プールで実行"""
+    return await _run_password_hash(verify_and_update_password, plain_password, hashed_password)
+
 # ===== JWTユーティリティ =====
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -52,28 +88,14 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def decode_access_token(token: str) -> Optional[dict]:
+    """アクセストークンを検証してペイロードを返す（署名・有効期限を1回のデコードで検証）"""
     try:
-        logger.info(f"Decoding token with SECRET_KEY: {SECRET_KEY[:10]}...")
-        # options で exp チェックを無効化して、トークンの内容を確認
-        payload_no_verify = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
-        logger.info(f"Token payload (no verify): {payload_no_verify}")
-        
-        if "exp" in payload_no_verify:
-            exp_timestamp = payload_no_verify["exp"]
-            exp_datetime = datetime.fromtimestamp(exp_timestamp)
-            now = datetime.utcnow()
-            logger.info(f"Token expiration: {exp_datetime}, Current time: {now}")
-            
-            if exp_datetime < now:
-                logger.error(f"Token has expired. Expired at: {exp_datetime}, Current: {now}")
-                return None
-        
-        # 正常にデコード
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.info(f"Successfully decoded payload: {payload}")
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except ExpiredSignatureError:
+        logger.info("Access token has expired")
+        return None
     except JWTError as e:
-        logger.error(f"JWT decode error: {e}")
+        logger.warning(f"JWT decode error: {e}")
         return None
 
 def decode_refresh_token(token: str) -> Optional[dict]:
@@ -0,0 +1,24 @@
+from functools import lru_cache
+from typing import Any, List, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """List[model] の検証・シリアライズ用アダプター（型ごとに1回だけ作成）"""
+    return TypeAdapter(List[model])
+
+
+def model_list_response(model: Type[BaseModel], items: Any, status_code: int = 200) -> Response:
+    """
+    一覧を1回の検証と1回のシリアライズで JSON レスポンスにする
+    items は model のインスタンスまたは ORM オブジェクト（from_attributes で読み取る）のリスト
+    Response を返すため FastAPI の response_model による再検証・jsonable_encoder は行われない
+    （出力は response_model と同じ形式、by_alias で出力。response_model は OpenAPI 用にそのまま指定する）
+    """
+    adapter = list_adapter(model)
+    validated = adapter.validate_python(items, from_attributes=True)
+    return Response(content=adapter.dump_json(validated, by_alias=True), status_code=status_code,
+                    media_type="application/json")
@@ -0,0 +1,177 @@
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.models.users import User
+
+logger = logging.getLogger(__name__)
+
+# 認証済みユーザーのキャッシュ有効期間（秒）。0でキャッシュ無効
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+# キャッシュの破棄を他のプロセス（gunicorn の各ワーカー）に伝える方法
+#   notify: PostgreSQL の LISTEN/NOTIFY で伝える（受信できない間はキャッシュを使わない）
+#   local : 伝えない（単一プロセス用、他のプロセスでは最大 TTL の間古い値が残る）
+USER_CACHE_INVALIDATION = os.getenv("USER_CACHE_INVALIDATION", "notify")
+USER_CACHE_CHANNEL = "user_cache_invalidate"
+
+
+def _detached_copy(user: User) -> User:
+    """セッションに紐づかないUserのコピーを作成（セッション終了後も属性を参照できるように）"""
+    return User(**user.model_dump())
+
+
+class UserCache:
+    """
+    プロセス内のユーザーキャッシュ（user_id → User、TTL付きLRU）
+    get_current_user の毎リクエストのSELECTを省略するために使用する
+    ユーザーの更新・削除時は invalidate で破棄する（listener があれば他のプロセスにも伝える）
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int, listener: Optional["InvalidationListener"] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.listener = listener
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[float, User]]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[User]:
+        if self.ttl_seconds <= 0:
+            return None
+        if self.listener is not None and not self.listener.ready():
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return _detached_copy(user)
+
+    def set(self, user: User):
+        if self.ttl_seconds <= 0 or user.id is None:
+            return
+        if self.listener is not None:
+            self.listener.ensure_started(self)
+        cached = _detached_copy(user)
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, cached)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, broadcast: bool = True):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if broadcast and self.listener is not None:
+            self.listener.publish(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class InvalidationListener:
+    """
+    PostgreSQL の LISTEN/NOTIFY でキャッシュの破棄をプロセス間に伝える
+    受信用の接続はプロセスごとに1本（fork後の子プロセスでは作り直す）
+    接続が切れている間に届いた通知は受け取れないため、その間はキャッシュを使わず、再接続時に全て破棄する
+    """
+
+    def __init__(self, channel: str = USER_CACHE_CHANNEL, poll_seconds: float = 5.0):
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._connected = threading.Event()
+        self._connected_at = 0.0
+
+    @staticmethod
+    def _engine():
+        from app.db.base import engine
+        return engine
+
+    def ready(self) -> bool:
+        return self._pid == os.getpid() and self._connected.is_set()
+
+    def ensure_started(self, cache: UserCache):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._connected = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(cache,), name="user-cache-listener", daemon=True
+            )
+            self._thread.start()
+
+    def publish(self, user_id: int):
+        from sqlalchemy import text
+
+        try:
+            with self._engine().connect() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": self.channel, "payload": str(user_id)})
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"[UserCache] Failed to publish invalidation for user {user_id}: {e}")
+
+    def _listen(self, cache: UserCache):
+        # プールから切り離した専用の接続で LISTEN する
+        raw = self._engine().raw_connection()
+        conn = raw.driver_connection
+        raw.detach()
+        try:
+            conn.rollback()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {self.channel}")
+            # 接続していない間の破棄は受け取れていないため、手元のキャッシュを捨ててから使い始める
+            cache.clear()
+            self._connected_at = time.monotonic()
+            self._connected.set()
+            while True:
+                if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        cache.invalidate(int(notify.payload), broadcast=False)
+                    except ValueError:
+                        cache.clear()
+        finally:
+            self._connected.clear()
+            conn.close()
+
+    def _run(self, cache: UserCache):
+        backoff = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                self._listen(cache)
+            except Exception as e:
+                logger.warning(f"[UserCache] Invalidation listener disconnected: {e}")
+            # 一度つながった後の切断なら待ち時間を戻す
+            backoff = 1.0 if self._connected_at >= started else min(backoff * 2, 30.0)
+            time.sleep(backoff)
+
+
+def _create_listener() -> Optional[InvalidationListener]:
+    if USER_CACHE_INVALIDATION != "notify" or USER_CACHE_TTL_SECONDS <= 0:
+        return None
+    if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+        return None
+    return InvalidationListener()
+
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE, _create_listener())
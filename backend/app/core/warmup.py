@@ -0,0 +1,71 @@
+import logging
+import os
+import time
+from typing import List
+
+from sqlalchemy import text
+
+from app.core.registry import services
+
+logger = logging.getLogger(__name__)
+
+# 起動時に接続しておくDBコネクション数（0 で無効、プールサイズが上限）
+STARTUP_WARMUP_DB_CONNECTIONS = int(os.getenv("STARTUP_WARMUP_DB_CONNECTIONS", "0"))
+# 起動時にPDFエクスポート用の日本語フォントを読み込むか（初回エクスポートの待ち時間を無くす）
+STARTUP_PRELOAD_FONTS = os.getenv("STARTUP_PRELOAD_FONTS", "false").lower() == "true"
+# 起動時に作成しておくサービス（カンマ区切り、例: "s3,llm_transport"、app/core/registry.py）
+STARTUP_PRELOAD_SERVICES = [name.strip() for name in os.getenv("STARTUP_PRELOAD_SERVICES", "").split(",") if name.strip()]
+
+
+def warm_up_db_pool(count: int):
+    """count 本の接続を同時に確保してプールに戻す（初回リクエストで接続を待たせない）"""
+    from app.db.base import engine
+
+    count = min(count, engine.pool.size())
+    connections = []
+    try:
+        for _ in range(count):
+            conn = engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
+    return len(connections)
+
+
+def warm_up_services(names: List[str]):
+    for name in names:
+        services.get(name)
+
+
+def run_startup_warmup():
+    """
+    起動時のウォームアップ（各ワーカーの startup で実行、既定はすべて無効）
+    失敗しても起動は止めない（初回利用時に改めて作成される）
+    """
+    if STARTUP_WARMUP_DB_CONNECTIONS > 0:
+        started = time.perf_counter()
+        try:
+            connected = warm_up_db_pool(STARTUP_WARMUP_DB_CONNECTIONS)
+            logger.info(f"[Warmup] Connected {connected} DB connections in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            logger.warning(f"[Warmup] DB warm-up failed: {e}")
+
+    if STARTUP_PRELOAD_FONTS:
+        started = time.perf_counter()
+        try:
+            from app.services.pdf_export_service import preload_fonts
+
+            font_name = preload_fonts()
+            logger.info(f"[Warmup] Loaded font {font_name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            logger.warning(f"[Warmup] Font preload failed: {e}")
+
+    for name in STARTUP_PRELOAD_SERVICES:
+        started = time.perf_counter()
+        try:
+            warm_up_services([name])
+            logger.info(f"[Warmup] Created service {name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            logger.warning(f"[Warmup] Service {name} failed: {e}")
@@ -1 +1 @@
-from . import user, document, document_file, highlight, highlight_rect, comment
\ No newline at end of file
+from . import user, document, document_file, highlight, highlight_rect, comment, llm_job, content_version, search
\ No newline at end of file
@@ -1,12 +1,16 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from sqlmodel import Session, select
 from app.models.comments import Comment
+from app.models.documents import Document
+from app.models.document_files import DocumentFile
+from app.models.highlights import Highlight
 from app.models.llm_comment_metadata import LLMCommentMetadata
 from app.schemas.comment import CommentCreate, CommentUpdate
 from app.schemas.llm_comment_metadata import LLMCommentMetadataCreate
 import logging
 from datetime import datetime
 from app.utils.constants import LLM_AUTHOR, LLM_AUTHOR_LOWER
+from app.utils.pagination import DEFAULT_PAGE_SIZE, apply_keyset, split_page
 from app.crud import llm_comment_metadata as crud_llm_metadata
 
 logger = logging.getLogger(__name__)
@@ -36,9 +40,29 @@ def create_comment(session: Session, comment_in: CommentCreate) -> Comment:
     session.refresh(db_comment)
     return db_comment
 
-def get_comments_by_user(session: Session, user_id: int) -> List[Comment]:
-    statement = select(Comment).where(Comment.author == user_id)
-    return session.exec(statement).all()
+def _owned_by(statement, owner_id: int):
+    """ハイライトを join 済みの statement を、owner_id のユーザーの（削除されていない）ドキュメントに絞る"""
+    return (
+        statement
+        .join(DocumentFile, DocumentFile.id == Highlight.document_file_id)
+        .join(Document, Document.id == DocumentFile.document_id)
+        .where(Document.user_id == owner_id, Document.deleted_at.is_(None))
+    )
+
+def get_comments_page_by_user(
+    session: Session, author: str, owner_id: int, cursor: Optional[str] = None,
+    limit: Optional[int] = DEFAULT_PAGE_SIZE
+) -> Tuple[List[Comment], Optional[str]]:
+    """
+    投稿者のコメントを作成順に1ページ分取得し、(コメント, 次ページのカーソル) を返す
+    owner_id のユーザーのドキュメントに付いたコメントだけを対象にする
+    """
+    statement = _owned_by(
+        select(Comment).join(Highlight, Highlight.id == Comment.highlight_id).where(Comment.author == author),
+        owner_id,
+    )
+    statement = apply_keyset(statement, Comment, cursor, limit)
+    return split_page(session.exec(statement).all(), limit)
 
 def get_comment_by_id(session: Session, comment_id: int) -> Optional[Comment]:
     return session.get(Comment, comment_id)
@@ -51,9 +75,23 @@ def get_comments_by_highlight_id(session: Session, highlight_id: int) -> Optiona
     statement = select(Comment).where(Comment.highlight_id == highlight_id)
     return session.exec(statement).all()
 
-def get_comments_by_file(session: Session, file_id: int) -> List[Comment]:
-    statement = select(Comment).where(Comment.document_file_id == file_id)
-    return session.exec(statement).all()
+def get_comments_page_by_file(
+    session: Session, file_id: int, owner_id: int, cursor: Optional[str] = None,
+    limit: Optional[int] = DEFAULT_PAGE_SIZE
+) -> Tuple[List[Comment], Optional[str]]:
+    """
+    ファイル内のハイライトに付いたコメントを作成順に1ページ分取得し、(コメント, 次ページのカーソル) を返す
+    子コメントは作成時に親と同じハイライトに属することを確認しているため、highlight_id で辿れる
+    ファイルが owner_id のユーザーのドキュメントでなければ空を返す
+    """
+    statement = _owned_by(
+        select(Comment)
+        .join(Highlight, Highlight.id == Comment.highlight_id)
+        .where(Highlight.document_file_id == file_id),
+        owner_id,
+    )
+    statement = apply_keyset(statement, Comment, cursor, limit)
+    return split_page(session.exec(statement).all(), limit)
 
 def get_active_comments_by_highlight(session: Session, highlight_id: int) -> List[Comment]:
     """
@@ -109,6 +147,58 @@ def get_active_comments_by_highlight(session: Session, highlight_id: int) -> Lis
     
     return all_comments
 
+def get_active_comments_by_highlights(session: Session, highlight_ids: List[int]) -> Dict[int, List[Comment]]:
+    """
+    get_active_comments_by_highlight の複数ハイライト版（ハイライト数によらずクエリは最大3回）
+    ハイライトIDごとに ルートコメント（作成順） + 子コメント（作成順） を返す
+    """
+    comments_by_highlight: Dict[int, List[Comment]] = {highlight_id: [] for highlight_id in highlight_ids}
+    if not highlight_ids:
+        return comments_by_highlight
+
+    root_stmt = (
+        select(Comment)
+        .where(
+            Comment.highlight_id.in_(highlight_ids),
+            Comment.parent_id.is_(None)
+        )
+        .order_by(Comment.created_at, Comment.id)
+    )
+    root_comments = list(session.exec(root_stmt).all())
+    if not root_comments:
+        return comments_by_highlight
+
+    # 子コメントはルートコメントのハイライトに振り分ける（子の highlight_id が null でもよい）
+    highlight_of_root = {rc.id: rc.highlight_id for rc in root_comments}
+    child_stmt = (
+        select(Comment)
+        .where(Comment.parent_id.in_(list(highlight_of_root)))
+        .order_by(Comment.created_at, Comment.id)
+    )
+    child_comments = list(session.exec(child_stmt).all())
+
+    llm_child_ids = [c.id for c in child_comments if (c.author or "").strip().lower() == LLM_AUTHOR_LOWER]
+    excluded_ids: set[int] = set()
+    if llm_child_ids:
+        meta_stmt = (
+            select(LLMCommentMetadata.comment_id)
+            .where(
+                LLMCommentMetadata.comment_id.in_(llm_child_ids),
+                LLMCommentMetadata.deletion_reason.is_not(None)
+            )
+        )
+        excluded_ids = set(session.exec(meta_stmt).all())
+
+    for rc in root_comments:
+        comments_by_highlight[rc.highlight_id].append(rc)
+    for child in child_comments:
+        if child.id not in excluded_ids:
+            comments_by_highlight[highlight_of_root[child.parent_id]].append(child)
+
+    logger.info(f"[get_active_comments_by_highlights] highlights={len(highlight_ids)}: "
+                f"root={len(root_comments)}, children={len(child_comments) - len(excluded_ids)}")
+    return comments_by_highlight
+
 def update_comment(session: Session, comment: Comment, comment_in: CommentUpdate) -> Comment:
     update_data = comment_in.model_dump(exclude_unset=True)
     for key, value in update_data.items():
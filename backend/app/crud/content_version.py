@@ -0,0 +1,61 @@
+from typing import Optional
+from sqlalchemy import update
+from sqlmodel import Session, select
+from app.models import Document, DocumentFile, Highlight, Comment
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 版数（content_version）は読み取り側の ETag に使う
+# - ファイル単位: ハイライト・矩形・コメントの変更で増やす（/highlights/file/{id}, /comments/highlight/{id}）
+# - ドキュメント単位: フォーマット済みテキストの変更で増やす（/documents/{id}/formatted-text）
+# 書き込みをコミットした後に呼ぶ（先に増やすと、複数回コミットする処理の途中の内容が新しい版数で返ることがある）
+
+
+def bump_file_version(session: Session, file_id: int) -> None:
+    session.exec(
+        update(DocumentFile)
+        .where(DocumentFile.id == file_id)
+        .values(content_version=DocumentFile.content_version + 1)
+    )
+    session.commit()
+
+
+def bump_file_version_for_highlight(session: Session, highlight_id: int) -> None:
+    """ハイライトが属するファイルの版数を増やす"""
+    file_id = select(Highlight.document_file_id).where(Highlight.id == highlight_id).scalar_subquery()
+    session.exec(
+        update(DocumentFile)
+        .where(DocumentFile.id == file_id)
+        .values(content_version=DocumentFile.content_version + 1)
+    )
+    session.commit()
+
+
+def bump_file_version_for_comment(session: Session, comment_id: int) -> None:
+    """コメントが属するファイルの版数を増やす"""
+    highlight_id = session.exec(select(Comment.highlight_id).where(Comment.id == comment_id)).first()
+    if highlight_id is not None:
+        bump_file_version_for_highlight(session, highlight_id)
+
+
+def bump_document_version(session: Session, document_id: int) -> None:
+    session.exec(
+        update(Document)
+        .where(Document.id == document_id)
+        .values(content_version=Document.content_version + 1)
+    )
+    session.commit()
+
+
+def get_file_version(session: Session, file_id: int) -> Optional[int]:
+    return session.exec(select(DocumentFile.content_version).where(DocumentFile.id == file_id)).first()
+
+
+def get_file_version_for_highlight(session: Session, highlight_id: int) -> Optional[int]:
+    statement = (
+        select(DocumentFile.content_version)
+        .join(Highlight, Highlight.document_file_id == DocumentFile.id)
+        .where(Highlight.id == highlight_id)
+    )
+    return session.exec(statement).first()
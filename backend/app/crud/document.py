@@ -1,8 +1,9 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlmodel import Session, select
 from datetime import datetime
 from app.models import Document
 from app.schemas.document import DocumentCreate, DocumentUpdate
+from app.utils.pagination import DEFAULT_PAGE_SIZE, apply_keyset, split_page
 
 def create_document(session: Session, document_in: DocumentCreate) -> Document:
     db_document = Document(**document_in.model_dump())
@@ -25,12 +26,21 @@ def get_documents(session: Session, offset: int = 0, limit: int = 100) -> List[D
     ).offset(offset).limit(limit)
     return list(session.exec(statement).all())
 
-def get_documents_by_user(session: Session, user_id: int, offset: int = 0, limit: int = 100) -> List[Document]:
+def get_documents_page_by_user(
+    session: Session, user_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+) -> Tuple[List[Document], Optional[str]]:
+    """ユーザーのドキュメントを新しい順に1ページ分取得し、(ドキュメント, 次ページのカーソル) を返す"""
     statement = select(Document).where(
         Document.user_id == user_id,
         Document.deleted_at.is_(None)
-    ).offset(offset).limit(limit).order_by(Document.created_at.desc())
-    return list(session.exec(statement).all())
+    )
+    statement = apply_keyset(statement, Document, cursor, limit, descending=True)
+    return split_page(session.exec(statement).all(), limit)
+
+def get_documents_by_user(
+    session: Session, user_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+) -> List[Document]:
+    return get_documents_page_by_user(session, user_id, cursor, limit)[0]
 
 def get_document_by_name_and_user(session: Session, user_id: int, document_name: str) -> Optional[Document]:
     """特定ユーザーのドキュメント名でドキュメントを取得（重複チェック用）"""
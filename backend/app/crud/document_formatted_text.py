@@ -1,4 +1,6 @@
-from typing import Optional
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
 from sqlmodel import Session, select
 from datetime import datetime
 from app.models.document_formatted_text import DocumentFormattedText
@@ -38,3 +40,104 @@ def delete_formatted_text(session: Session, formatted_text: DocumentFormattedTex
     """フォーマット済みテキストを削除"""
     session.delete(formatted_text)
     session.commit()
+
+# チャンク単位の読み書き
+# formatted_data は {"<キー>": [{"id": 1, "text": "..."}, ...]} の形（LLMの出力によってキー名が変わる）
+# 本文全体をアプリに転送せず、JSONB の関数で必要なチャンクだけをDB側で取り出す・書き換える
+PREFERRED_CHUNK_KEYS = ("items", "chunks", "data", "results")
+
+def get_chunk_key(session: Session, document_id: int) -> Optional[str]:
+    """チャンク配列のキー（配列の値を持つトップレベルのキー。複数あれば PREFERRED_CHUNK_KEYS を優先）"""
+    statement = text(
+        "SELECT e.key FROM document_formatted_texts t, jsonb_each(t.formatted_data) AS e "
+        "WHERE t.document_id = :document_id AND jsonb_typeof(e.value) = 'array'"
+    ).bindparams(document_id=document_id)
+    keys = [row[0] for row in session.exec(statement).all()]
+    if not keys:
+        return None
+    for key in PREFERRED_CHUNK_KEYS:
+        if key in keys:
+            return key
+    return sorted(keys)[0]
+
+def get_chunk_range(
+    session: Session, document_id: int, start: int, limit: int
+) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    """チャンク配列の [start, start + limit) を (総数, チャンク) で返す（チャンク配列が無ければ None）"""
+    key = get_chunk_key(session, document_id)
+    if key is None:
+        return None
+    statement = text(
+        "SELECT jsonb_array_length(t.formatted_data -> :key), "
+        "jsonb_path_query_array(t.formatted_data -> :key, '$[$start to $last]', "
+        "jsonb_build_object('start', :start, 'last', :last)) "
+        "FROM document_formatted_texts t WHERE t.document_id = :document_id"
+    ).bindparams(key=key, start=start, last=start + limit - 1, document_id=document_id)
+    row = session.exec(statement).first()
+    if row is None:
+        return None
+    return row[0], row[1]
+
+# チャンク配列を1回だけ組み立て直して書き込む（チャンクごとに UPDATE すると、そのたびに本文全体の TOAST 値が書き直される）
+# 同じ id が複数あるチャンク配列では、従来どおり先頭のチャンクだけを更新する
+PATCH_CHUNKS_SQL = """
+WITH changes AS (
+    SELECT c.value AS patch, c.value ->> 'id' AS chunk_id, c.ord
+    FROM jsonb_array_elements(CAST(:changes AS jsonb)) WITH ORDINALITY AS c(value, ord)
+), elements AS (
+    SELECT e.value, e.ord
+    FROM document_formatted_texts s,
+         jsonb_array_elements(s.formatted_data -> :key) WITH ORDINALITY AS e(value, ord)
+    WHERE s.document_id = :document_id
+), targets AS (
+    SELECT DISTINCT ON (c.chunk_id) c.chunk_id, e.ord
+    FROM changes c JOIN elements e ON e.value ->> 'id' = c.chunk_id
+    ORDER BY c.chunk_id, e.ord
+), missing AS (
+    SELECT jsonb_agg(c.patch -> 'id' ORDER BY c.ord) AS ids
+    FROM changes c
+    WHERE NOT EXISTS (SELECT 1 FROM targets t WHERE t.chunk_id = c.chunk_id)
+), rebuilt AS (
+    SELECT jsonb_agg(CASE WHEN c.patch IS NULL THEN e.value ELSE e.value || c.patch END ORDER BY e.ord) AS chunks,
+           jsonb_agg(e.value || c.patch ORDER BY c.ord) FILTER (WHERE c.patch IS NOT NULL) AS updated
+    FROM elements e
+    LEFT JOIN targets t ON t.ord = e.ord
+    LEFT JOIN changes c ON c.chunk_id = t.chunk_id
+), written AS (
+    UPDATE document_formatted_texts AS t
+    SET formatted_data = jsonb_set(t.formatted_data, ARRAY[:key], r.chunks), updated_at = :now
+    FROM rebuilt r, missing m
+    WHERE t.document_id = :document_id AND m.ids IS NULL AND r.updated IS NOT NULL
+    RETURNING t.id
+)
+SELECT r.updated, m.ids, (SELECT count(*) FROM written)
+FROM rebuilt r, missing m
+"""
+
+def patch_chunks(
+    session: Session, document_id: int, changes: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    id が一致するチャンクに changes の各要素をマージする（1回の UPDATE。他のチャンクは転送しない）
+    同じ id の変更が複数あれば、先に並んだものから順にマージする
+    1つでも見つからない id があれば何も更新せず、(空リスト, 見つからない id) を返す
+    成功時は (更新後のチャンク, 空リスト)
+    """
+    key = get_chunk_key(session, document_id)
+    if key is None:
+        return [], [change["id"] for change in changes]
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    for change in changes:
+        merged.setdefault(str(change["id"]), {}).update(change)
+
+    row = session.exec(text(PATCH_CHUNKS_SQL).bindparams(
+        changes=json.dumps(list(merged.values()), ensure_ascii=False),
+        key=key, document_id=document_id, now=datetime.utcnow(),
+    )).first()
+    updated, missing, _ = row
+    if missing:
+        session.rollback()
+        return [], missing
+    session.commit()
+    return updated or [], []
@@ -1,8 +1,10 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from sqlalchemy import exists, func, or_, text
 from sqlmodel import Session, select
 from app.models.highlights import Highlight
 from app.models.highlight_rects import HighlightRect
 from app.schemas.highlight import HighlightCreate, HighlightUpdate
+from app.utils.pagination import apply_keyset, split_page
 
 def create_highlight(session: Session, highlight_in: HighlightCreate) -> Highlight:
     db_highlight = Highlight(**highlight_in.model_dump())
@@ -16,9 +18,70 @@ def get_highlight_by_id(session: Session, highlight_id: int) -> Optional[Highlig
     statement = select(Highlight).where(Highlight.id == highlight_id)
     return session.exec(statement).first()
 
-def get_highlights_by_file(session: Session, file_id: int) -> List[Highlight]:
+def _rects_filter(pages: Optional[List[Tuple[int, int]]], bbox: Optional[Tuple[float, float, float, float]]):
+    """指定ページ（と矩形範囲）に矩形を持つハイライトに絞る EXISTS 条件（highlight_rects と packed 形式の両方を見る）"""
+    conditions = [HighlightRect.highlight_id == Highlight.id]
+    if pages:
+        conditions.append(or_(*[HighlightRect.page_num.between(first, last) for first, last in pages]))
+    if bbox:
+        x1, y1, x2, y2 = bbox
+        # box は角の順序を正規化するため、x1 > x2 のような矩形でも重なりを正しく判定できる
+        rect_box = func.box(func.point(HighlightRect.x1, HighlightRect.y1), func.point(HighlightRect.x2, HighlightRect.y2))
+        conditions.append(rect_box.op("&&")(func.box(func.point(x1, y1), func.point(x2, y2))))
+    return or_(exists().where(*conditions), _packed_rects_filter(pages, bbox))
+
+def _packed_rects_filter(pages: Optional[List[Tuple[int, int]]], bbox: Optional[Tuple[float, float, float, float]]):
+    """_rects_filter の packed 形式（highlights.rect_pages / rect_coords）の分。i 番目の矩形の座標は rect_coords[4i-3:4i]"""
+    conditions = []
+    params = {}
+    if pages:
+        ranges = []
+        for index, (first, last) in enumerate(pages):
+            ranges.append(f"r.page BETWEEN :packed_first_{index} AND :packed_last_{index}")
+            params[f"packed_first_{index}"] = first
+            params[f"packed_last_{index}"] = last
+        conditions.append("(" + " OR ".join(ranges) + ")")
+    if bbox:
+        conditions.append(
+            "box(point(highlights.rect_coords[4 * r.i - 3], highlights.rect_coords[4 * r.i - 2]), "
+            "point(highlights.rect_coords[4 * r.i - 1], highlights.rect_coords[4 * r.i])) "
+            "&& box(point(:packed_x1, :packed_y1), point(:packed_x2, :packed_y2))"
+        )
+        params.update(zip(("packed_x1", "packed_y1", "packed_x2", "packed_y2"), bbox))
+    return text(
+        "highlights.rect_pages IS NOT NULL AND EXISTS ("
+        "SELECT 1 FROM unnest(highlights.rect_pages) WITH ORDINALITY AS r(page, i) "
+        f"WHERE {' AND '.join(conditions)})"
+    ).bindparams(**params)
+
+def get_highlights_page_by_file(
+    session: Session,
+    file_id: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    pages: Optional[List[Tuple[int, int]]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> Tuple[List[Highlight], Optional[str]]:
+    """
+    ファイルのハイライトを作成順に取得し、(ハイライト, 次ページのカーソル) を返す
+    limit=None の場合はカーソル以降をすべて返す（PDF出力など全件が必要な呼び出し用）
+    pages / bbox を指定すると、そのページ範囲（と矩形範囲）に矩形を1つ以上持つハイライトだけを返す
+    """
     statement = select(Highlight).where(Highlight.document_file_id == file_id)
-    return session.exec(statement).all()
+    if pages or bbox:
+        statement = statement.where(_rects_filter(pages, bbox))
+    statement = apply_keyset(statement, Highlight, cursor, limit)
+    return split_page(session.exec(statement).all(), limit)
+
+def get_highlights_by_file(
+    session: Session,
+    file_id: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    pages: Optional[List[Tuple[int, int]]] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> List[Highlight]:
+    return get_highlights_page_by_file(session, file_id, cursor, limit, pages, bbox)[0]
 
 def update_highlight(session: Session, highlight: Highlight, highlight_in: HighlightUpdate) -> Highlight:
     update_data = highlight_in.model_dump(exclude_unset=True)
@@ -1,7 +1,9 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlmodel import Session, select
+from app.models.highlights import Highlight
 from app.models.highlight_rects import HighlightRect
 from app.schemas.highlight_rect import HighlightRectCreate, HighlightRectUpdate
+from app.utils.rect_packing import is_packed, pack_rects, unpack_highlight_rects, use_packed_storage
 
 def create_highlight_rect(session: Session, rect_in: HighlightRectCreate) -> HighlightRect:
     db_rect = HighlightRect(**rect_in.model_dump())
@@ -10,15 +12,68 @@ def create_highlight_rect(session: Session, rect_in: HighlightRectCreate) -> Hig
     session.refresh(db_rect)
     return db_rect
 
+def create_highlight_rects(session: Session, highlight: Highlight, rects_in: List[HighlightRectCreate]) -> List[HighlightRect]:
+    """
+    ハイライトの矩形をまとめて保存する（コミットは1回）
+    HIGHLIGHT_RECT_STORAGE=packed の場合は highlight_rects に行を作らず、ハイライトの配列列に保存する
+    """
+    if use_packed_storage():
+        highlight.rect_pages, highlight.rect_coords, highlight.rect_types = pack_rects(rects_in)
+        session.add(highlight)
+        session.commit()
+        # float4 に丸められた保存後の座標を返す
+        session.refresh(highlight)
+        return unpack_highlight_rects(highlight)
+
+    db_rects = [HighlightRect(**rect_in.model_dump()) for rect_in in rects_in]
+    session.add_all(db_rects)
+    session.commit()
+    for db_rect in db_rects:
+        session.refresh(db_rect)
+    return db_rects
+
 def get_rect_by_id(session: Session, rect_id: int) -> Optional[HighlightRect]:
     """単一 ID による取得"""
     statement = select(HighlightRect).where(HighlightRect.id == rect_id)
     return session.exec(statement).first()
 
 def get_rects_by_highlight(session: Session, highlight_id: int) -> List[HighlightRect]:
-    """ハイライトに紐づく全矩形を取得"""
+    """ハイライトに紐づく全矩形を取得（packed 形式で保存されたハイライトにも対応）"""
     statement = select(HighlightRect).where(HighlightRect.highlight_id == highlight_id)
-    return session.exec(statement).all()
+    rects = session.exec(statement).all()
+    if rects:
+        return rects
+    highlight = session.get(Highlight, highlight_id)
+    if highlight is not None and is_packed(highlight):
+        return unpack_highlight_rects(highlight)
+    return rects
+
+def get_rects_by_highlights(session: Session, highlight_ids: List[int]) -> Dict[int, List[HighlightRect]]:
+    """複数ハイライトの矩形を1回のクエリで取得し、ハイライトIDごとにまとめる"""
+    rects_by_highlight: Dict[int, List[HighlightRect]] = {highlight_id: [] for highlight_id in highlight_ids}
+    if not highlight_ids:
+        return rects_by_highlight
+    statement = (
+        select(HighlightRect)
+        .where(HighlightRect.highlight_id.in_(highlight_ids))
+        .order_by(HighlightRect.highlight_id, HighlightRect.id)
+    )
+    for rect in session.exec(statement).all():
+        rects_by_highlight[rect.highlight_id].append(rect)
+    return rects_by_highlight
+
+def get_rects_for_highlights(session: Session, highlights: List[Highlight]) -> Dict[int, List[HighlightRect]]:
+    """
+    取得済みのハイライトの矩形をハイライトIDごとにまとめる
+    packed 形式のハイライトは配列列から復元し、highlight_rects は残りのハイライトの分だけ1回のクエリで取得する
+    """
+    rects_by_highlight = get_rects_by_highlights(
+        session, [highlight.id for highlight in highlights if not is_packed(highlight)]
+    )
+    for highlight in highlights:
+        if is_packed(highlight):
+            rects_by_highlight[highlight.id] = unpack_highlight_rects(highlight)
+    return rects_by_highlight
 
 def update_highlight_rect(session: Session, rect: HighlightRect, rect_in: HighlightRectUpdate) -> HighlightRect:
     update_data = rect_in.model_dump(exclude_unset=True)
@@ -0,0 +1,148 @@
+from typing import List, Optional
+from sqlmodel import Session, select
+from datetime import datetime, timedelta
+from app.models.llm_jobs import LLMJob
+from app.schemas.llm_job import LLMJobCreate
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+
+def create_job(session: Session, user_id: int, job_in: LLMJobCreate) -> LLMJob:
+    """LLMジョブをキューに投入"""
+    db_job = LLMJob(
+        user_id=user_id,
+        document_id=job_in.document_id,
+        job_type=job_in.job_type,
+        payload=job_in.payload,
+        status=JOB_STATUS_QUEUED,
+    )
+    session.add(db_job)
+    session.commit()
+    session.refresh(db_job)
+    logger.info(f"[CRUD] LLM job queued: id={db_job.id}, type={db_job.job_type}, document_id={db_job.document_id}")
+    return db_job
+
+def get_job(session: Session, job_id: int) -> Optional[LLMJob]:
+    """IDでジョブを取得"""
+    return session.get(LLMJob, job_id)
+
+def get_jobs_by_document(session: Session, document_id: int, job_type: Optional[str] = None) -> List[LLMJob]:
+    """ドキュメントに紐づくジョブ一覧を取得（作成日時の降順）"""
+    statement = select(LLMJob).where(LLMJob.document_id == document_id)
+    if job_type:
+        statement = statement.where(LLMJob.job_type == job_type)
+    statement = statement.order_by(LLMJob.created_at.desc(), LLMJob.id.desc())
+    return list(session.exec(statement).all())
+
+def claim_next_job(session: Session, worker_id: str) -> Optional[LLMJob]:
+    """
+    queued のジョブを1件取得して running にする
+    FOR UPDATE SKIP LOCKED により、複数ワーカーが同じジョブを取得することはない
+    """
+    statement = (
+        select(LLMJob)
+        .where(LLMJob.status == JOB_STATUS_QUEUED)
+        .order_by(LLMJob.created_at, LLMJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = session.exec(statement).first()
+    if not job:
+        session.rollback()
+        return None
+
+    now = datetime.utcnow()
+    job.status = JOB_STATUS_RUNNING
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.started_at = now
+    job.updated_at = now
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+def complete_job(session: Session, job: LLMJob, result: dict) -> LLMJob:
+    """ジョブを成功として結果を保存"""
+    now = datetime.utcnow()
+    job.status = JOB_STATUS_SUCCEEDED
+    job.result = result
+    job.error = None
+    job.locked_by = None
+    job.finished_at = now
+    job.updated_at = now
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+def fail_job(session: Session, job: LLMJob, error: str) -> LLMJob:
+    """
+    ジョブの失敗を記録
+    - 試行回数が上限未満なら queued に戻して再実行させる
+    - 上限に達した場合は failed とする
+    """
+    now = datetime.utcnow()
+    job.error = error
+    job.locked_by = None
+    job.updated_at = now
+    if job.attempts < job.max_attempts:
+        job.status = JOB_STATUS_QUEUED
+    else:
+        job.status = JOB_STATUS_FAILED
+        job.finished_at = now
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+def release_job(session: Session, job: LLMJob) -> LLMJob:
+    """
+    レート制限などで実行できなかったジョブを queued に戻す
+    実行していないため試行回数には数えない
+    """
+    job.status = JOB_STATUS_QUEUED
+    job.attempts = max(0, job.attempts - 1)
+    job.locked_by = None
+    job.started_at = None
+    job.updated_at = datetime.utcnow()
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+def requeue_stale_jobs(session: Session, timeout_seconds: int) -> int:
+    """
+    ワーカーの異常終了などで running のまま残ったジョブを queued に戻す
+    戻した件数を返す
+    """
+    threshold = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+    statement = (
+        select(LLMJob)
+        .where(
+            LLMJob.status == JOB_STATUS_RUNNING,
+            LLMJob.started_at < threshold
+        )
+        .with_for_update(skip_locked=True)
+    )
+    stale_jobs = list(session.exec(statement).all())
+    for job in stale_jobs:
+        now = datetime.utcnow()
+        job.error = "ワーカーの処理がタイムアウトしました"
+        job.locked_by = None
+        job.updated_at = now
+        if job.attempts < job.max_attempts:
+            job.status = JOB_STATUS_QUEUED
+        else:
+            job.status = JOB_STATUS_FAILED
+            job.finished_at = now
+        session.add(job)
+    session.commit()
+    if stale_jobs:
+        logger.warning(f"[CRUD] Requeued {len(stale_jobs)} stale LLM jobs")
+    return len(stale_jobs)
@@ -0,0 +1,113 @@
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlmodel import Session
+from app.utils.pagination import decode_ranked_cursor, encode_ranked_cursor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ハイライト本文・メモ・コメントの横断検索
+# - 絞り込みは2文字単位（bigram）の GIN 式インデックス（annotation_bigrams, alembic f1c6a9e3b7d4）で行い、
+#   annotation_search_text（NFKC正規化 + 小文字化）した本文に検索語が含まれるかを strpos で確かめる
+# - 1文字の検索語は bigram が作れないため、ユーザー（またはドキュメント）の範囲内を順に確かめる
+# - 削除理由が設定されたLLMコメント（ソフトデリート扱い、get_active_comments_by_highlight(s) と同じ）は対象にしない
+# - 結果はハイライト単位にまとめ、一致した箇所の重みの合計（SCORE_WEIGHTS）で並べる
+SCORE_WEIGHTS = {"text": 3, "memo": 2, "comment": 1}
+
+
+def _match(column: str, use_bigrams: bool) -> str:
+    # 多くの行は小文字化だけで一致するため、NFKC正規化（1行あたりの処理が重い）はそれで一致しない行だけに行う
+    # ASCII のみの行は正規化しても変わらないため、正規化は ASCII 以外の文字を含む行に限る
+    condition = (
+        f"(strpos(lower({column}), annotation_search_text(:query)) > 0 "
+        f"OR ({column} ~ '[^[:ascii:]]' "
+        f"AND strpos(annotation_search_text({column}), annotation_search_text(:query)) > 0))"
+    )
+    if use_bigrams:
+        # 検索語は定数として渡すため、annotation_bigrams(:query) は計画時に評価されインデックスが使われる
+        condition = f"annotation_bigrams({column}) @> annotation_bigrams(:query) AND {condition}"
+    return condition
+
+
+def search_annotations(
+    session: Session,
+    user_id: int,
+    query: str,
+    document_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    ユーザーのドキュメント（document_id 指定時はそのドキュメントのみ）から検索語を含むハイライトを探す
+    (結果, 次ページのカーソル) を返す。結果は score 降順、同点は新しい順
+    """
+    use_bigrams = len(query.strip()) >= 2
+    scope = (
+        "SELECT f.id FROM document_files f JOIN documents d ON d.id = f.document_id "
+        "WHERE d.user_id = :user_id AND d.deleted_at IS NULL"
+    )
+    params: Dict[str, Any] = {
+        "user_id": user_id,
+        "query": query.strip(),
+        "limit": limit + 1,
+        "w_text": SCORE_WEIGHTS["text"],
+        "w_memo": SCORE_WEIGHTS["memo"],
+        "w_comment": SCORE_WEIGHTS["comment"],
+    }
+    if document_id is not None:
+        scope += " AND d.id = :document_id"
+        params["document_id"] = document_id
+
+    after = ""
+    if cursor:
+        score, created_at, row_id = decode_ranked_cursor(cursor)
+        after = "WHERE (r.score, h.created_at, h.id) < (:after_score, :after_created_at, :after_id)"
+        params.update(after_score=score, after_created_at=created_at, after_id=row_id)
+
+    # 範囲（ファイル・ハイライト）は配列にして = ANY で渡し、bigram の GIN インデックスと
+    # ハイライト・コメントの複合インデックスの BitmapAnd で範囲内の候補だけを確かめる
+    statement = text(f"""
+        WITH files AS MATERIALIZED ({scope}),
+        scoped_highlights AS MATERIALIZED (
+            SELECT h.id FROM highlights h WHERE h.document_file_id = ANY (ARRAY(SELECT id FROM files))
+        ),
+        hits AS (
+            SELECT h.id AS highlight_id, :w_text AS weight, NULL::integer AS comment_id
+            FROM highlights h
+            WHERE h.document_file_id = ANY (ARRAY(SELECT id FROM files)) AND {_match("h.text", use_bigrams)}
+            UNION ALL
+            SELECT h.id, :w_memo, NULL
+            FROM highlights h
+            WHERE h.document_file_id = ANY (ARRAY(SELECT id FROM files)) AND {_match("h.memo", use_bigrams)}
+            UNION ALL
+            SELECT c.highlight_id, :w_comment, c.id
+            FROM comments c
+            WHERE c.highlight_id = ANY (ARRAY(SELECT id FROM scoped_highlights)) AND {_match("c.text", use_bigrams)}
+              AND NOT EXISTS (
+                  SELECT 1 FROM llm_comment_metadata m
+                  WHERE m.comment_id = c.id AND m.deletion_reason IS NOT NULL
+              )
+        ),
+        ranked AS (
+            SELECT highlight_id, sum(weight) AS score,
+                   array_agg(comment_id ORDER BY comment_id) FILTER (WHERE comment_id IS NOT NULL) AS comment_ids
+            FROM hits
+            GROUP BY highlight_id
+        )
+        SELECT h.id, h.document_file_id, f.document_id, h.text, h.memo, h.created_by, h.created_at,
+               r.score, coalesce(r.comment_ids, '{{}}'::integer[]) AS comment_ids
+        FROM ranked r
+        JOIN highlights h ON h.id = r.highlight_id
+        JOIN document_files f ON f.id = h.document_file_id
+        {after}
+        ORDER BY r.score DESC, h.created_at DESC, h.id DESC
+        LIMIT :limit
+    """).bindparams(**params)
+
+    rows = [dict(row._mapping) for row in session.exec(statement).all()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_ranked_cursor(last["score"], last["created_at"], last["id"])
+    return rows, next_cursor
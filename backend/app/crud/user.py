@@ -1,10 +1,17 @@
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 from sqlmodel import Session, select
 from datetime import datetime
 from app.models import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import (
+    get_password_hash,
+    verify_password,
+    get_password_hash_async,
+    verify_and_update_password_async,
+)
+from app.core.user_cache import user_cache
 
 import logging
 logger = logging.getLogger(__name__)
@@ -54,6 +61,39 @@ def authenticate_user_by_email(session: Session, email: str, password: str) -> O
     logger.info(f"Authentication flow: Successfully authenticated user: {email}")
     return user
 
+async def authenticate_user_by_email_async(session: Session, email: str, password: str) -> Optional[User]:
+    """
+    authenticate_user_by_email の非同期版
+    DBアクセスはスレッドプール、bcryptは専用プールで実行し、イベントループを塞がない
+    コスト（BCRYPT_ROUNDS）が変わっていれば、認証成功時に新しいコストで再ハッシュして保存する
+    """
+    user = await run_in_threadpool(get_user_by_email, session, email)
+    if not user:
+        logger.warning(f"Authentication flow: Email not found in DB: {email}")
+        return None
+
+    try:
+        is_password_valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    except Exception as e:
+        logger.error(f"Error during password verification for {email}", exc_info=True)
+        return None
+
+    if not is_password_valid:
+        logger.warning(f"Authentication flow: Password mismatch for user: {email}")
+        return None
+
+    if new_hash:
+        # 再ハッシュの保存に失敗してもログイン自体は成功させる（次回ログイン時に再試行される）
+        try:
+            await run_in_threadpool(update_password_hash, session, user, new_hash)
+            logger.info(f"Authentication flow: Rehashed password for user: {email}")
+        except Exception as e:
+            logger.warning(f"Authentication flow: Failed to rehash password for {email}: {e}")
+            await run_in_threadpool(session.rollback)
+
+    logger.info(f"Authentication flow: Successfully authenticated user: {email}")
+    return user
+
 def authenticate_user(session: Session, username: str, password: str) -> Optional[User]:
     """emailとパスワードで認証します。"""
 
@@ -83,8 +123,11 @@ def authenticate_user(session: Session, username: str, password: str) -> Optiona
     logger.info(f"Authentication flow: Successfully authenticated user: {username}")
     return user
 
-def create_user(session: Session, user_in: UserCreate) -> User:
-    """新しいユーザーを作成し、データベースに保存します。"""
+def create_user(session: Session, user_in: UserCreate, hashed_password: Optional[str] = None) -> User:
+    """
+    新しいユーザーを作成し、データベースに保存します。
+    hashed_password を渡した場合はハッシュ化を省略します（create_user_async から使用）。
+    """
 
     # メール重複チェック
     if get_user_by_email(session, user_in.email):
@@ -94,7 +137,8 @@ def create_user(session: Session, user_in: UserCreate) -> User:
         )
 
     # パスワードをハッシュ化
-    hashed_password = get_password_hash(user_in.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user_in.password)
 
     # UserCreateからUserモデルを作成
     user_data = user_in.model_dump(exclude={"password"})
@@ -110,6 +154,20 @@ def create_user(session: Session, user_in: UserCreate) -> User:
     session.refresh(db_user)
     return db_user
 
+async def create_user_async(session: Session, user_in: UserCreate) -> User:
+    """
+    create_user の非同期版（bcryptは専用プール、DBアクセスはスレッドプールで実行）
+    メール重複時に無駄なハッシュ計算をしないよう、先に重複チェックを行う
+    """
+    if await run_in_threadpool(get_user_by_email, session, user_in.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email is already registered"
+        )
+
+    hashed_password = await get_password_hash_async(user_in.password)
+    return await run_in_threadpool(create_user, session, user_in, hashed_password)
+
 def get_user_by_id(session: Session, user_id: int) -> Optional[User]:
     """IDに基づいてユーザーを取得します (論理削除されていないもの)。"""
     # 論理削除チェック
@@ -143,6 +201,17 @@ def update_user(session: Session, user: User, user_in: UserUpdate) -> User:
     session.refresh(user)
     return user
 
+def update_password_hash(session: Session, user: User, hashed_password: str) -> User:
+    """パスワードハッシュのみを更新します（ログイン時の再ハッシュ用）。"""
+    user.hashed_password = hashed_password
+    user.updated_at = datetime.utcnow()
+
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    user_cache.invalidate(user.id)
+    return user
+
 def delete_user(session: Session, user: User) -> User:
     """ユーザーを論理削除します。"""
     user.deleted_at = datetime.utcnow()
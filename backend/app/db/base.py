@@ -5,6 +5,8 @@ from sqlalchemy import event
 from dotenv import load_dotenv
 import os
 import logging
+from app.core.query_profiler import install_query_profiler
+from app.core.metrics import InstrumentedQueuePool, install_db_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +41,13 @@ engine = create_engine(
     echo=False,
     pool_pre_ping=True,
     pool_recycle=3600,
+    poolclass=InstrumentedQueuePool,
 )
 
+# リクエストごとのクエリ計測と、/metrics 用のクエリ数・プール状態の計測
+install_query_profiler(engine)
+install_db_metrics(engine)
+
 # PostgreSQL 接続時の文字コード設定
 @event.listens_for(engine, "connect")
 def set_charset(dbapi_conn, connection_record):
@@ -0,0 +1,49 @@
+# app/db/migration_ops.py
+# マイグレーション（alembic/versions）から使う補助関数
+from typing import List, Optional
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _drop_invalid_index(index_name: str):
+    """CONCURRENTLY の作成が途中で失敗すると INVALID なインデックスが残るため、作り直す前に削除する"""
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name},
+    ).first()
+    if invalid:
+        op.execute(sa.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"'))
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: List, unique: bool = False,
+                              postgresql_where: Optional[str] = None, **kw):
+    """
+    既存の大きなテーブルにインデックスを追加する（PostgreSQL では書き込みをロックしない CREATE INDEX CONCURRENTLY）
+    CONCURRENTLY はトランザクション内で実行できないため、autocommit で実行する
+    （それまでのマイグレーションはコミットされる。env.py は1リビジョンごとにトランザクションを分けている）
+    """
+    if postgresql_where is not None:
+        kw["postgresql_where"] = sa.text(postgresql_where)
+    if not _is_postgresql():
+        op.create_index(index_name, table_name, columns, unique=unique, **kw)
+        return
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(index_name)
+        op.create_index(index_name, table_name, columns, unique=unique,
+                        postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(index_name: str, table_name: str):
+    if not _is_postgresql():
+        op.drop_index(index_name, table_name=table_name)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
@@ -10,6 +10,7 @@ from .highlight_rects import HighlightRect
 from .comments import Comment
 from .llm_comment_metadata import LLMCommentMetadata
 from .document_formatted_text import DocumentFormattedText
+from .llm_jobs import LLMJob
 
 __all__ = [
   "User",
@@ -19,5 +20,6 @@ __all__ = [
   "HighlightRect",
   "Comment",
   "LLMCommentMetadata",
-  "DocumentFormattedText"
+  "DocumentFormattedText",
+  "LLMJob"
 ]
\ No newline at end of file
@@ -1,10 +1,15 @@
 from typing import List, Optional
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship, Column
-from sqlalchemy import String, Text, ForeignKey, Integer
+from sqlalchemy import String, Text, ForeignKey, Index, Integer
 
 class Comment(SQLModel, table=True):
     __tablename__ = "comments"
+    __table_args__ = (
+        # ハイライト・投稿者ごとの一覧のキーセットページネーション用
+        Index("ix_comments_highlight_id_created_at_id", "highlight_id", "created_at", "id"),
+        Index("ix_comments_author_created_at_id", "author", "created_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
 
@@ -21,6 +21,8 @@ class DocumentFile(SQLModel, table=True):
         default_factory=datetime.utcnow,
         nullable=False
     )
+    # ハイライト・コメントの変更ごとに増える版数（一覧の ETag に使う、app/crud/content_version.py）
+    content_version: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": "0"})
 
     # Relationship
     document: Optional["Document"] = Relationship(back_populates="document_file")
@@ -1,13 +1,15 @@
 from typing import Optional
 from datetime import datetime
-from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlmodel import SQLModel, Field, Relationship, Column
+from sqlalchemy.dialects.postgresql import JSONB
 
 class DocumentFormattedText(SQLModel, table=True):
     __tablename__ = "document_formatted_texts"
 
     id: Optional[int] = Field(default=None, primary_key=True)
     document_id: int = Field(foreign_key="documents.id", index=True)
-    formatted_data: dict = Field(sa_column=Column(JSON), description="フォーマット済みテキストデータ（JSON形式）")
+    # JSONB: チャンク単位の部分更新（jsonb_set）と範囲取得をDB側で行う（app/crud/document_formatted_text.py）
+    formatted_data: dict = Field(sa_column=Column(JSONB), description="フォーマット済みテキストデータ（JSON形式）")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
 
@@ -1,9 +1,15 @@
 from typing import List, Optional
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, text
 
 class Document(SQLModel, table=True):
     __tablename__ = "documents"
+    __table_args__ = (
+        # ユーザーごとの一覧のキーセットページネーション用（削除済みは一覧に出さないため部分インデックス）
+        Index("ix_documents_user_id_created_at_id", "user_id", "created_at", "id",
+              postgresql_where=text("deleted_at IS NULL")),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id")
@@ -12,6 +18,8 @@ class Document(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
     deleted_at: Optional[datetime] = None
+    # フォーマット済みテキストの変更ごとに増える版数（ETag に使う、app/crud/content_version.py）
+    content_version: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": "0"})
 
     # Relationship
     user: Optional["User"] = Relationship(back_populates="documents")
@@ -1,8 +1,13 @@
 from typing import Optional
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 
 class HighlightRect(SQLModel, table=True):
     __tablename__ = "highlight_rects"
+    __table_args__ = (
+        # ハイライトごとの矩形の取得と、ページ範囲での絞り込み（EXISTS）用
+        Index("ix_highlight_rects_highlight_id_page_num", "highlight_id", "page_num"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     highlight_id: int = Field(foreign_key="highlights.id")
@@ -1,14 +1,19 @@
 from typing import List, Optional
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship, Column
-from sqlalchemy import String, Text
+from sqlalchemy import Index, REAL, SmallInteger, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY
 
 class Highlight(SQLModel, table=True):
     __tablename__ = "highlights"
-    __table_args__ = {
-        'mysql_charset': 'utf8mb4',
-        'mysql_collate': 'utf8mb4_unicode_ci'
-    }
+    __table_args__ = (
+        # ファイルごとの一覧のキーセットページネーション用（app/utils/pagination.py）
+        Index("ix_highlights_document_file_id_created_at_id", "document_file_id", "created_at", "id"),
+        {
+            'mysql_charset': 'utf8mb4',
+            'mysql_collate': 'utf8mb4_unicode_ci'
+        },
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     document_file_id: int = Field(foreign_key="document_files.id")
@@ -33,6 +38,10 @@ class Highlight(SQLModel, table=True):
         )
     )
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # 矩形をまとめて保存する形式（app/utils/rect_packing.py）。None の場合、矩形は highlight_rects にある
+    rect_pages: Optional[List[int]] = Field(default=None, sa_column=Column(ARRAY(SmallInteger), nullable=True))
+    rect_coords: Optional[List[float]] = Field(default=None, sa_column=Column(ARRAY(REAL), nullable=True))
+    rect_types: Optional[List[Optional[str]]] = Field(default=None, sa_column=Column(ARRAY(String), nullable=True))
 
     # Relationship
     document_file: Optional["DocumentFile"] = Relationship(back_populates="highlights")
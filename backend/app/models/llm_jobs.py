@@ -0,0 +1,45 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlalchemy import String, Text, Index
+
+class LLMJob(SQLModel, table=True):
+    """
+    LLM分析ジョブのキュー兼結果保存テーブル
+    - status: queued → running → succeeded / failed
+    - ワーカーは SELECT ... FOR UPDATE SKIP LOCKED で queued のジョブを取得する
+    - 結果はドキュメント単位で保存し、再起動後も参照できる
+    """
+    __tablename__ = "llm_jobs"
+    __table_args__ = (
+        Index("ix_llm_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", index=True)
+    document_id: int = Field(foreign_key="documents.id", index=True)
+
+    # 実行するLLMタスク（'format-data' | 'option-analyze' | ...）
+    job_type: str = Field(sa_column=Column(String(50), nullable=False))
+    status: str = Field(
+        default="queued",
+        sa_column=Column(String(20), nullable=False, server_default="queued")
+    )
+
+    # リクエスト内容とLLMの結果
+    payload: dict = Field(sa_column=Column(JSON, nullable=False))
+    result: Optional[dict] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    error: Optional[str] = Field(default=None, sa_column=Column(Text(), nullable=True))
+
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    # 処理中のワーカー識別子（hostname:pid）
+    locked_by: Optional[str] = Field(default=None, sa_column=Column(String(255), nullable=True))
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    # Relationship
+    document: Optional["Document"] = Relationship()
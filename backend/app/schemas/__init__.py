@@ -1 +1 @@
-from . import auth, user, document, document_file, highlight, highlight_rect, comment
\ No newline at end of file
+from . import auth, user, document, document_file, highlight, highlight_rect, comment, llm_job, search
\ No newline at end of file
@@ -30,3 +30,19 @@ class DocumentFormattedTextRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+class FormattedTextChunksRead(BaseModel):
+    """チャンク範囲の読み取り用スキーマ（formatted_data 内のチャンク配列の一部）"""
+    document_id: int
+    total: int = Field(description="チャンクの総数")
+    start: int = Field(description="先頭チャンクの位置（0始まり）")
+    chunks: List[Dict[str, Any]]
+
+class FormattedTextChunkPatch(BaseModel):
+    """チャンク単位の更新用スキーマ（id が一致するチャンクの text を置き換える）"""
+    chunks: List[FormattedTextItem] = Field(min_length=1, description="更新するチャンク")
+
+class FormattedTextChunkPatchResult(BaseModel):
+    """チャンク単位の更新結果"""
+    document_id: int
+    chunks: List[Dict[str, Any]] = Field(description="更新後のチャンク")
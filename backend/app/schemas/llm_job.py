@@ -0,0 +1,38 @@
+from typing import Optional, Dict, Any
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+class LLMJobCreate(BaseModel):
+    """LLMジョブ投入用スキーマ"""
+    document_id: int = Field(description="ドキュメントID")
+    job_type: str = Field(description="LLMタスク種別（format-data / option-analyze など）")
+    payload: Dict[str, Any] = Field(description="各LLMエンドポイントと同じリクエストボディ")
+
+class LLMJobRead(BaseModel):
+    """LLMジョブ状態の読み取り用スキーマ（結果本文は含めない）"""
+    id: int
+    user_id: int
+    document_id: int
+    job_type: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class LLMJobResultRead(BaseModel):
+    """LLMジョブ結果の読み取り用スキーマ"""
+    id: int
+    document_id: int
+    job_type: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
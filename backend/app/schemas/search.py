@@ -0,0 +1,15 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+class AnnotationSearchResult(BaseModel):
+    """注釈検索の結果（ハイライト単位。コメントの一致は comment_ids で返す）"""
+    id: int = Field(description="ハイライトID")
+    document_file_id: int
+    document_id: int
+    text: Optional[str] = None
+    memo: Optional[str] = None
+    created_by: str
+    created_at: datetime
+    score: float = Field(description="一致した箇所の重みの合計（本文3・メモ2・コメント1件ごとに1）")
+    comment_ids: List[int] = Field(default_factory=list, description="検索語を含むコメントのID")
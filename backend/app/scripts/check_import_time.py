@@ -0,0 +1,127 @@
+# check_import_time.py
+# `python -X importtime` で main の import 時間を計測し、重いライブラリを import していたら失敗する
+# 時間の予算は --budget-ms（または IMPORT_TIME_BUDGET_MS）を指定した場合だけ判定する
+# （import 時間は実行環境の CPU と負荷で数倍変わるため、既定では計測値の表示だけにする）
+# 実行例（backendディレクトリで）:
+#   python app/scripts/check_import_time.py
+#   python app/scripts/check_import_time.py --budget-ms 4000 --top 30
+#   python app/scripts/check_import_time.py --forbid openai,boto3 --module main
+# 重いクライアント・ライブラリは初回利用時に作成する（app/core/registry.py）。
+# ここで失敗した場合は、--top の一覧から import 時に読み込まれた原因を探す
+# DATABASE_URL が未設定でも実行できる（CIなどでDBなしに実行する場合は IMPORT_ENV_DEFAULTS のダミーを使う）
+# 終了コード: 禁止モジュールの import（または予算を指定した場合の予算超過）があれば 1
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", ".."))
+
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, NamedTuple
+
+# import 時に読み込んではいけないモジュール（最初に使う時に読み込む）
+DEFAULT_FORBIDDEN = "openai,boto3,botocore,reportlab,PyPDF2"
+# import に必要な環境変数（未設定なら計測用のダミーを使う。import 時には接続しないため実在しなくてよい）
+IMPORT_ENV_DEFAULTS = {
+    "DATABASE_URL": "postgresql+psycopg2://import-time-check@localhost/import_time_check",
+}
+# import 時間の上限（ミリ秒）。未設定なら時間は判定しない
+IMPORT_TIME_BUDGET_MS = os.getenv("IMPORT_TIME_BUDGET_MS")
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """-X importtime の出力（'import time: self | cumulative | module'）を解析"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|", 2)
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 見出し行
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        depth = (len(name) - len(module)) // 2
+        records.append(ImportRecord(module, int(parts[0]), int(parts[1]), depth))
+    return records
+
+
+def measure(module: str) -> List[ImportRecord]:
+    """新しいプロセスで module を import して計測（既に読み込まれたモジュールの影響を受けないように）"""
+    env = {**IMPORT_ENV_DEFAULTS, **os.environ}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} に失敗しました:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import 時間の予算チェック")
+    parser.add_argument("--module", default="main", help="計測するモジュール")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(IMPORT_TIME_BUDGET_MS) if IMPORT_TIME_BUDGET_MS else None,
+                        help="import 時間の上限（ミリ秒）。省略時は時間を判定しない")
+    parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN, help="import 時に読み込んではいけないモジュール（カンマ区切り）")
+    parser.add_argument("--runs", type=int, default=3, help="計測回数（中央値で判定）")
+    parser.add_argument("--top", type=int, default=15, help="表示する重いモジュールの数")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(max(1, args.runs))]
+    totals = []
+    for records in runs:
+        top_level = [r for r in records if r.module == args.module and r.depth == 0]
+        totals.append(top_level[-1].cumulative_us / 1000 if top_level else 0.0)
+    total_ms = statistics.median(totals)
+
+    # 中央値に最も近い回の内訳を表示する
+    records = runs[totals.index(min(totals, key=lambda t: abs(t - total_ms)))]
+    budget = f"{args.budget_ms:.0f}ms" if args.budget_ms is not None else "none"
+    print(f"import {args.module}: {total_ms:.0f}ms (budget {budget}, runs={[round(t) for t in totals]})")
+    print(f"{'cumulative(ms)':>15} {'self(ms)':>9}  module")
+    for r in sorted(records, key=lambda r: r.self_us, reverse=True)[:args.top]:
+        print(f"{r.cumulative_us / 1000:>15.1f} {r.self_us / 1000:>9.1f}  {r.module}")
+
+    failed = False
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"NG: import 時間が予算を超えています ({total_ms:.0f}ms > {args.budget_ms:.0f}ms)")
+        failed = True
+
+    forbidden = [name.strip() for name in args.forbid.split(",") if name.strip()]
+    loaded: Dict[str, ImportRecord] = {}
+    for r in records:
+        root = r.module.split(".")[0]
+        if root in forbidden and root not in loaded:
+            loaded[root] = r
+    for name, r in loaded.items():
+        # どのモジュールから読み込まれたかを示す（出力は子が親より先に並ぶため、後ろの浅い階層をたどる）
+        parents = []
+        depth = r.depth
+        for p in records[records.index(r) + 1:]:
+            if p.depth < depth:
+                parents.append(p.module)
+                depth = p.depth
+        print(f"NG: {name} が import 時に読み込まれています（経由: {' <- '.join(parents[:4])}）")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# compact_logs.py
+# 1日分のログバッチ（api_access/YYYY/MM/DD/... など）を、日付・ログ種別で分割した少数の大きなファイルにまとめる
+# 実行例（backendディレクトリで）:
+#   LOG_STORAGE_BACKEND=local python app/scripts/compact_logs.py --date 2025-01-15
+#   python app/scripts/compact_logs.py --date 2025-01-15 --log-type user_action --format ndjson
+# 出力: compacted/log_type=<種別>/date=<YYYY-MM-DD>/gen=<世代>/part-00000.parquet（または .ndjson.gz）と manifest.json
+# 再実行すると、manifest にある前回の出力も入力に含めて新しい世代を書き、manifest を切り替えてから古い世代を消す
+# （--delete-source で元のバッチを消した日に遅れて届いたバッチがあっても、まとめ済みのログは失われない）
+# pyarrow がインストールされていれば Parquet、なければ gzip 圧縮の NDJSON で出力する
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..", "..")
+sys.path.insert(0, project_root)
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.core.log_storage import LogStorage, get_log_storage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("app.compact_logs")
+
+LOG_TYPES = ["api_access", "user_action"]
+COMPACTED_PREFIX = "compacted"
+# 1ファイルあたりの最大行数
+ROWS_PER_PART = 500_000
+
+
+def _decode_batch(key: str, data: bytes) -> List[dict]:
+    """ログバッチ1件を読み込む（gzip NDJSON と、旧形式の {"logs": [...]} JSON の両方に対応）"""
+    if key.endswith(".gz"):
+        data = gzip.decompress(data)
+    if key.endswith(".json"):
+        return json.loads(data).get("logs", [])
+
+    records = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            logger.warning(f"[Compact] Skipped broken line in {key}")
+    return records
+
+
+def _record_id(record: dict) -> str:
+    """
+    重複判定用のハッシュ（同じ内容のログは同一とみなす）
+    Parquet から読み戻したログ（ネストした値はJSON文字列、無い列は None）とも一致するよう、_flatten した形で比べる
+    """
+    normalized = {k: v for k, v in _flatten(record).items() if v is not None}
+    canonical = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _flatten(record: dict) -> dict:
+    """Parquet用にネストした値（details など）をJSON文字列にする"""
+    return {
+        k: json.dumps(v, ensure_ascii=False, sort_keys=True) if isinstance(v, (dict, list)) else v
+        for k, v in record.items()
+    }
+
+
+def _decode_part(key: str, data: bytes) -> List[dict]:
+    """前回まとめたファイルを読み込む"""
+    if key.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError(f"{key} を読むには pyarrow が必要です")
+        return pq.read_table(io.BytesIO(data)).to_pylist()
+    return [json.loads(line) for line in gzip.decompress(data).splitlines() if line.strip()]
+
+
+def _read_manifest(storage: LogStorage, manifest_key: str) -> Optional[dict]:
+    if manifest_key not in storage.list_keys(manifest_key):
+        return None
+    return json.loads(storage.get(manifest_key))
+
+
+def _encode_part(records: List[dict], fmt: str) -> bytes:
+    if fmt == "parquet":
+        # from_pylist は先頭行から列を決めるため、全行の列をそろえてから渡す
+        columns = list(dict.fromkeys(k for r in records for k in r))
+        rows = [_flatten(r) for r in records]
+        table = pa.Table.from_pydict({c: [row.get(c) for row in rows] for c in columns})
+        buf = io.BytesIO()
+        pq.write_table(table, buf, compression="zstd")
+        return buf.getvalue()
+    body = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+    return gzip.compress(body.encode("utf-8"))
+
+
+def _chunks(records: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+
+def compact(storage: LogStorage, log_type: str, day: date, fmt: str, delete_source: bool = False) -> Optional[dict]:
+    """1日・1種別分のログをまとめ、manifestを返す（対象が無い場合は None）"""
+    source_prefix = f"{log_type}/{day.strftime('%Y/%m/%d')}/"
+    source_keys = storage.list_keys(source_prefix)
+    if not source_keys:
+        logger.info(f"[Compact] No logs under {source_prefix}")
+        return None
+
+    output_prefix = f"{COMPACTED_PREFIX}/log_type={log_type}/date={day.isoformat()}/"
+    manifest_key = f"{output_prefix}manifest.json"
+    previous = _read_manifest(storage, manifest_key)
+
+    seen = set()
+    records: List[dict] = []
+    input_count = 0
+
+    def add(record: dict):
+        record_id = _record_id(record)
+        if record_id not in seen:
+            seen.add(record_id)
+            records.append(record)
+
+    # 前回の出力を入力に含める（元のバッチが既に消されていても、まとめ済みのログを残す）
+    previous_records = 0
+    for file in (previous or {}).get("files", []):
+        for record in _decode_part(file["key"], storage.get(file["key"])):
+            previous_records += 1
+            add(record)
+    for key in source_keys:
+        for record in _decode_batch(key, storage.get(key)):
+            input_count += 1
+            add(record)
+
+    records.sort(key=lambda r: str(r.get("timestamp", "")))
+
+    # 新しい世代は前回の出力と別の場所に書く（manifest を切り替えるまで前回の出力には触れない）
+    generation = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    generation_prefix = f"{output_prefix}gen={generation}/"
+    extension = "parquet" if fmt == "parquet" else "ndjson.gz"
+    content_type = "application/vnd.apache.parquet" if fmt == "parquet" else "application/x-ndjson"
+
+    files = []
+    for index, part in enumerate(_chunks(records, ROWS_PER_PART)):
+        data = _encode_part(part, fmt)
+        key = f"{generation_prefix}part-{index:05d}.{extension}"
+        if not storage.put(key, data, content_type=content_type):
+            raise RuntimeError(f"Failed to write {key}")
+        files.append({
+            "key": key,
+            "rows": len(part),
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        })
+
+    manifest = {
+        "log_type": log_type,
+        "date": day.isoformat(),
+        "format": fmt,
+        "generation": generation,
+        "created_at": datetime.utcnow().isoformat(),
+        "source_prefix": source_prefix,
+        "source_objects": len(source_keys),
+        "previous_records": previous_records,
+        "input_records": input_count,
+        "duplicates_removed": previous_records + input_count - len(records),
+        "output_records": len(records),
+        "files": files,
+    }
+    # manifest は最後に書き込む（書き込めた時点で新しい世代に切り替わる）
+    if not storage.put(manifest_key, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")):
+        raise RuntimeError(f"Failed to write {manifest_key}")
+
+    # 切り替えた後で、前回の世代と途中で止まった実行の残り（manifest にないファイル）を消す
+    current = {file["key"] for file in files} | {manifest_key}
+    for key in storage.list_keys(output_prefix):
+        if key not in current:
+            storage.delete(key)
+
+    if delete_source:
+        for key in source_keys:
+            storage.delete(key)
+
+    logger.info(
+        f"[Compact] {log_type} {day}: {len(source_keys)} objects, {input_count} records "
+        f"-> {len(records)} records in {len(files)} files ({manifest['duplicates_removed']} duplicates)"
+    )
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ログバッチを日付・種別ごとにまとめる")
+    parser.add_argument("--date", help="対象日（YYYY-MM-DD、省略時はUTCの前日）")
+    parser.add_argument("--log-type", choices=LOG_TYPES, help="対象の種別（省略時はすべて）")
+    parser.add_argument("--format", choices=["auto", "parquet", "ndjson"], default="auto",
+                        help="出力形式（auto は pyarrow があれば parquet）")
+    parser.add_argument("--delete-source", action="store_true", help="まとめた後に元のバッチを削除する")
+    args = parser.parse_args()
+
+    day = date.fromisoformat(args.date) if args.date else (datetime.utcnow() - timedelta(days=1)).date()
+    fmt = args.format
+    if fmt == "auto":
+        fmt = "parquet" if pa is not None else "ndjson"
+    if fmt == "parquet" and pa is None:
+        raise SystemExit("Parquet出力には pyarrow が必要です（--format ndjson を指定してください）")
+
+    storage = get_log_storage()
+    for log_type in ([args.log_type] if args.log_type else LOG_TYPES):
+        compact(storage, log_type, day, fmt, delete_source=args.delete_source)
+
+
+if __name__ == "__main__":
+    main()
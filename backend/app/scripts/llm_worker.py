@@ -0,0 +1,96 @@
+# llm_worker.py
+# LLM分析ジョブ（llm_jobsテーブル）を処理するワーカープロセス
+# 実行例（backendコンテナ内）: python app/scripts/llm_worker.py
+# 処理能力はワーカープロセス数でスケールする（HTTPワーカー数とは独立）
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..", "..")
+sys.path.insert(0, project_root)
+
+import logging
+import signal
+import socket
+import time
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlmodel import Session
+
+load_dotenv()
+
+from app.db.base import engine
+from app.crud import llm_job as crud_llm_job
+from app.api.endpoints.openai import parse_llm_task_payload, run_llm_task
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("app.llm_worker")
+
+# ジョブが無いときのポーリング間隔（秒）
+POLL_INTERVAL_SECONDS = float(os.getenv("LLM_WORKER_POLL_INTERVAL", "2"))
+# running のまま放置されたジョブを再投入するまでの時間（秒）
+STALE_JOB_TIMEOUT_SECONDS = int(os.getenv("LLM_WORKER_STALE_TIMEOUT", "900"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_stopping = False
+
+def _handle_stop_signal(signum, frame):
+    """SIGTERM/SIGINTで現在のジョブ完了後に停止する"""
+    global _stopping
+    logger.info(f"[LLMWorker] Received signal {signum}, stopping after current job")
+    _stopping = True
+
+def process_one_job() -> bool:
+    """ジョブを1件処理する。処理した場合は True を返す"""
+    with Session(engine) as session:
+        job = crud_llm_job.claim_next_job(session, WORKER_ID)
+        if not job:
+            return False
+
+        logger.info(f"[LLMWorker] Processing job {job.id} ({job.job_type}), attempt {job.attempts}/{job.max_attempts}")
+        started = time.time()
+        try:
+            req = parse_llm_task_payload(job.job_type, job.payload)
+            result = run_llm_task(job.job_type, req, rate_key=f"user:{job.user_id}")
+            crud_llm_job.complete_job(session, job, result)
+            logger.info(f"[LLMWorker] Job {job.id} succeeded in {time.time() - started:.1f}s")
+        except HTTPException as e:
+            if e.status_code != 429:
+                crud_llm_job.fail_job(session, job, str(e.detail))
+                logger.error(f"[LLMWorker] Job {job.id} failed ({job.status}): {e.detail}")
+                return True
+            # レート制限中はジョブをキューに戻し、指定された時間だけ待つ
+            retry_after = float((e.headers or {}).get("Retry-After", POLL_INTERVAL_SECONDS))
+            crud_llm_job.release_job(session, job)
+            logger.info(f"[LLMWorker] Job {job.id} rate limited, retry after {retry_after}s")
+            time.sleep(retry_after)
+        except Exception as e:
+            crud_llm_job.fail_job(session, job, str(e))
+            logger.error(f"[LLMWorker] Job {job.id} failed ({job.status}): {e}")
+        return True
+
+def run_worker():
+    """ジョブキューを処理し続ける"""
+    signal.signal(signal.SIGTERM, _handle_stop_signal)
+    signal.signal(signal.SIGINT, _handle_stop_signal)
+
+    logger.info(f"[LLMWorker] Started worker {WORKER_ID}")
+    last_stale_check = 0.0
+    while not _stopping:
+        try:
+            if time.time() - last_stale_check > STALE_JOB_TIMEOUT_SECONDS / 3:
+                with Session(engine) as session:
+                    crud_llm_job.requeue_stale_jobs(session, STALE_JOB_TIMEOUT_SECONDS)
+                last_stale_check = time.time()
+
+            if not process_one_job():
+                time.sleep(POLL_INTERVAL_SECONDS)
+        except Exception as e:
+            logger.error(f"[LLMWorker] Unexpected error: {e}", exc_info=True)
+            time.sleep(POLL_INTERVAL_SECONDS)
+    logger.info(f"[LLMWorker] Worker {WORKER_ID} stopped")
+
+if __name__ == "__main__":
+    run_worker()
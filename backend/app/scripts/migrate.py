@@ -0,0 +1,173 @@
+# migrate.py
+# コンテナ起動時のマイグレーション（entrypoint.sh から実行）
+# 実行例（backendディレクトリで）:
+#   python app/scripts/migrate.py            # DB接続を待ち、必要な場合のみ alembic upgrade head
+#   python app/scripts/migrate.py --check    # 最新かどうかだけ確認（最新でなければ終了コード1）
+# 1. DBの現在のリビジョン（alembic_version）と alembic/versions のheadを1回のクエリで比較し、一致すれば Alembic を読み込まずに終了
+# 2. 一致しない場合は advisory lock を取得したレプリカだけがマイグレーションを実行し、他は完了を待つ
+#    （ロック取得後に再確認するため、待っていたレプリカは実行しない）
+# インデックスの追加は app/db/migration_ops.py の create_index_concurrently を使う（書き込みをロックしない）
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", ".."))
+sys.path.insert(0, project_root)
+
+import argparse
+import ast
+import time
+from typing import Set
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import sqlalchemy
+from sqlalchemy.pool import NullPool
+
+from app.db.base import get_db_url
+
+VERSIONS_DIR = os.path.join(project_root, "alembic", "versions")
+ALEMBIC_INI = os.path.join(project_root, "alembic.ini")
+# advisory lock のキー（アプリ内で他の用途と重ならない任意の値）
+MIGRATION_LOCK_KEY = int(os.getenv("MIGRATION_LOCK_KEY", "724019"))
+MIGRATION_LOCK_TIMEOUT_SECONDS = float(os.getenv("MIGRATION_LOCK_TIMEOUT_SECONDS", "600"))
+DB_WAIT_RETRIES = int(os.getenv("DB_WAIT_RETRIES", "60"))
+
+
+def head_revisions(versions_dir: str = VERSIONS_DIR) -> Set[str]:
+    """
+    alembic/versions のheadを求める（Alembic を読み込まず、各ファイルの revision / down_revision だけを読む）
+    どのリビジョンからも down_revision として参照されていないものがhead
+    """
+    revisions = set()
+    referenced = set()
+    for filename in os.listdir(versions_dir):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, filename), encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename)
+        for node in tree.body:
+            if isinstance(node, ast.AnnAssign):
+                target, value = node.target, node.value
+            elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target, value = node.targets[0], node.value
+            else:
+                continue
+            if not isinstance(target, ast.Name) or value is None:
+                continue
+            if target.id == "revision":
+                revisions.add(ast.literal_eval(value))
+            elif target.id == "down_revision":
+                down = ast.literal_eval(value)
+                if isinstance(down, str):
+                    referenced.add(down)
+                elif down:
+                    referenced.update(down)
+    return revisions - referenced
+
+
+def current_revisions(conn) -> Set[str]:
+    """DBの現在のリビジョン（alembic_version が無ければ空）"""
+    try:
+        rows = conn.execute(sqlalchemy.text("SELECT version_num FROM alembic_version")).all()
+    except sqlalchemy.exc.ProgrammingError:
+        conn.rollback()
+        return set()
+    return {row[0] for row in rows}
+
+
+def wait_for_db(engine, retries: int = DB_WAIT_RETRIES):
+    for i in range(retries):
+        try:
+            with engine.connect() as conn:
+                conn.execute(sqlalchemy.text("SELECT 1"))
+            print("Database is ready.")
+            return
+        except Exception as e:
+            print(f"DB not ready ({e}), retry {i + 1}/{retries}")
+            time.sleep(1)
+    raise RuntimeError("Database not ready in time")
+
+
+def run_alembic_upgrade():
+    # Alembic と全モデルの読み込みは重いため、マイグレーションが必要な場合のみ行う
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(project_root, "alembic"))
+    command.upgrade(config, "head")
+
+
+def acquire_lock(conn, timeout_seconds: float):
+    """advisory lock を取得（他のレプリカがマイグレーション中なら終わるまで待つ）"""
+    deadline = time.monotonic() + timeout_seconds
+    waited = False
+    while not conn.execute(sqlalchemy.text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}).scalar():
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Could not acquire migration lock in {timeout_seconds:.0f}s")
+        if not waited:
+            print("Another instance is migrating; waiting...")
+            waited = True
+        time.sleep(1)
+    # セッション単位のロックはコミット後も保持される。トランザクションを開いたままにすると
+    # idle_in_transaction_session_timeout で長いインデックス作成の途中に接続ごと切られるため閉じておく
+    conn.commit()
+
+
+def migrate(engine) -> bool:
+    """必要ならマイグレーションを実行する（実行した場合 True）"""
+    heads = head_revisions()
+    with engine.connect() as conn:
+        current = current_revisions(conn)
+    if current == heads:
+        print(f"Database is up to date ({', '.join(sorted(heads))}); skipping alembic.")
+        return False
+
+    if engine.dialect.name != "postgresql":
+        run_alembic_upgrade()
+        return True
+
+    # ロックはセッション単位で保持する（マイグレーション本体は Alembic が別の接続で実行する）
+    with engine.connect() as lock_conn:
+        acquire_lock(lock_conn, MIGRATION_LOCK_TIMEOUT_SECONDS)
+        try:
+            with engine.connect() as conn:
+                current = current_revisions(conn)
+            if current == heads:
+                print("Database was migrated by another instance; skipping alembic.")
+                return False
+            print(f"Running alembic upgrade head ({', '.join(sorted(current)) or 'empty'} -> {', '.join(sorted(heads))})...")
+            started = time.perf_counter()
+            run_alembic_upgrade()
+            print(f"Migration finished in {time.perf_counter() - started:.1f}s")
+            return True
+        finally:
+            lock_conn.execute(sqlalchemy.text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            lock_conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時のマイグレーション")
+    parser.add_argument("--check", action="store_true", help="最新かどうかだけ確認する")
+    parser.add_argument("--no-wait", action="store_true", help="DB接続を待たない")
+    args = parser.parse_args()
+
+    engine = sqlalchemy.create_engine(get_db_url(), poolclass=NullPool)
+    if not args.no_wait:
+        wait_for_db(engine)
+
+    if args.check:
+        heads = head_revisions()
+        with engine.connect() as conn:
+            current = current_revisions(conn)
+        print(f"current={sorted(current)} head={sorted(heads)}")
+        sys.exit(0 if current == heads else 1)
+
+    migrate(engine)
+
+
+if __name__ == "__main__":
+    main()
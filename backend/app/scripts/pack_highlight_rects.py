@@ -0,0 +1,135 @@
+# pack_highlight_rects.py
+# 既存のハイライト矩形（highlight_rects の1矩形1行）を、highlights の配列列（packed 形式）に移し替える
+# 実行例（backendディレクトリで、alembic b7e3f9a1c5d8 まで適用した後に）:
+#   python app/scripts/pack_highlight_rects.py --dry-run
+#   python app/scripts/pack_highlight_rects.py --batch-size 2000
+#   python app/scripts/pack_highlight_rects.py --unpack    # 元に戻す（packed 形式が残っていると downgrade は中止される）
+# バッチごとにコミットするため、途中で止めても再実行すれば残りから続ける
+# 新しく作るハイライトも packed 形式にするには HIGHLIGHT_RECT_STORAGE=packed でAPIを起動する
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..", "..")
+sys.path.insert(0, project_root)
+
+import argparse
+import logging
+from typing import List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.db.base import engine
+from app.models import DocumentFile, Highlight, HighlightRect
+from app.crud import highlight_rect as crud_highlight_rect
+from app.utils.rect_packing import pack_rects, unpack_highlight_rects
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("app.pack_highlight_rects")
+
+
+def _bump_file_versions(session: Session, file_ids: List[int]) -> None:
+    # 座標が float4 に丸められるため、一覧の ETag を変えてクライアントに取り直させる
+    session.exec(
+        update(DocumentFile)
+        .where(DocumentFile.id.in_(file_ids))
+        .values(content_version=DocumentFile.content_version + 1)
+    )
+
+
+def pack(session: Session, batch_size: int, dry_run: bool) -> None:
+    last_id = 0
+    packed_highlights = 0
+    removed_rows = 0
+    while True:
+        highlights = session.exec(
+            select(Highlight)
+            .where(Highlight.id > last_id, Highlight.rect_pages.is_(None))
+            .order_by(Highlight.id)
+            .limit(batch_size)
+        ).all()
+        if not highlights:
+            break
+        last_id = highlights[-1].id
+
+        rects_by_highlight = crud_highlight_rect.get_rects_by_highlights(session, [h.id for h in highlights])
+        targets = [h for h in highlights if rects_by_highlight[h.id]]
+        for highlight in targets:
+            highlight.rect_pages, highlight.rect_coords, highlight.rect_types = pack_rects(rects_by_highlight[highlight.id])
+            session.add(highlight)
+        target_ids = [h.id for h in targets]
+        rows = sum(len(rects_by_highlight[i]) for i in target_ids)
+
+        if dry_run:
+            session.rollback()
+        elif target_ids:
+            session.flush()
+            session.exec(delete(HighlightRect).where(HighlightRect.highlight_id.in_(target_ids)))
+            _bump_file_versions(session, sorted({h.document_file_id for h in targets}))
+            session.commit()
+        packed_highlights += len(target_ids)
+        removed_rows += rows
+        logger.info(f"[Pack] up to highlight_id={last_id}: {packed_highlights} highlights, {removed_rows} rect rows")
+
+    action = "would pack" if dry_run else "packed"
+    logger.info(f"[Pack] {action} {packed_highlights} highlights ({removed_rows} highlight_rects rows)")
+
+
+def unpack(session: Session, batch_size: int, dry_run: bool) -> None:
+    last_id = 0
+    unpacked_highlights = 0
+    created_rows = 0
+    while True:
+        highlights = session.exec(
+            select(Highlight)
+            .where(Highlight.id > last_id, Highlight.rect_pages.is_not(None))
+            .order_by(Highlight.id)
+            .limit(batch_size)
+        ).all()
+        if not highlights:
+            break
+        last_id = highlights[-1].id
+
+        rows = []
+        for highlight in highlights:
+            for rect in unpack_highlight_rects(highlight):
+                # 連番の id は packed 形式での仮の値のため、行にするときは採番し直す
+                rows.append(HighlightRect(**rect.model_dump(exclude={"id"})))
+            highlight.rect_pages = highlight.rect_coords = highlight.rect_types = None
+            session.add(highlight)
+
+        if dry_run:
+            session.rollback()
+        else:
+            session.add_all(rows)
+            _bump_file_versions(session, sorted({h.document_file_id for h in highlights}))
+            session.commit()
+        unpacked_highlights += len(highlights)
+        created_rows += len(rows)
+        logger.info(f"[Unpack] up to highlight_id={last_id}: {unpacked_highlights} highlights, {created_rows} rect rows")
+
+    action = "would unpack" if dry_run else "unpacked"
+    logger.info(f"[Unpack] {action} {unpacked_highlights} highlights ({created_rows} highlight_rects rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ハイライト矩形を packed 形式に移し替える")
+    parser.add_argument("--batch-size", type=int, default=1000, help="1コミットあたりのハイライト数")
+    parser.add_argument("--unpack", action="store_true", help="packed 形式から highlight_rects に戻す")
+    parser.add_argument("--dry-run", action="store_true", help="件数だけ表示して変更しない")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        if args.unpack:
+            unpack(session, args.batch_size, args.dry_run)
+        else:
+            pack(session, args.batch_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
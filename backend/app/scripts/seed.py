@@ -1,4 +1,9 @@
 # seed.py
+# 実行例（backendディレクトリで）:
+#   python app/scripts/seed.py                       # 動作確認用の固定ユーザーを作成
+#   python app/scripts/seed.py --synthetic --users 20 --documents-per-user 5 --highlights-per-file 100
+# --synthetic ではベンチマーク・負荷試験用の合成データ（ユーザー・ドキュメント・ファイル・
+# 矩形付きハイライト・コメントのツリー）を指定した規模で作成する（--random-seed が同じなら同じ内容）
 
 import os
 import sys
@@ -7,9 +12,11 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.join(script_dir, "..", "..")
 sys.path.insert(0, project_root)
 
-from sqlmodel import create_engine, Session
-from datetime import datetime
-from typing import Optional
+import argparse
+import random
+from sqlmodel import create_engine, Session, select
+from datetime import datetime, timedelta
+from typing import List, Optional
 from dotenv import load_dotenv
 from sqlmodel import SQLModel
 from app.core.security import get_password_hash
@@ -18,7 +25,7 @@ load_dotenv()
 
 # Userモデルの定義をインポートします
 # プロジェクトのルートディレクトリから実行する場合、このパスが正しいことを確認してください
-from app.models import User
+from app.models import User, Document, DocumentFile, Highlight, HighlightRect, Comment
 
 # --- 設定 ---
 # Docker Composeで設定した完全なDB URLを環境変数から取得します
@@ -91,10 +98,225 @@ def seed_database():
         session.commit()
         print("Data seeding completed successfully! ✨")
 
+# --- 合成データ（ベンチマーク・負荷試験用） ---
+
+SYNTHETIC_PASSWORD = "Synthetic1"
+LLM_AUTHOR = "LLM"
+
+_WORDS = (
+    "model data analysis method result experiment sample error bias variance "
+    "hypothesis evidence theory measurement baseline dataset signal noise "
+    "parameter estimate inference validation robustness limitation"
+).split()
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_email(prefix: str, index: int) -> str:
+    return f"{prefix}-{index}@example.com"
+
+
+def _build_comment_tree(rng: random.Random, highlight_id: int, author: str, roots: int, depth: int,
+                        created_at: datetime) -> List[Comment]:
+    """ルートコメントと、depth 段までの返信を作成（親IDは flush 後に設定する）"""
+    comments = []
+    for _ in range(roots):
+        parent = None
+        for level in range(depth + 1):
+            comment = Comment(
+                highlight_id=highlight_id,
+                author=LLM_AUTHOR if level % 2 == 1 else author,
+                text=" ".join(_sentence(rng, 8, 30) for _ in range(rng.randint(1, 4))),
+                purpose=rng.randint(1, 3) if level > 0 else None,
+                completion_stage=rng.randint(1, 4),
+                created_at=created_at + timedelta(minutes=level),
+            )
+            comment.parent = parent
+            comments.append(comment)
+            parent = comment
+            # 返信の連鎖は途中で止まることもある
+            if rng.random() < 0.3:
+                break
+    return comments
+
+
+def seed_synthetic(
+    engine,
+    prefix: str = "synthetic",
+    users: int = 10,
+    documents_per_user: int = 5,
+    highlights_per_file: int = 50,
+    rects_per_highlight: int = 3,
+    comments_per_highlight: int = 2,
+    reply_depth: int = 2,
+    pages: int = 20,
+    random_seed: int = 0,
+) -> dict:
+    """
+    合成データを作成し、作成（または既存）データのID一覧を返す
+    メールアドレスが既に存在するユーザーは作成済みとみなしてスキップする
+    """
+    hashed_password = get_password_hash(SYNTHETIC_PASSWORD)
+    base_time = datetime(2025, 1, 1)
+    created_users = 0
+
+    for user_index in range(users):
+        email = synthetic_email(prefix, user_index)
+        # ユーザーごとに乱数を分けることで、規模を増やしても既存ユーザーの内容は変わらない
+        rng = random.Random(f"{random_seed}:{user_index}")
+        with Session(engine) as session:
+            if session.exec(select(User).where(User.email == email)).first():
+                continue
+
+            user = User(name=f"{prefix}-{user_index}", email=email, hashed_password=hashed_password)
+            session.add(user)
+            session.flush()
+
+            for doc_index in range(documents_per_user):
+                created_at = base_time + timedelta(days=doc_index)
+                document = Document(
+                    user_id=user.id,
+                    document_name=f"Synthetic paper {user_index}-{doc_index}",
+                    stage=rng.randint(1, 4),
+                    created_at=created_at,
+                )
+                session.add(document)
+                session.flush()
+
+                document_file = DocumentFile(
+                    document_id=document.id,
+                    file_name=f"synthetic-{user_index}-{doc_index}.pdf",
+                    file_key=f"{prefix}/{user.id}/{document.id}.pdf",
+                    mime_type="application/pdf",
+                    file_size=pages * 50_000,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                session.add(document_file)
+                session.flush()
+
+                highlights = []
+                for i in range(highlights_per_file):
+                    highlight = Highlight(
+                        document_file_id=document_file.id,
+                        created_by=user.name,
+                        memo=_sentence(rng, 5, 20),
+                        text=" ".join(_sentence(rng, 10, 25) for _ in range(rng.randint(1, 3))),
+                        created_at=created_at + timedelta(minutes=i),
+                    )
+                    # text 列の照合順序（MySQL用）が複数行INSERTのキャストに含まれPostgreSQLで失敗するため1件ずつ
+                    session.add(highlight)
+                    session.flush()
+                    highlights.append(highlight)
+
+                rects = []
+                comments = []
+                for highlight in highlights:
+                    page_num = rng.randint(1, pages)
+                    y = rng.uniform(50, 700)
+                    for line in range(rng.randint(1, rects_per_highlight)):
+                        x1 = rng.uniform(50, 150)
+                        rects.append(HighlightRect(
+                            highlight_id=highlight.id,
+                            page_num=page_num,
+                            x1=x1,
+                            y1=y + line * 14,
+                            x2=x1 + rng.uniform(100, 400),
+                            y2=y + line * 14 + 12,
+                            element_type="text",
+                        ))
+                    comments.extend(_build_comment_tree(
+                        rng, highlight.id, user.name, comments_per_highlight, reply_depth, highlight.created_at
+                    ))
+                session.add_all(rects)
+                session.add_all(comments)
+                session.flush()
+
+            session.commit()
+            created_users += 1
+            print(f"  ✅ Added synthetic user: {email}")
+
+    print(f"Synthetic data ready ({created_users} users created, {users - created_users} reused).")
+    return load_synthetic_corpus(engine, prefix, users)
+
+
+def load_synthetic_corpus(engine, prefix: str, users: int) -> dict:
+    """作成済みの合成データのID一覧（ベンチマークで対象を選ぶのに使う）"""
+    emails = [synthetic_email(prefix, i) for i in range(users)]
+    corpus = {"prefix": prefix, "password": SYNTHETIC_PASSWORD, "users": []}
+    with Session(engine) as session:
+        rows = session.exec(
+            select(User, Document, DocumentFile)
+            .join(Document, Document.user_id == User.id)
+            .join(DocumentFile, DocumentFile.document_id == Document.id)
+            .where(User.email.in_(emails))
+            .order_by(User.id, Document.id)
+        ).all()
+        highlight_rows = session.exec(
+            select(Highlight.id, Highlight.document_file_id)
+            .where(Highlight.document_file_id.in_([f.id for _, _, f in rows] or [0]))
+            .order_by(Highlight.id)
+        ).all()
+
+    highlights_by_file = {}
+    for highlight_id, file_id in highlight_rows:
+        highlights_by_file.setdefault(file_id, []).append(highlight_id)
+
+    users_by_id = {}
+    for user, document, document_file in rows:
+        entry = users_by_id.get(user.id)
+        if entry is None:
+            entry = {"id": user.id, "name": user.name, "email": user.email, "documents": []}
+            users_by_id[user.id] = entry
+            corpus["users"].append(entry)
+        entry["documents"].append({
+            "id": document.id,
+            "file_id": document_file.id,
+            "file_key": document_file.file_key,
+            "highlight_ids": highlights_by_file.get(document_file.id, []),
+        })
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="開発用データの作成")
+    parser.add_argument("--synthetic", action="store_true", help="合成データを作成する")
+    parser.add_argument("--prefix", default="synthetic", help="合成ユーザーの名前・メールアドレスの接頭辞")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--documents-per-user", type=int, default=5)
+    parser.add_argument("--highlights-per-file", type=int, default=50)
+    parser.add_argument("--rects-per-highlight", type=int, default=3, help="ハイライトあたりの最大矩形数")
+    parser.add_argument("--comments-per-highlight", type=int, default=2, help="ハイライトあたりのルートコメント数")
+    parser.add_argument("--reply-depth", type=int, default=2, help="返信の最大の深さ")
+    parser.add_argument("--pages", type=int, default=20, help="ファイルあたりのページ数")
+    parser.add_argument("--random-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.synthetic:
+        seed_database()
+        return
+
+    engine = create_engine(DATABASE_URL)
+    SQLModel.metadata.create_all(engine)
+    seed_synthetic(
+        engine,
+        prefix=args.prefix,
+        users=args.users,
+        documents_per_user=args.documents_per_user,
+        highlights_per_file=args.highlights_per_file,
+        rects_per_highlight=args.rects_per_highlight,
+        comments_per_highlight=args.comments_per_highlight,
+        reply_depth=args.reply_depth,
+        pages=args.pages,
+        random_seed=args.random_seed,
+    )
+
 if __name__ == "__main__":
     try:
-        seed_database()
-        create_users_data()
+        main()
     except Exception as e:
         print(f"\n❌ An error occurred during seeding:")
         print(e)
\ No newline at end of file
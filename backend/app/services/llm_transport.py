@@ -0,0 +1,368 @@
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.core.registry import services
+from app.core.singleflight import make_key
+
+logger = logging.getLogger(__name__)
+
+# LLM呼び出しの送信先
+#   openai    : OpenAI API（既定）
+#   record    : OpenAI API を呼び出し、応答を LLM_RECORDINGS_DIR に保存する
+#   replay    : 保存済みの応答をリクエストのハッシュで引いて返す（ネットワーク不要）
+#   synthetic : 遅延・エラーを設定できる合成応答を返す（ネットワーク不要、負荷試験用）
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "openai")
+LLM_RECORDINGS_DIR = os.getenv("LLM_RECORDINGS_DIR", "llm_recordings")
+# replay で記録が無い場合: "error"（502を返す） or "synthetic"（合成応答で代用）
+LLM_REPLAY_ON_MISS = os.getenv("LLM_REPLAY_ON_MISS", "error")
+# replay で記録時の応答時間を再現するか
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "true").lower() == "true"
+
+# synthetic の応答時間は対数正規分布（中央値と広がり）で決める
+LLM_SYNTHETIC_LATENCY_MEDIAN_SECONDS = float(os.getenv("LLM_SYNTHETIC_LATENCY_MEDIAN_SECONDS", "2.0"))
+LLM_SYNTHETIC_LATENCY_SIGMA = float(os.getenv("LLM_SYNTHETIC_LATENCY_SIGMA", "0.5"))
+LLM_SYNTHETIC_LATENCY_MAX_SECONDS = float(os.getenv("LLM_SYNTHETIC_LATENCY_MAX_SECONDS", "60"))
+# 最初のチャンクまでにかかる時間の割合（残りはチャンク間に均等に配分）
+LLM_SYNTHETIC_FIRST_CHUNK_RATIO = float(os.getenv("LLM_SYNTHETIC_FIRST_CHUNK_RATIO", "0.3"))
+LLM_SYNTHETIC_CHUNKS = int(os.getenv("LLM_SYNTHETIC_CHUNKS", "20"))
+LLM_SYNTHETIC_RESPONSE_TOKENS = int(os.getenv("LLM_SYNTHETIC_RESPONSE_TOKENS", "400"))
+# エラーの注入（例: "429:0.02,500:0.01,timeout:0.005" = 2%で429、1%で500、0.5%でタイムアウト）
+LLM_SYNTHETIC_ERRORS = os.getenv("LLM_SYNTHETIC_ERRORS", "")
+LLM_SYNTHETIC_TIMEOUT_SECONDS = float(os.getenv("LLM_SYNTHETIC_TIMEOUT_SECONDS", "30"))
+LLM_SYNTHETIC_SEED = os.getenv("LLM_SYNTHETIC_SEED")
+
+
+class ChatResult(NamedTuple):
+    content: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class LLMTransportError(Exception):
+    """LLM呼び出しの失敗（status_code は上流の応答コード、通信失敗・タイムアウトは 504）"""
+
+    def __init__(self, message: str, status_code: int = 500, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After（秒数 or HTTP-date）を待つ秒数にする。解釈できなければ None"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    if not math.isfinite(seconds):
+        return None
+    return max(0.0, seconds)
+
+
+def request_hash(request: dict) -> str:
+    """記録・再生に使うリクエストのキー（ストリーミングの有無は含めない）"""
+    return make_key({k: v for k, v in request.items() if k not in ("stream", "stream_options")})
+
+
+class LLMTransport(ABC):
+    """chat.completions 相当の呼び出し（request は OpenAI の create に渡す引数）"""
+
+    name = ""
+
+    @abstractmethod
+    def complete(self, request: dict) -> ChatResult:
+        ...
+
+    def stream(self, request: dict, on_chunk: Optional[Callable[[str], None]] = None) -> ChatResult:
+        """チャンクごとに on_chunk を呼び、最後にまとめた結果を返す"""
+        result = self.complete(request)
+        if on_chunk is not None:
+            on_chunk(result.content)
+        return result
+
+
+class OpenAITransport(LLMTransport):
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None):
+        from openai import OpenAI
+
+        api_key = api_key or os.getenv("OPENAI_SECRET_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_SECRET_KEY is not defined.")
+        self.client = OpenAI(api_key=api_key)
+
+    @staticmethod
+    def _wrap_error(e: Exception) -> LLMTransportError:
+        import openai
+
+        if isinstance(e, openai.APIStatusError):
+            retry_after = e.response.headers.get("retry-after") if e.response is not None else None
+            return LLMTransportError(str(e), e.status_code, parse_retry_after(retry_after))
+        if isinstance(e, (openai.APITimeoutError, openai.APIConnectionError)):
+            return LLMTransportError(str(e), 504)
+        return LLMTransportError(str(e), 500)
+
+    def complete(self, request: dict) -> ChatResult:
+        try:
+            resp = self.client.chat.completions.create(**request)
+        except Exception as e:
+            raise self._wrap_error(e) from e
+        usage = getattr(resp, "usage", None)
+        return ChatResult(
+            resp.choices[0].message.content,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+    def stream(self, request: dict, on_chunk: Optional[Callable[[str], None]] = None) -> ChatResult:
+        parts: List[str] = []
+        usage = None
+        try:
+            for chunk in self.client.chat.completions.create(
+                **request, stream=True, stream_options={"include_usage": True}
+            ):
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    if on_chunk is not None:
+                        on_chunk(delta)
+        except Exception as e:
+            raise self._wrap_error(e) from e
+        return ChatResult(
+            "".join(parts),
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+
+class RecordingTransport(LLMTransport):
+    """別のトランスポートの応答を、リクエストのハッシュをファイル名にして保存する"""
+
+    name = "record"
+
+    def __init__(self, inner: LLMTransport, directory: str = LLM_RECORDINGS_DIR):
+        self.inner = inner
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _save(self, request: dict, result: ChatResult, latency: float, first_chunk: Optional[float]):
+        key = request_hash(request)
+        record = {
+            "key": key,
+            "recorded_at": time.time(),
+            "request": request,
+            "response": result._asdict(),
+            "latency_seconds": round(latency, 4),
+            "first_chunk_seconds": round(first_chunk, 4) if first_chunk is not None else None,
+        }
+        path = os.path.join(self.directory, f"{key}.json")
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def complete(self, request: dict) -> ChatResult:
+        started = time.perf_counter()
+        result = self.inner.complete(request)
+        self._save(request, result, time.perf_counter() - started, None)
+        return result
+
+    def stream(self, request: dict, on_chunk: Optional[Callable[[str], None]] = None) -> ChatResult:
+        started = time.perf_counter()
+        first_chunk: List[float] = []
+
+        def _on_chunk(delta: str):
+            if not first_chunk:
+                first_chunk.append(time.perf_counter() - started)
+            if on_chunk is not None:
+                on_chunk(delta)
+
+        result = self.inner.stream(request, _on_chunk)
+        self._save(request, result, time.perf_counter() - started, first_chunk[0] if first_chunk else None)
+        return result
+
+
+def _sleep_chunks(chunks: List[str], total_seconds: float, first_chunk_seconds: float,
+                  on_chunk: Optional[Callable[[str], None]]):
+    """最初のチャンクまで first_chunk_seconds、残りを均等な間隔で送る"""
+    time.sleep(max(0.0, first_chunk_seconds))
+    interval = max(0.0, total_seconds - first_chunk_seconds) / max(1, len(chunks) - 1)
+    for i, chunk in enumerate(chunks):
+        if i > 0 and interval:
+            time.sleep(interval)
+        if on_chunk is not None:
+            on_chunk(chunk)
+
+
+def _split_chunks(content: str, count: int) -> List[str]:
+    if not content:
+        return [""]
+    size = max(1, math.ceil(len(content) / max(1, count)))
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+class SyntheticTransport(LLMTransport):
+    """遅延の分布・チャンク分割・エラー注入を設定できる合成応答"""
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        latency_median: float = LLM_SYNTHETIC_LATENCY_MEDIAN_SECONDS,
+        latency_sigma: float = LLM_SYNTHETIC_LATENCY_SIGMA,
+        latency_max: float = LLM_SYNTHETIC_LATENCY_MAX_SECONDS,
+        first_chunk_ratio: float = LLM_SYNTHETIC_FIRST_CHUNK_RATIO,
+        chunks: int = LLM_SYNTHETIC_CHUNKS,
+        response_tokens: int = LLM_SYNTHETIC_RESPONSE_TOKENS,
+        errors: str = LLM_SYNTHETIC_ERRORS,
+        timeout: float = LLM_SYNTHETIC_TIMEOUT_SECONDS,
+        seed: Optional[str] = LLM_SYNTHETIC_SEED,
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.latency_max = latency_max
+        self.first_chunk_ratio = first_chunk_ratio
+        self.chunks = chunks
+        self.response_tokens = response_tokens
+        self.errors = self.parse_errors(errors)
+        self.timeout = timeout
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_errors(spec: str) -> List[Tuple[str, float]]:
+        """"429:0.02,500:0.01,timeout:0.005" -> [("429", 0.02), ("500", 0.01), ("timeout", 0.005)]"""
+        errors = []
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            kind, _, rate = item.partition(":")
+            errors.append((kind.strip(), float(rate)))
+        return errors
+
+    def _draw(self) -> Tuple[float, Optional[str]]:
+        with self._lock:
+            latency = min(self.latency_max, self.latency_median * math.exp(self._rng.gauss(0, self.latency_sigma)))
+            roll = self._rng.random()
+        for kind, rate in self.errors:
+            if roll < rate:
+                return latency, kind
+            roll -= rate
+        return latency, None
+
+    def _raise_error(self, kind: str, latency: float):
+        if kind == "timeout":
+            time.sleep(self.timeout)
+            raise LLMTransportError("Synthetic timeout", 504)
+        # 上流のエラーは応答が早いことが多いため、遅延の一部だけ待つ
+        time.sleep(latency * 0.1)
+        status_code = int(kind)
+        raise LLMTransportError(
+            f"Synthetic error {status_code}", status_code, retry_after=1.0 if status_code == 429 else None
+        )
+
+    def _content(self, request: dict) -> str:
+        key = request_hash(request)
+        if request.get("response_format", {}).get("type") == "json_object":
+            filler = " ".join(["lorem"] * max(1, self.response_tokens - 10))
+            return json.dumps({"synthetic": True, "request": key[:16], "text": filler})
+        return f"[synthetic {key[:16]}] " + " ".join(["lorem"] * self.response_tokens)
+
+    def stream(self, request: dict, on_chunk: Optional[Callable[[str], None]] = None) -> ChatResult:
+        latency, error = self._draw()
+        if error is not None:
+            self._raise_error(error, latency)
+        content = self._content(request)
+        _sleep_chunks(_split_chunks(content, self.chunks), latency, latency * self.first_chunk_ratio, on_chunk)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        return ChatResult(content, prompt_chars // 4, self.response_tokens)
+
+    def complete(self, request: dict) -> ChatResult:
+        return self.stream(request)
+
+
+class ReplayTransport(LLMTransport):
+    """RecordingTransport で保存した応答を返す"""
+
+    name = "replay"
+
+    def __init__(self, directory: str = LLM_RECORDINGS_DIR, replay_latency: bool = LLM_REPLAY_LATENCY,
+                 fallback: Optional[LLMTransport] = None):
+        self.directory = directory
+        self.replay_latency = replay_latency
+        self.fallback = fallback
+        self._records: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, key: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get(key)
+        if record is not None:
+            return record
+        try:
+            with open(os.path.join(self.directory, f"{key}.json"), encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._records[key] = record
+        return record
+
+    def stream(self, request: dict, on_chunk: Optional[Callable[[str], None]] = None) -> ChatResult:
+        key = request_hash(request)
+        record = self._load(key)
+        if record is None:
+            if self.fallback is not None:
+                return self.fallback.stream(request, on_chunk)
+            logger.warning(f"[LLMTransport] No recording for request {key}")
+            raise LLMTransportError(f"No recorded response for request {key}", 502)
+
+        result = ChatResult(**record["response"])
+        latency = (record.get("latency_seconds") or 0.0) if self.replay_latency else 0.0
+        first_chunk = record.get("first_chunk_seconds")
+        if first_chunk is None:
+            first_chunk = latency * LLM_SYNTHETIC_FIRST_CHUNK_RATIO
+        _sleep_chunks(
+            _split_chunks(result.content or "", LLM_SYNTHETIC_CHUNKS),
+            latency, first_chunk if self.replay_latency else 0.0, on_chunk,
+        )
+        return result
+
+    def complete(self, request: dict) -> ChatResult:
+        return self.stream(request)
+
+
+def create_llm_transport(kind: str = LLM_TRANSPORT) -> LLMTransport:
+    """LLM_TRANSPORT に応じたトランスポートを作成"""
+    if kind == "openai":
+        return OpenAITransport()
+    if kind == "record":
+        return RecordingTransport(OpenAITransport())
+    if kind == "replay":
+        fallback = SyntheticTransport() if LLM_REPLAY_ON_MISS == "synthetic" else None
+        return ReplayTransport(fallback=fallback)
+    if kind == "synthetic":
+        return SyntheticTransport()
+    raise ValueError(f"Unknown LLM_TRANSPORT: {kind}")
+
+
+# openai パッケージの import とクライアント作成は重いため、最初の呼び出し時に行う（services.get("llm_transport")）
+services.register("llm_transport", create_llm_transport)
@@ -1,7 +1,8 @@
 import logging
+import threading
 import unicodedata
 from io import BytesIO
-from typing import List
+from typing import List, Optional
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
@@ -9,6 +10,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from PyPDF2 import PdfReader, PdfWriter
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import Session
 from app.models.highlights import Highlight
 from app.crud import highlight as crud_highlight
@@ -23,33 +25,50 @@ FONT_CANDIDATES = [
     ("/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc", 0),
 ]
 
-class PDFExportService:
-    def __init__(self, db: Session):
-        self.db = db
-        self.font_name = "HeiseiMin-W3"
-        self._register_japanese_font()
+_font_lock = threading.Lock()
+_registered_font_name: Optional[str] = None
 
-    def _register_japanese_font(self):
-        for path, subfont_index in FONT_CANDIDATES:
-            try:
-                if subfont_index is not None:
-                    pdfmetrics.registerFont(TTFont("JPFont", path, subfontIndex=subfont_index))
-                else:
-                    pdfmetrics.registerFont(TTFont("JPFont", path))
-                self.font_name = "JPFont"
-                logger.info(f"[PDFExportService] Font registered: {path} (subfont={subfont_index})")
-                return
-            except Exception as e:
-                logger.warning(f"[PDFExportService] Font load failed: {path} err={e}")
-        
+
+def preload_fonts() -> str:
+    """
+    日本語フォントを登録して使用するフォント名を返す（プロセスで1回だけ）
+    TTF の読み込みは重いため、エクスポートごとには行わない（起動時のウォームアップからも呼ばれる）
+    """
+    global _registered_font_name
+    if _registered_font_name is not None:
+        return _registered_font_name
+    with _font_lock:
+        if _registered_font_name is None:
+            _registered_font_name = _register_japanese_font()
+    return _registered_font_name
+
+
+def _register_japanese_font() -> str:
+    for path, subfont_index in FONT_CANDIDATES:
         try:
-            pdfmetrics.registerFont(UnicodeCIDFont("HeiseiMin-W3"))
-            self.font_name = "HeiseiMin-W3"
-            logger.info("[PDFExportService] Using CID font: HeiseiMin-W3")
+            if subfont_index is not None:
+                pdfmetrics.registerFont(TTFont("JPFont", path, subfontIndex=subfont_index))
+            else:
+                pdfmetrics.registerFont(TTFont("JPFont", path))
+            logger.info(f"[PDFExportService] Font registered: {path} (subfont={subfont_index})")
+            return "JPFont"
         except Exception as e:
-            logger.error(f"[PDFExportService] CID font failed: {e}")
-            self.font_name = "Helvetica"
-            logger.warning("[PDFExportService] Fallback to Helvetica (no Japanese support)")
+            logger.warning(f"[PDFExportService] Font load failed: {path} err={e}")
+
+    try:
+        pdfmetrics.registerFont(UnicodeCIDFont("HeiseiMin-W3"))
+        logger.info("[PDFExportService] Using CID font: HeiseiMin-W3")
+        return "HeiseiMin-W3"
+    except Exception as e:
+        logger.error(f"[PDFExportService] CID font failed: {e}")
+        logger.warning("[PDFExportService] Fallback to Helvetica (no Japanese support)")
+        return "Helvetica"
+
+
+class PDFExportService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.font_name = preload_fonts()
 
     def _sanitize_text(self, text: str) -> str:
         """
@@ -116,24 +135,29 @@ class PDFExportService:
     def _get_highlights_with_comments(self, document_file_id: int) -> List[Highlight]:
         """
         ファイルのハイライトとコメントツリーを取得
-        既存のCRUD操作を使用して重複を排除
+        コメントはハイライト数によらずまとめて取得する（CRUDレイヤー経由）
         """
         # ハイライトを取得（CRUDレイヤー経由）
         highlights = crud_highlight.get_highlights_by_file(self.db, document_file_id)
-        
+        comments_by_highlight = crud_comment.get_active_comments_by_highlights(
+            self.db, [h.id for h in highlights]
+        )
+
+        # h.comments / replies への代入は変更として扱われ（既存の関連を読み込み、外れた返信の highlight_id を
+        # NULL に更新する）ため、描画用の値として set_committed_value で設定する
         for h in highlights:
-            # アクティブなコメントを取得（CRUDレイヤー経由）
-            all_comments = crud_comment.get_active_comments_by_highlight(self.db, h.id)
-            
+            all_comments = comments_by_highlight[h.id]
+
             # ルートコメントのみを h.comments に設定
-            h.comments = [c for c in all_comments if c.parent_id is None]
+            roots = [c for c in all_comments if c.parent_id is None]
+            set_committed_value(h, "comments", roots)
             
             # 各ルートコメントにリプライを紐付け
-            for root_comment in h.comments:
-                root_comment.replies = [
+            for root_comment in roots:
+                set_committed_value(root_comment, "replies", [
                     c for c in all_comments 
                     if c.parent_id == root_comment.id
-                ]
+                ])
         
         return highlights
 
@@ -0,0 +1,90 @@
+# query_budget.py
+# pytest用のクエリ予算チェック（エンドポイントごとのクエリ数の上限を超えたテストを失敗させる）
+# 使い方（conftest.py。tests/conftest.py で読み込んでいる）:
+#   pytest_plugins = ["app.testing.query_budget"]
+#
+#   @pytest.fixture
+#   def query_budgets():
+#       return {**DEFAULT_QUERY_BUDGETS, "GET /api/v1/documents/{document_id}": 3}
+#
+#   def test_highlights(client, enforce_query_budgets):
+#       client.get("/api/v1/highlights/file/1")   # 予算超過ならテスト終了時に失敗する
+#
+#   def test_crud(session, query_budget):
+#       with query_budget(2):                      # ブロック内のクエリ数を直接チェックする
+#           crud_highlight.get_highlights_by_file(session, 1)
+
+import fnmatch
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import pytest
+from app.core import query_profiler
+from app.core.query_profiler import RequestProfile, profile_queries, query_stats
+
+# エンドポイント（"METHOD パステンプレート"、fnmatch のパターン可）ごとのクエリ数の上限
+# 上から順に評価し、最初に一致したものを使う
+DEFAULT_QUERY_BUDGETS: Dict[str, int] = {
+    "GET /api/v1/highlights/file/{file_id}": 10,
+    "GET /api/v1/documents/{document_id}/files/{file_id}/export": 10,
+    "GET /api/v1/comments/highlight/{highlight_id}": 5,
+    "* *": 30,
+}
+
+
+def find_budget(budgets: Dict[str, int], endpoint: str) -> Optional[int]:
+    """エンドポイントに適用される上限を返す（該当なしは None）"""
+    for pattern, budget in budgets.items():
+        if pattern == endpoint or fnmatch.fnmatchcase(endpoint, pattern):
+            return budget
+    return None
+
+
+def _describe(profile: RequestProfile, budget: int) -> str:
+    lines = [f"{profile.endpoint}: {profile.query_count} queries (budget {budget})"]
+    for shape in profile.repeated_shapes(threshold=2)[:3]:
+        lines.append(f"    {shape['count']}x {shape['statement'][:160]}")
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def query_budgets() -> Dict[str, int]:
+    """エンドポイントごとの上限（conftest.py で上書きして調整する）"""
+    return dict(DEFAULT_QUERY_BUDGETS)
+
+
+@pytest.fixture
+def enforce_query_budgets(query_budgets, monkeypatch):
+    """
+    テスト中のリクエストが上限を超えていれば、テスト終了時に失敗させる
+    （QUERY_PROFILER_ENABLED の設定によらず、テスト中はリクエストごとの計測を有効にする）
+    """
+    monkeypatch.setattr(query_profiler, "QUERY_PROFILER_ENABLED", True)
+    violations: List[str] = []
+
+    def check(profile: RequestProfile):
+        budget = find_budget(query_budgets, profile.endpoint)
+        if budget is not None and profile.query_count > budget:
+            violations.append(_describe(profile, budget))
+
+    query_stats.add_listener(check)
+    try:
+        yield
+    finally:
+        query_stats.remove_listener(check)
+
+    if violations:
+        pytest.fail("Query budget exceeded:\n" + "\n".join(violations), pytrace=False)
+
+
+@pytest.fixture
+def query_budget():
+    """with query_budget(n): のブロック内で n 件を超えるクエリが実行されたら失敗させる"""
+
+    @contextmanager
+    def _budget(max_queries: int):
+        with profile_queries(RequestProfile("BLOCK", "query_budget")) as profile:
+            yield profile
+        if profile.query_count > max_queries:
+            pytest.fail("Query budget exceeded:\n" + _describe(profile, max_queries), pytrace=False)
+
+    return _budget
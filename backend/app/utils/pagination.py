@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import tuple_
+
+T = TypeVar("T")
+
+# 一覧取得のキーセットページネーション（(created_at, id) の組で位置を表す）
+# OFFSET と違い、読み飛ばす行数に比例して遅くならず、ページ間で行が追加・削除されても重複・欠落しない
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# 次ページのカーソルを返すレスポンスヘッダー（最後のページでは付けない）
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# カーソルに入れる id は bigint（int64）の範囲に限る
+_MAX_ROW_ID = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    """カーソル文字列が壊れている・改ざんされている"""
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _row_id(value: Any, cursor: str) -> int:
+    """カーソル内の id を検証する（1e400 のような値は int() で OverflowError になるため、それも無効として扱う）"""
+    try:
+        row_id = int(value)
+    except (ValueError, TypeError, OverflowError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    if isinstance(value, bool) or not -_MAX_ROW_ID - 1 <= row_id <= _MAX_ROW_ID:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return row_id
+
+
+def _decode(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return values
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """(created_at, id) をクライアントに中身を意識させない文字列にする"""
+    return _encode([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    created_at, row_id = _decode(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), _row_id(row_id, cursor)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_ranked_cursor(score: float, created_at: datetime, row_id: int) -> str:
+    """検索結果のように (スコア, created_at, id) の順で並ぶ一覧のカーソル"""
+    return _encode([score, created_at.isoformat(), row_id])
+
+
+def decode_ranked_cursor(cursor: str) -> Tuple[float, datetime, int]:
+    score, created_at, row_id = _decode(cursor, 3)
+    try:
+        score = float(score)
+        if not math.isfinite(score):
+            raise ValueError(score)
+        return score, datetime.fromisoformat(created_at), _row_id(row_id, cursor)
+    except (ValueError, TypeError, OverflowError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def clamp_limit(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    if limit is None:
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def apply_keyset(statement: Any, model: Any, cursor: Optional[str], limit: Optional[int],
+                 descending: bool = False) -> Any:
+    """
+    statement に (created_at, id) 順の並びとカーソル位置以降の条件を付ける
+    - limit を指定した場合は次ページの有無を判定するため limit + 1 件取得する（split_page で分ける）
+    - limit=None の場合は件数を制限しない（並び順だけ揃える）
+    """
+    key = tuple_(model.created_at, model.id)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        position = tuple_(created_at, row_id)
+        statement = statement.where(key < position if descending else key > position)
+    if descending:
+        statement = statement.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        statement = statement.order_by(model.created_at, model.id)
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    return statement
+
+
+def split_page(rows: Sequence[T], limit: Optional[int]) -> Tuple[List[T], Optional[str]]:
+    """limit + 1 件の取得結果を (ページ, 次ページのカーソル) に分ける"""
+    rows = list(rows)
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
+
+
+def set_next_cursor(response: Any, next_cursor: Optional[str]) -> Any:
+    """次ページがある場合だけ NEXT_CURSOR_HEADER を付ける"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
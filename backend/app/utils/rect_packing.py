@@ -0,0 +1,86 @@
+import os
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+# ハイライト矩形の保存形式（新しく作るハイライトに使う形式。読み出しは両方の形式に対応する）
+# - "rows":   highlight_rects に1矩形1行で保存する（従来の形式）
+# - "packed": highlights の配列列（rect_pages / rect_coords / rect_types）に1ハイライト1行でまとめる
+HIGHLIGHT_RECT_STORAGE = os.getenv("HIGHLIGHT_RECT_STORAGE", "rows")
+
+# rect_coords は矩形ごとに x1, y1, x2, y2 の順で並ぶ float4（real）の配列
+COORDS_PER_RECT = 4
+# rect_pages は smallint の配列
+MAX_PAGE_NUM = 32767
+
+PackedRects = Tuple[List[int], List[float], Optional[List[Optional[str]]]]
+
+
+def use_packed_storage() -> bool:
+    return HIGHLIGHT_RECT_STORAGE == "packed"
+
+
+def pack_rects(rects: Iterable[Any]) -> PackedRects:
+    """
+    矩形（page_num, x1, y1, x2, y2, element_type を持つもの）の列を (ページ, 座標, 種別) の配列にまとめる
+    種別はすべて同じなら1要素、すべて None なら None にする
+    座標は float4 で保存されるため、有効桁数は約7桁になる（PDF座標では 1/1000 ポイント程度まで）
+    """
+    pages: List[int] = []
+    coords: List[float] = []
+    types: List[Optional[str]] = []
+    for rect in rects:
+        if not 0 <= rect.page_num <= MAX_PAGE_NUM:
+            raise ValueError(f"ページ番号が範囲外です: {rect.page_num}")
+        pages.append(rect.page_num)
+        coords.extend((rect.x1, rect.y1, rect.x2, rect.y2))
+        types.append(rect.element_type)
+
+    if all(t is None for t in types):
+        return pages, coords, None
+    if len(set(types)) == 1:
+        return pages, coords, types[:1]
+    return pages, coords, types
+
+
+def unpack_rects(
+    highlight_id: int,
+    pages: Sequence[int],
+    coords: Sequence[float],
+    types: Optional[Sequence[Optional[str]]],
+) -> List[Any]:
+    """
+    pack_rects の逆。HighlightRectRead と同じ属性を持つ（保存されない）HighlightRect を返す
+    packed 形式の矩形は行IDを持たないため、id にはハイライト内の連番（1始まり）を入れる
+    """
+    from app.models.highlight_rects import HighlightRect
+
+    if len(coords) != len(pages) * COORDS_PER_RECT:
+        raise ValueError(f"矩形データが壊れています: highlight_id={highlight_id}")
+    if types is not None and len(types) not in (1, len(pages)):
+        raise ValueError(f"矩形の種別データが壊れています: highlight_id={highlight_id}")
+
+    rects = []
+    for index, page_num in enumerate(pages):
+        x1, y1, x2, y2 = coords[index * COORDS_PER_RECT:(index + 1) * COORDS_PER_RECT]
+        if types is None:
+            element_type = None
+        else:
+            element_type = types[0] if len(types) == 1 else types[index]
+        rects.append(HighlightRect(
+            id=index + 1,
+            highlight_id=highlight_id,
+            page_num=page_num,
+            x1=x1,
+            y1=y1,
+            x2=x2,
+            y2=y2,
+            element_type=element_type,
+        ))
+    return rects
+
+
+def is_packed(highlight: Any) -> bool:
+    return highlight.rect_pages is not None
+
+
+def unpack_highlight_rects(highlight: Any) -> List[Any]:
+    return unpack_rects(highlight.id, highlight.rect_pages, highlight.rect_coords, highlight.rect_types)
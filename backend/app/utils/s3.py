@@ -1,28 +1,48 @@
 import os
 import logging
-import boto3
-from botocore.exceptions import ClientError
+from app.core.metrics import instrument_boto3_client
+from app.core.registry import services
 
 logger = logging.getLogger(__name__)
 
-# S3クライアントの初期化
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION', 'ap-northeast-1')
-)
+
+def _create_s3_client():
+    # boto3 の import とクライアント作成は重いため、初回利用時に行う
+    import boto3
+
+    client = boto3.client(
+        's3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.getenv('AWS_REGION', 'ap-northeast-1'),
+        # MinIO などS3互換のローカル環境を使う場合に指定（未設定ならAWS）
+        endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+    )
+    instrument_boto3_client(client, "s3")
+    return client
+
+
+services.register("s3", _create_s3_client)
+
+
+def get_s3_client():
+    """S3クライアントを取得（初回呼び出し時に作成）"""
+    return services.get("s3")
+
 
 BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 
 
 def fetch_pdf_bytes(file_key: str) -> bytes:
     """S3からPDFファイルのバイトデータを取得"""
+    # botocore は import が重いため、使う時に読み込む（boto3 と同じ）
+    from botocore.exceptions import ClientError
+
     if not BUCKET_NAME:
         raise ValueError("S3_BUCKET_NAME is not configured")
     
     try:
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=file_key)
+        response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=file_key)
         return response['Body'].read()
     except ClientError as e:
         logger.error(f"Failed to fetch PDF from S3: {e}")
@@ -31,12 +51,14 @@ def fetch_pdf_bytes(file_key: str) -> bytes:
 
 def delete_s3_file(file_key: str) -> bool:
     """S3から単一ファイルを削除"""
+    from botocore.exceptions import ClientError
+
     if not BUCKET_NAME:
         logger.error("S3_BUCKET_NAME is not configured")
         return False
     
     try:
-        s3_client.delete_object(Bucket=BUCKET_NAME, Key=file_key)
+        get_s3_client().delete_object(Bucket=BUCKET_NAME, Key=file_key)
         logger.info(f"Successfully deleted S3 file: {file_key}")
         return True
     except ClientError as e:
@@ -46,6 +68,8 @@ def delete_s3_file(file_key: str) -> bool:
 
 def delete_s3_files(file_keys: list) -> int:
     """S3から複数ファイルを一括削除"""
+    from botocore.exceptions import ClientError
+
     if not BUCKET_NAME:
         logger.error("S3_BUCKET_NAME is not configured")
         return 0
@@ -56,7 +80,7 @@ def delete_s3_files(file_keys: list) -> int:
     try:
         # S3の一括削除APIを使用
         objects = [{'Key': key} for key in file_keys]
-        response = s3_client.delete_objects(
+        response = get_s3_client().delete_objects(
             Bucket=BUCKET_NAME,
             Delete={'Objects': objects}
         )
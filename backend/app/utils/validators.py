@@ -1,3 +1,4 @@
+from typing import List, Tuple
 from pydantic import EmailStr
 import re
 from fastapi import HTTPException, status
@@ -34,3 +35,34 @@ def validate_password(password: str):
 def validate_confirm_password(password: str, confirm_password: str):
     if password != confirm_password:
         raise ValidationError("Passwords do not match")
+
+def parse_page_ranges(value: str) -> List[Tuple[int, int]]:
+    """"3-5" / "2" / "1,4-6" のようなページ指定を [(開始, 終了), ...] にする（ページ番号は1始まり）"""
+    ranges = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        try:
+            first = int(start)
+            last = int(end) if sep else first
+        except ValueError:
+            raise ValidationError(f"Invalid page range: {part}")
+        if first < 1 or last < first:
+            raise ValidationError(f"Invalid page range: {part}")
+        ranges.append((first, last))
+    if not ranges:
+        raise ValidationError("Page range is empty")
+    return ranges
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """"x1,y1,x2,y2"（PDF座標）を数値の組にする"""
+    parts = value.split(",")
+    if len(parts) != 4:
+        raise ValidationError("Bounding box must be x1,y1,x2,y2")
+    try:
+        x1, y1, x2, y2 = (float(p) for p in parts)
+    except ValueError:
+        raise ValidationError(f"Invalid bounding box: {value}")
+    return x1, y1, x2, y2
@@ -0,0 +1,118 @@
+# bench_access_log.py
+# アクセスログミドルウェアのオーバーヘッド計測
+# 実行例（backendディレクトリで）:
+#   python benchmarks/bench_access_log.py --requests 5000 --concurrency 50
+# ミドルウェアなし / 旧方式（BaseHTTPMiddleware + ロック付き add_log） / 現行の LoggingMiddleware を比較する
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..")
+sys.path.insert(0, project_root)
+
+import tempfile
+
+# 計測中のログは一時ディレクトリのスプールに書き込む
+os.environ.setdefault("LOG_SPOOL_DIR", tempfile.mkdtemp(prefix="bench-log-spool-"))
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.logging import LoggingMiddleware, api_log_buffer
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """比較用: 置き換え前の BaseHTTPMiddleware 版"""
+
+    async def dispatch(self, request: Request, call_next: Callable):
+        start_time = time.time()
+        response = await call_next(request)
+        duration = (time.time() - start_time) * 1000
+        await api_log_buffer.add_log({
+            'timestamp': datetime.utcnow().isoformat(),
+            'type': 'api',
+            'method': request.method,
+            'path': request.url.path,
+            'status': response.status_code,
+            'duration': duration,
+            'userAgent': request.headers.get('user-agent', ''),
+            'source': 'backend'
+        })
+        return response
+
+
+def build_app(middleware: Optional[type]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id, "name": f"item-{item_id}"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(16):
+                yield b"x" * 4096
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def run_case(label: str, app: FastAPI, path_fn: Callable[[int], str], total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        async def one(i: int):
+            async with semaphore:
+                res = await client.get(path_fn(i))
+                res.raise_for_status()
+
+        # ウォームアップ
+        await asyncio.gather(*(one(i) for i in range(min(200, total))))
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{label:<28} {total / elapsed:>10.0f} req/s  ({elapsed * 1e6 / total:.0f} us/req)")
+
+
+async def main_async(total: int, concurrency: int):
+    cases = [
+        ("none", None),
+        ("BaseHTTPMiddleware (legacy)", LegacyLoggingMiddleware),
+        ("LoggingMiddleware (ASGI)", LoggingMiddleware),
+    ]
+    for target, path_fn in (("json", lambda i: f"/items/{i}"), ("stream 64KiB", lambda i: "/stream")):
+        print(f"--- {target} ---")
+        for label, middleware in cases:
+            await run_case(label, build_app(middleware), path_fn, total, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="アクセスログミドルウェアのオーバーヘッド計測")
+    parser.add_argument("--requests", type=int, default=3000, help="ケースごとのリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=50, help="同時リクエスト数")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+    # 計測中にR2への送信が走らないようにする
+    api_log_buffer.batch_size = 10 ** 9
+    api_log_buffer.batch_interval_seconds = 3600
+    api_log_buffer.queue.maxsize = 0
+    asyncio.run(main_async(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
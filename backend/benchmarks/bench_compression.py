@@ -0,0 +1,144 @@
+# bench_compression.py
+# レスポンス圧縮（app/core/compression.py）の転送量と応答時間の計測
+# 実行例（backendディレクトリで）:
+#   python benchmarks/bench_compression.py
+#   COMPRESSION_BROTLI_QUALITY=5 COMPRESSION_GZIP_LEVEL=4 python benchmarks/bench_compression.py --bandwidth-mbps 5,20,100
+# 典型的なレスポンス（ハイライト一覧・整形済みテキスト・分析結果・小さいJSON・PDF）を
+# CompressionMiddleware を通して Accept-Encoding ごとに取得し、
+# 送信バイト数・サーバー側の処理時間（中央値）・帯域ごとの推定転送時間（処理時間 + バイト数 / 帯域）を表示する
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..")
+sys.path.insert(0, project_root)
+sys.path.insert(0, script_dir)
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.core.compression import COMPRESSION_MINIMUM_SIZE, CompressionMiddleware, brotli
+from app.core.serialization import model_list_response
+from app.schemas.highlight import HighlightWithComments
+from bench_serialization import build_highlights
+
+SENTENCES = [
+    "本研究では、合意形成の過程における論点の可視化が議論の質に与える影響を検討する。",
+    "参加者は提示された選択肢について賛否とその理由を記述した。",
+    "分析の結果、反対意見への応答が多いグループほど最終的な合意の満足度が高かった。",
+    "今後の課題として、オンライン環境での匿名性の影響を明らかにする必要がある。",
+]
+
+
+def build_payloads(rng: random.Random) -> Dict[str, Tuple[bytes, str]]:
+    """名前 -> (本文, Content-Type)"""
+    highlights = model_list_response(HighlightWithComments, build_highlights(200, 3, 2)).body
+
+    formatted = {
+        "id": 1,
+        "document_id": 1,
+        "formatted_data": {
+            "items": [{"id": i, "text": "".join(rng.choice(SENTENCES) for _ in range(4))} for i in range(150)],
+        },
+        "created_at": "2025-01-01T00:00:00",
+        "updated_at": None,
+    }
+
+    analysis = {
+        "options": [
+            {
+                "id": i,
+                "summary": "".join(rng.choice(SENTENCES) for _ in range(2)),
+                "pros": [rng.choice(SENTENCES) for _ in range(3)],
+                "cons": [rng.choice(SENTENCES) for _ in range(3)],
+                "score": round(rng.random(), 3),
+            }
+            for i in range(8)
+        ],
+    }
+
+    return {
+        "highlights_by_file": (highlights, "application/json"),
+        "formatted_text": (json.dumps(formatted, ensure_ascii=False).encode("utf-8"), "application/json"),
+        "option_analyze": (json.dumps(analysis, ensure_ascii=False).encode("utf-8"), "application/json"),
+        "small_json": (b'{"message":"Welcome to FastAPI backend"}', "application/json"),
+        "pdf": (rng.randbytes(200_000), "application/pdf"),
+    }
+
+
+def build_app(payloads: Dict[str, Tuple[bytes, str]]):
+    def make_endpoint(body: bytes, media_type: str):
+        async def endpoint(request):
+            return Response(body, media_type=media_type)
+        return endpoint
+
+    routes = [Route(f"/{name}", make_endpoint(body, media_type)) for name, (body, media_type) in payloads.items()]
+    app = Starlette(routes=routes)
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, accept_encoding: str, runs: int) -> Tuple[int, str, float]:
+    """(送信バイト数, Content-Encoding, 処理時間の中央値[秒])"""
+    timings: List[float] = []
+    size, encoding = 0, "identity"
+    for i in range(runs + 1):
+        started = time.perf_counter()
+        response = await client.get(path, headers={"Accept-Encoding": accept_encoding})
+        elapsed = time.perf_counter() - started
+        if i == 0:
+            continue  # 初回は計測しない
+        timings.append(elapsed)
+        size = response.num_bytes_downloaded
+        encoding = response.headers.get("content-encoding", "identity")
+    return size, encoding, statistics.median(timings)
+
+
+async def run(args):
+    payloads = build_payloads(random.Random(args.random_seed))
+    app = build_app(payloads)
+    bandwidths = [float(b) for b in args.bandwidth_mbps.split(",")]
+    accept_values = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    if brotli is None:
+        print("brotli is not installed; measuring gzip only")
+
+    print(f"minimum_size={COMPRESSION_MINIMUM_SIZE} runs={args.runs}")
+    header = f"{'payload':<20} {'accept':<9} {'sent':<9} {'bytes':>9} {'ratio':>6} {'server':>9}"
+    header += "".join(f" {f'@{b:g}Mbps':>11}" for b in bandwidths)
+    print(header)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        for name, (body, _) in payloads.items():
+            for accept in accept_values:
+                size, encoding, server = await measure(client, f"/{name}", accept, args.runs)
+                line = (f"{name:<20} {accept:<9} {encoding:<9} {size:>9} {size / len(body):>6.2f} "
+                        f"{server * 1000:>7.2f}ms")
+                for bandwidth in bandwidths:
+                    total = server + size * 8 / (bandwidth * 1_000_000)
+                    line += f" {total * 1000:>9.1f}ms"
+                print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="レスポンス圧縮の転送量と応答時間の計測")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--bandwidth-mbps", default="5,20,100", help="推定転送時間を出す帯域（カンマ区切り、Mbps）")
+    parser.add_argument("--random-seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# bench_login.py
+# ログイン（/api/v1/auth/token）のスループット計測
+# 実行例（backendディレクトリで）:
+#   BCRYPT_ROUNDS=12 python benchmarks/bench_login.py --requests 200 --concurrency 32
+# ログインの負荷をかけながら GET / の応答時間も計測し、bcryptがイベントループを塞いでいないかを確認する
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..")
+sys.path.insert(0, project_root)
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import httpx
+from sqlmodel import Session
+from app.db.base import engine
+from app.crud import user as crud_user
+from app.schemas.auth import UserSignupSchema
+from app.core.security import BCRYPT_ROUNDS, PASSWORD_HASH_MAX_WORKERS
+
+BENCH_PASSWORD = "BenchPassword1"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(label: str, values: List[float]) -> str:
+    if not values:
+        return f"{label}: no samples"
+    return (
+        f"{label}: n={len(values)} "
+        f"mean={statistics.mean(values) * 1000:.1f}ms "
+        f"p50={_percentile(values, 50) * 1000:.1f}ms "
+        f"p95={_percentile(values, 95) * 1000:.1f}ms "
+        f"p99={_percentile(values, 99) * 1000:.1f}ms "
+        f"max={max(values) * 1000:.1f}ms"
+    )
+
+
+def ensure_bench_users(count: int) -> List[str]:
+    """計測用ユーザーを作成（既に存在する場合は再利用）"""
+    emails = [f"bench-login-{i}@example.com" for i in range(count)]
+    with Session(engine) as session:
+        for i, email in enumerate(emails):
+            if crud_user.get_user_by_email(session, email):
+                continue
+            crud_user.create_user(session, UserSignupSchema(
+                username=f"bench-login-{i}",
+                email=email,
+                password=BENCH_PASSWORD,
+                confirm_password=BENCH_PASSWORD,
+            ))
+    return emails
+
+
+async def run_benchmark(emails: List[str], total_requests: int, concurrency: int, probe_interval: float):
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    login_latencies: List[float] = []
+    probe_latencies: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost", timeout=120) as client:
+        async def login(i: int):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                res = await client.post("/api/v1/auth/token", json={
+                    "email": emails[i % len(emails)],
+                    "password": BENCH_PASSWORD,
+                })
+                login_latencies.append(time.perf_counter() - started)
+                if res.status_code != 200:
+                    failures += 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    print(f"bcrypt rounds={BCRYPT_ROUNDS}, hash workers={PASSWORD_HASH_MAX_WORKERS}, concurrency={concurrency}")
+    print(f"logins: {total_requests} in {elapsed:.2f}s ({total_requests / elapsed:.1f} req/s), failures={failures}")
+    print(_summary("login latency", login_latencies))
+    print(_summary("GET / latency during burst", probe_latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ログインのスループット計測")
+    parser.add_argument("--users", type=int, default=10, help="計測用ユーザー数")
+    parser.add_argument("--requests", type=int, default=100, help="ログインリクエスト総数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時リクエスト数")
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="GET / の計測間隔（秒）")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    emails = ensure_bench_users(args.users)
+    asyncio.run(run_benchmark(emails, args.requests, args.concurrency, args.probe_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# bench_rect_storage.py
+# ハイライト矩形の保存形式（highlight_rects の1矩形1行 / highlights の配列列にまとめる packed 形式）の比較
+# 実行例（backendディレクトリで、DATABASE_URL を設定して）:
+#   python benchmarks/bench_rect_storage.py
+#   python benchmarks/bench_rect_storage.py --file-id 62 --pages 3-5 --runs 50
+# 現在の highlights / highlight_rects を一時テーブルに両方の形式で写して比べる（元のテーブルは変更しない）
+# - 行数と容量（テーブル + インデックス。packed 形式は配列列の分だけ highlights が大きくなる）
+# - ファイル1つ分のハイライトと矩形の読み出し（HighlightRect の組み立てまで）と、ページ範囲での絞り込みの p50/p95
+# --file-id を省略するとハイライトが最も多いファイルで計測する
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..")
+sys.path.insert(0, project_root)
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.db.base import engine
+from app.models import HighlightRect
+from app.utils.rect_packing import unpack_rects
+from app.utils.validators import parse_page_ranges
+
+SETUP = [
+    # 1矩形1行（highlight_rects と同じ列・インデックス）
+    "CREATE TEMP TABLE bench_rect_rows AS SELECT * FROM highlight_rects",
+    "ALTER TABLE bench_rect_rows ADD PRIMARY KEY (id)",
+    "CREATE INDEX ON bench_rect_rows (highlight_id, page_num)",
+    # 比較の基準にする配列列なしのハイライト
+    "CREATE TEMP TABLE bench_highlights AS "
+    "SELECT id, document_file_id, created_by, memo, text, created_at FROM highlights",
+    "ALTER TABLE bench_highlights ADD PRIMARY KEY (id)",
+    "CREATE INDEX ON bench_highlights (document_file_id, created_at, id)",
+    # 同じハイライトに矩形を配列列でまとめたもの（種別は pack_rects と同じくすべて同じなら1要素）
+    """
+    CREATE TEMP TABLE bench_highlights_packed AS
+    SELECT h.*, p.rect_pages, p.rect_coords, p.rect_types
+    FROM bench_highlights h
+    LEFT JOIN LATERAL (
+        SELECT array_agg(r.page_num ORDER BY r.id)::smallint[] AS rect_pages,
+               (SELECT array_agg(c ORDER BY r2.id, o)
+                FROM bench_rect_rows r2,
+                     unnest(ARRAY[r2.x1, r2.y1, r2.x2, r2.y2]::real[]) WITH ORDINALITY AS u(c, o)
+                WHERE r2.highlight_id = h.id) AS rect_coords,
+               CASE WHEN count(DISTINCT r.element_type) = 1 AND count(r.element_type) = count(*)
+                    THEN ARRAY[min(r.element_type)]
+                    WHEN count(r.element_type) = 0 THEN NULL
+                    ELSE array_agg(r.element_type ORDER BY r.id) END AS rect_types
+        FROM bench_rect_rows r
+        WHERE r.highlight_id = h.id
+        HAVING count(*) > 0
+    ) p ON true
+    """,
+    "ALTER TABLE bench_highlights_packed ADD PRIMARY KEY (id)",
+    "CREATE INDEX ON bench_highlights_packed (document_file_id, created_at, id)",
+    "ANALYZE bench_rect_rows",
+    "ANALYZE bench_highlights",
+    "ANALYZE bench_highlights_packed",
+]
+
+ROWS_READ = """
+    SELECT id, highlight_id, page_num, x1, y1, x2, y2, element_type
+    FROM bench_rect_rows WHERE highlight_id = ANY (:ids) ORDER BY highlight_id, id
+"""
+PAGE_FILTER_ROWS = """
+    SELECT h.id FROM bench_highlights h
+    WHERE h.document_file_id = :file_id AND EXISTS (
+        SELECT 1 FROM bench_rect_rows r
+        WHERE r.highlight_id = h.id AND r.page_num BETWEEN :first AND :last)
+    ORDER BY h.created_at, h.id
+"""
+PAGE_FILTER_PACKED = """
+    SELECT h.id FROM bench_highlights_packed h
+    WHERE h.document_file_id = :file_id AND h.rect_pages IS NOT NULL AND EXISTS (
+        SELECT 1 FROM unnest(h.rect_pages) WITH ORDINALITY AS r(page, i)
+        WHERE r.page BETWEEN :first AND :last)
+    ORDER BY h.created_at, h.id
+"""
+
+
+def busiest_file(session: Session) -> int:
+    row = session.exec(text(
+        "SELECT document_file_id FROM highlights GROUP BY document_file_id ORDER BY count(*) DESC LIMIT 1"
+    )).first()
+    if row is None:
+        raise SystemExit("ハイライトがありません（seed.py で合成データを作成してください）")
+    return row[0]
+
+
+def scalar(session: Session, sql: str, **params):
+    return session.exec(text(sql).bindparams(**params)).first()[0]
+
+
+def read_rows(session: Session, file_id: int) -> int:
+    """1矩形1行: ハイライトを取得した後、矩形をまとめて取得する（2クエリ）"""
+    highlights = session.exec(text(
+        "SELECT * FROM bench_highlights WHERE document_file_id = :file_id ORDER BY created_at, id"
+    ).bindparams(file_id=file_id)).all()
+    ids = [h.id for h in highlights]
+    rects = [HighlightRect(**row._mapping) for row in session.exec(text(ROWS_READ).bindparams(ids=ids)).all()]
+    return len(rects)
+
+
+def read_packed(session: Session, file_id: int) -> int:
+    """packed 形式: 矩形はハイライトの行と一緒に届く（1クエリ）"""
+    highlights = session.exec(text(
+        "SELECT * FROM bench_highlights_packed WHERE document_file_id = :file_id ORDER BY created_at, id"
+    ).bindparams(file_id=file_id)).all()
+    count = 0
+    for h in highlights:
+        if h.rect_pages is not None:
+            count += len(unpack_rects(h.id, h.rect_pages, h.rect_coords, h.rect_types))
+    return count
+
+
+def measure(fn: Callable[[], int], runs: int) -> List[float]:
+    fn()  # 初回は計測しない
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def report(label: str, result: int, timings: List[float]) -> None:
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<28} {result:>7} {statistics.median(timings) * 1000:>8.2f}ms {p95 * 1000:>8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ハイライト矩形の保存形式の比較")
+    parser.add_argument("--file-id", type=int, default=None)
+    parser.add_argument("--pages", default="3-5", help="絞り込みを計測するページ範囲（1つ）")
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+    first, last = parse_page_ranges(args.pages)[0]
+
+    with Session(engine) as session:
+        file_id = args.file_id or busiest_file(session)
+        for sql in SETUP:
+            session.exec(text(sql))
+
+        rect_rows = scalar(session, "SELECT count(*) FROM bench_rect_rows")
+        highlight_rows = scalar(session, "SELECT count(*) FROM bench_highlights")
+        rows_bytes = scalar(session, "SELECT pg_total_relation_size('bench_rect_rows')")
+        base_bytes = scalar(session, "SELECT pg_total_relation_size('bench_highlights')")
+        packed_bytes = scalar(session, "SELECT pg_total_relation_size('bench_highlights_packed')")
+        array_bytes = scalar(session, (
+            "SELECT coalesce(sum(coalesce(pg_column_size(rect_pages), 0) + coalesce(pg_column_size(rect_coords), 0)"
+            " + coalesce(pg_column_size(rect_types), 0)), 0) FROM bench_highlights_packed"
+        ))
+
+        print(f"highlights={highlight_rows} rects={rect_rows} file_id={file_id} pages={first}-{last} runs={args.runs}")
+        print(f"{'storage':<28} {'rows':>7} {'bytes':>12}")
+        print(f"{'rows (highlight_rects)':<28} {rect_rows:>7} {rows_bytes:>12,}")
+        print(f"{'packed (highlights 増分)':<28} {0:>7} {packed_bytes - base_bytes:>12,}"
+              f"  （うち配列の値 {array_bytes:,} bytes）")
+        print()
+        print(f"{'read':<28} {'result':>7} {'p50':>10} {'p95':>10}")
+        report("rows: file rects", read_rows(session, file_id),
+               measure(lambda: read_rows(session, file_id), args.runs))
+        report("packed: file rects", read_packed(session, file_id),
+               measure(lambda: read_packed(session, file_id), args.runs))
+        for label, sql in (("rows: page filter", PAGE_FILTER_ROWS), ("packed: page filter", PAGE_FILTER_PACKED)):
+            statement = text(sql).bindparams(file_id=file_id, first=first, last=last)
+            hits = len(session.exec(statement).all())
+            report(label, hits, measure(lambda: session.exec(statement).all(), args.runs))
+
+        session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_search.py
+# 注釈検索（app/crud/search.py）のレイテンシ計測
+# 実行例（backendディレクトリで、DATABASE_URL を設定して）:
+#   python benchmarks/bench_search.py
+#   python benchmarks/bench_search.py --user-id 31 --queries "robustness,bias parameter,a" --runs 50
+# --user-id を省略するとハイライトが最も多いユーザーで計測する（最悪ケース）
+# 検索語ごとに件数・p50/p95 を表示し、--explain で最初の検索語の実行計画（EXPLAIN ANALYZE）を表示する
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..")
+sys.path.insert(0, project_root)
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.db.base import engine
+from app.crud import search as crud_search
+
+
+def busiest_user(session: Session) -> int:
+    statement = text(
+        "SELECT d.user_id FROM highlights h "
+        "JOIN document_files f ON f.id = h.document_file_id JOIN documents d ON d.id = f.document_id "
+        "GROUP BY d.user_id ORDER BY count(*) DESC LIMIT 1"
+    )
+    row = session.exec(statement).first()
+    if row is None:
+        raise SystemExit("ハイライトがありません（seed.py で合成データを作成してください）")
+    return row[0]
+
+
+def explain(session: Session, user_id: int, query: str, limit: int):
+    original = Session.exec
+
+    def exec_with_explain(self, statement, *args, **kwargs):
+        sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        for row in original(self, text("EXPLAIN (ANALYZE, BUFFERS) " + sql)).all():
+            print(row[0])
+        return original(self, statement, *args, **kwargs)
+
+    Session.exec = exec_with_explain
+    try:
+        crud_search.search_annotations(session, user_id, query, limit=limit)
+    finally:
+        Session.exec = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description="注釈検索のレイテンシ計測")
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--document-id", type=int, default=None)
+    parser.add_argument("--queries", default="robustness,bias parameter,analysis,a,合意形成")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--explain", action="store_true")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        user_id = args.user_id or busiest_user(session)
+        print(f"user_id={user_id} document_id={args.document_id} limit={args.limit} runs={args.runs}")
+        print(f"{'query':<20} {'hits':>5} {'p50':>9} {'p95':>9}")
+        for query in [q for q in args.queries.split(",") if q.strip()]:
+            timings = []
+            hits = 0
+            for i in range(args.runs + 1):
+                started = time.perf_counter()
+                rows, _ = crud_search.search_annotations(
+                    session, user_id, query, document_id=args.document_id, limit=args.limit
+                )
+                elapsed = time.perf_counter() - started
+                if i == 0:
+                    continue  # 初回は計測しない
+                timings.append(elapsed)
+                hits = len(rows)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{query:<20} {hits:>5} {statistics.median(timings) * 1000:>7.1f}ms {p95 * 1000:>7.1f}ms")
+
+        if args.explain:
+            explain(session, user_id, args.queries.split(",")[0], args.limit)
+
+
+if __name__ == "__main__":
+    main()
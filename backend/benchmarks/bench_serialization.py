@@ -0,0 +1,118 @@
+# bench_serialization.py
+# 一覧レスポンスのシリアライズ時間の計測（DBを使わず、組み立て済みのハイライト一覧をJSONにするまで）
+# 実行例（backendディレクトリで）:
+#   python benchmarks/bench_serialization.py --highlights 1000 --rects 3 --comments 2
+# fastapi: response_model による検証 + jsonable_encoder + json.dumps（FastAPI の既定の経路）
+# adapter: app/core/serialization.py の model_list_response（検証済みモデルを TypeAdapter で直接 JSON に）
+# エンドポイント全体（DB取得を含む）は bench_suite.py で計測する:
+#   python benchmarks/bench_suite.py --highlights-per-file 1000 --users 1 --documents-per-user 1 --scenarios highlights_by_file
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..")
+sys.path.insert(0, project_root)
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.serialization import model_list_response
+from app.schemas.comment import CommentRead
+from app.schemas.highlight import HighlightRead, HighlightWithComments
+from app.schemas.highlight_rect import HighlightRectRead
+
+
+def build_highlights(count: int, rects: int, comments: int) -> List[HighlightWithComments]:
+    base = datetime(2025, 1, 1)
+    result = []
+    for i in range(count):
+        hl_id = i + 1
+        result.append(HighlightWithComments(
+            highlight=HighlightRead(
+                id=hl_id,
+                comment_id=hl_id * 10,
+                document_file_id=1,
+                created_by="user",
+                memo=f"メモ {i} " * 4,
+                text=f"ハイライトされた本文 {i} " * 6,
+                created_at=base + timedelta(seconds=i),
+                rects=[
+                    HighlightRectRead(id=hl_id * 100 + r, highlight_id=hl_id, page_num=1 + i % 20,
+                                      x1=10.5 + r, y1=20.25 + r, x2=110.5 + r, y2=32.75 + r, element_type=None)
+                    for r in range(rects)
+                ],
+            ),
+            comments=[
+                CommentRead(id=hl_id * 10 + c, highlight_id=hl_id, parent_id=hl_id * 10 if c else None,
+                            author="user" if c % 2 else "LLM", text=f"コメント {c} " * 10, purpose=c % 3,
+                            created_at=base + timedelta(seconds=i, milliseconds=c), updated_at=None)
+                for c in range(comments)
+            ],
+        ))
+    return result
+
+
+def time_runs(fn: Callable[[], bytes], runs: int) -> List[float]:
+    fn()  # 初回（スキーマの準備など）は計測しない
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一覧レスポンスのシリアライズ時間の計測")
+    parser.add_argument("--highlights", type=int, default=1000)
+    parser.add_argument("--rects", type=int, default=3)
+    parser.add_argument("--comments", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    items = build_highlights(args.highlights, args.rects, args.comments)
+    field = create_model_field(name="Response_highlights", type_=List[HighlightWithComments], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def via_fastapi(response_class) -> Callable[[], bytes]:
+        def run() -> bytes:
+            content = loop.run_until_complete(serialize_response(field=field, response_content=items))
+            return response_class(content).body
+        return run
+
+    def via_adapter() -> bytes:
+        return model_list_response(HighlightWithComments, items).body
+
+    candidates = {
+        "fastapi+json": via_fastapi(JSONResponse),
+        "fastapi+orjson": via_fastapi(ORJSONResponse),
+        "adapter": via_adapter,
+    }
+
+    # 出力が同じであることを確認
+    expected = json.loads(candidates["fastapi+json"]())
+    for name, fn in candidates.items():
+        assert json.loads(fn()) == expected, f"{name} output differs"
+
+    print(f"highlights={args.highlights} rects={args.rects} comments={args.comments} "
+          f"bytes={len(candidates['adapter']())} runs={args.runs}")
+    baseline = None
+    for name, fn in candidates.items():
+        timings = time_runs(fn, args.runs)
+        median = statistics.median(timings)
+        baseline = baseline or median
+        print(f"{name:<16} median={median * 1000:8.2f}ms  min={min(timings) * 1000:8.2f}ms  x{baseline / median:.1f}")
+
+
+if __name__ == "__main__":
+    main()
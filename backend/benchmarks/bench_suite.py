@@ -0,0 +1,342 @@
+# bench_suite.py
+# 主要エンドポイントの負荷試験（合成データ + ローカルのPostgreSQL + S3の代替 + LLMの合成応答）
+# 実行例（backendディレクトリで）:
+#   python benchmarks/bench_suite.py --users 10 --documents-per-user 5 --highlights-per-file 50 --concurrency 16
+#   python benchmarks/bench_suite.py --scenarios highlights_by_file,export_pdf --baseline benchmarks/results/<前回>.json
+# 合成データは seed.py の seed_synthetic で作成する（同じ規模・接頭辞なら2回目以降は再利用）
+# S3_ENDPOINT_URL を指定すると MinIO などのS3互換サーバーを使い、未指定ならメモリ上のS3で置き換える
+# LLM は LLM_TRANSPORT=synthetic（既定）で合成応答、LLM_TRANSPORT=replay で記録済みの応答を使う
+# 結果（p50/p95/p99・スループット）は benchmarks/results/ にJSONで保存し、--baseline で前回と比較できる
+
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(script_dir, "..")
+sys.path.insert(0, project_root)
+sys.path.insert(0, script_dir)
+
+import tempfile
+
+# 計測中のログはローカルの一時ディレクトリに書き込み、LLMのレート制限は計測の妨げにならない値にする
+os.environ.setdefault("LOG_SPOOL_DIR", tempfile.mkdtemp(prefix="bench-log-spool-"))
+os.environ.setdefault("LOG_STORAGE_BACKEND", "local")
+os.environ.setdefault("LOG_STORAGE_LOCAL_DIR", tempfile.mkdtemp(prefix="bench-log-storage-"))
+os.environ.setdefault("S3_BUCKET_NAME", "bench-bucket")
+os.environ.setdefault("LLM_TRANSPORT", "synthetic")
+for name in ("LLM_USER_REQUESTS_PER_MINUTE", "LLM_GLOBAL_REQUESTS_PER_MINUTE"):
+    os.environ.setdefault(name, "1000000")
+for name in ("LLM_USER_TOKENS_PER_MINUTE", "LLM_GLOBAL_TOKENS_PER_MINUTE"):
+    os.environ.setdefault(name, "1000000000")
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import httpx
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from stubs import InMemoryS3
+
+RESULTS_DIR = os.path.join(script_dir, "results")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _git_commit() -> Dict[str, Optional[str]]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=script_dir).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True, cwd=script_dir).stdout.strip()
+        return {"commit": commit or None, "dirty": bool(dirty)}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+def make_pdf(pages: int) -> bytes:
+    """合成データ用のPDF（ページごとに数行のテキスト）"""
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf, pagesize=A4)
+    for page in range(pages):
+        for line in range(40):
+            pdf.drawString(60, 780 - line * 18, f"Synthetic page {page + 1} line {line + 1}: lorem ipsum dolor sit amet")
+        pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
+
+
+def prepare_storage(corpus: dict, pages: int) -> str:
+    """合成データのファイルをS3（またはメモリ上のS3）に配置する"""
+    from app.utils import s3 as s3_utils
+
+    # アプリ内のS3アクセスはすべて同じクライアント（services の "s3"）を使う
+    client = s3_utils.get_s3_client()
+    if os.getenv("S3_ENDPOINT_URL"):
+        mode = f"endpoint:{os.getenv('S3_ENDPOINT_URL')}"
+        try:
+            client.head_bucket(Bucket=s3_utils.BUCKET_NAME)
+        except Exception:
+            client.create_bucket(Bucket=s3_utils.BUCKET_NAME)
+    else:
+        mode = "in-memory"
+        InMemoryS3().install(client)
+
+    pdf_bytes = make_pdf(pages)
+    for user in corpus["users"]:
+        for document in user["documents"]:
+            client.put_object(
+                Bucket=s3_utils.BUCKET_NAME, Key=document["file_key"], Body=pdf_bytes, ContentType="application/pdf"
+            )
+    return mode
+
+
+def build_scenarios(corpus: dict) -> Dict[str, Callable[[int], dict]]:
+    """シナリオ名 -> i番目のリクエスト内容を返す関数"""
+    from app.core.security import create_access_token
+
+    users = corpus["users"]
+    tokens = {
+        user["id"]: create_access_token(data={"user_id": user["id"], "name": user["name"], "email": user["email"]})
+        for user in users
+    }
+    documents = [(user, document) for user in users for document in user["documents"]]
+    highlights = [(user, hid) for user, document in documents for hid in document["highlight_ids"]]
+
+    def auth(user: dict) -> dict:
+        return {"Authorization": f"Bearer {tokens[user['id']]}"}
+
+    def pick_user(i: int):
+        return users[i % len(users)]
+
+    def pick_document(i: int):
+        return documents[i % len(documents)]
+
+    def pick_highlight(i: int):
+        return highlights[(i * 7919) % len(highlights)]
+
+    scenarios = {
+        "list_documents": lambda i: {
+            "method": "GET", "url": "/api/v1/documents/", "headers": auth(pick_user(i)),
+        },
+        "read_document": lambda i: {
+            "method": "GET", "url": f"/api/v1/documents/{pick_document(i)[1]['id']}", "headers": auth(pick_document(i)[0]),
+        },
+        "document_files": lambda i: {
+            "method": "GET", "url": f"/api/v1/document-files/document/{pick_document(i)[1]['id']}",
+            "headers": auth(pick_document(i)[0]),
+        },
+        "highlights_by_file": lambda i: {
+            "method": "GET", "url": f"/api/v1/highlights/file/{pick_document(i)[1]['file_id']}",
+            "headers": auth(pick_document(i)[0]),
+        },
+        "export_pdf": lambda i: {
+            "method": "GET",
+            "url": f"/api/v1/documents/{pick_document(i)[1]['id']}/files/{pick_document(i)[1]['file_id']}/export",
+            "headers": auth(pick_document(i)[0]),
+        },
+        "login": lambda i: {
+            "method": "POST", "url": "/api/v1/auth/token",
+            "json": {"email": pick_user(i)["email"], "password": corpus["password"]},
+        },
+        "llm_option_analyze": lambda i: {
+            "method": "POST", "url": "/api/v1/openai/option-analyze", "headers": auth(pick_user(i)),
+            "json": {"userInput": f"benchmark request {i}"},
+        },
+    }
+    if highlights:
+        scenarios["comments_by_highlight"] = lambda i: {
+            "method": "GET", "url": f"/api/v1/comments/highlight/{pick_highlight(i)[1]}",
+            "headers": auth(pick_highlight(i)[0]),
+        }
+    return scenarios
+
+
+async def run_scenario(client: httpx.AsyncClient, build: Callable[[int], dict], total: int,
+                       concurrency: int, warmup: int) -> dict:
+    latencies: List[float] = []
+    status_codes: Counter = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, record: bool):
+        async with semaphore:
+            request = build(i)
+            started = time.perf_counter()
+            try:
+                res = await client.request(**request)
+                status = str(res.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            if record:
+                latencies.append(time.perf_counter() - started)
+                status_codes[status] += 1
+
+    await asyncio.gather(*(one(i, False) for i in range(warmup)))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, True) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in status_codes.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": total,
+        "errors": errors,
+        "status_codes": dict(status_codes),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 50) * 1000, 2),
+            "p95": round(_percentile(latencies, 95) * 1000, 2),
+            "p99": round(_percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+async def run_suite(scenarios: Dict[str, Callable[[int], dict]], names: List[str], total: int,
+                    concurrency: int, warmup: int) -> Dict[str, dict]:
+    from main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost", timeout=300) as client:
+        for name in names:
+            result = await run_scenario(client, scenarios[name], total, concurrency, warmup)
+            results[name] = result
+            latency = result["latency_ms"]
+            print(
+                f"{name:<24} {result['throughput_rps']:>8.1f} req/s  "
+                f"p50={latency['p50']:>8.1f}ms p95={latency['p95']:>8.1f}ms p99={latency['p99']:>8.1f}ms  "
+                f"errors={result['errors']}"
+            )
+    return results
+
+
+def compare(results: Dict[str, dict], baseline_path: str, threshold_pct: float) -> List[str]:
+    """前回の結果と比較し、p95 の悪化またはスループットの低下が閾値を超えたシナリオを返す"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"--- compared with {baseline_path} ({baseline['meta'].get('git', {}).get('commit')}) ---")
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+        p95_change = (result["latency_ms"]["p95"] / base["latency_ms"]["p95"] - 1) * 100 if base["latency_ms"]["p95"] else 0.0
+        rps_change = (result["throughput_rps"] / base["throughput_rps"] - 1) * 100 if base["throughput_rps"] else 0.0
+        flag = ""
+        if p95_change > threshold_pct or rps_change < -threshold_pct:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<24} p95 {p95_change:+7.1f}%  throughput {rps_change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主要エンドポイントの負荷試験")
+    parser.add_argument("--scenarios", help="実行するシナリオ（カンマ区切り、省略時はすべて）")
+    parser.add_argument("--requests", type=int, default=200, help="シナリオごとのリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時リクエスト数")
+    parser.add_argument("--warmup", type=int, default=20, help="計測前に送るリクエスト数")
+    parser.add_argument("--prefix", default="bench", help="合成データの接頭辞")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--documents-per-user", type=int, default=5)
+    parser.add_argument("--highlights-per-file", type=int, default=50)
+    parser.add_argument("--rects-per-highlight", type=int, default=3)
+    parser.add_argument("--comments-per-highlight", type=int, default=2)
+    parser.add_argument("--reply-depth", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--openai-latency", type=float,
+                        help="LLM合成応答の応答時間の中央値（秒、省略時は LLM_SYNTHETIC_LATENCY_MEDIAN_SECONDS）")
+    parser.add_argument("--output", help="結果のJSONの保存先（省略時は benchmarks/results/ 以下）")
+    parser.add_argument("--baseline", help="比較対象の結果JSON")
+    parser.add_argument("--regression-threshold", type=float, default=10.0,
+                        help="p95・スループットがこの割合（%%）以上悪化したら終了コード1")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    from app.db.base import engine
+    from app.scripts.seed import seed_synthetic
+    from app.core.registry import services
+    from app.services.llm_transport import SyntheticTransport
+
+    scale = {
+        "users": args.users,
+        "documents_per_user": args.documents_per_user,
+        "highlights_per_file": args.highlights_per_file,
+        "rects_per_highlight": args.rects_per_highlight,
+        "comments_per_highlight": args.comments_per_highlight,
+        "reply_depth": args.reply_depth,
+        "pages": args.pages,
+        "random_seed": args.random_seed,
+    }
+    # 規模ごとに別のデータを使う（同じ規模なら再利用）
+    prefix = f"{args.prefix}-u{args.users}d{args.documents_per_user}h{args.highlights_per_file}s{args.random_seed}"
+    corpus = seed_synthetic(engine, prefix=prefix, **scale)
+    storage_mode = prepare_storage(corpus, args.pages)
+    llm_transport = services.get("llm_transport")
+    if args.openai_latency is not None and isinstance(llm_transport, SyntheticTransport):
+        llm_transport = SyntheticTransport(latency_median=args.openai_latency)
+        services.override("llm_transport", llm_transport)
+
+    scenarios = build_scenarios(corpus)
+    names = args.scenarios.split(",") if args.scenarios else list(scenarios)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(scenarios)})")
+
+    print(f"scale={scale} concurrency={args.concurrency} requests={args.requests} s3={storage_mode}")
+    results = asyncio.run(run_suite(scenarios, names, args.requests, args.concurrency, args.warmup))
+
+    git = _git_commit()
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "git": git,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "warmup": args.warmup,
+            "scale": scale,
+            "s3": storage_mode,
+            "llm_transport": llm_transport.name,
+            "llm_latency_median_seconds": getattr(llm_transport, "latency_median", None),
+        },
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{(git['commit'] or 'nogit')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"results written to {output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.regression_threshold)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# stubs.py
+# ベンチマーク用の外部サービスの代替（S3）
+# アプリのコードは変更せず、起動済みのクライアントに差し込んで使う
+# OpenAI の代替は LLM_TRANSPORT=synthetic / replay（app/services/llm_transport.py）を使う
+
+import io
+import threading
+import time
+import uuid
+from typing import Dict, Tuple
+
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+
+class InMemoryS3:
+    """
+    boto3 の S3 クライアントの通信をメモリ上のオブジェクトストアで置き換える
+    botocore の before-call イベントで応答を返すため、計測（instrument_boto3_client）はそのまま動く
+    実際の通信を含めて計測したい場合は、代わりに S3_ENDPOINT_URL で MinIO などを指定する
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def install(self, client):
+        events = client.meta.events
+        events.register("before-parameter-build.s3", self._remember_params)
+        events.register("before-call.s3", self._handle)
+        return client
+
+    def put(self, bucket: str, key: str, data: bytes):
+        with self._lock:
+            self.objects[(bucket, key)] = data
+
+    @staticmethod
+    def _remember_params(params, context, **kwargs):
+        context["stub_s3_params"] = dict(params)
+
+    @staticmethod
+    def _response(status_code: int, parsed: dict):
+        parsed.setdefault("ResponseMetadata", {})["HTTPStatusCode"] = status_code
+        return AWSResponse("https://s3.stub.local", status_code, {}, None), parsed
+
+    def _not_found(self, key: str):
+        return self._response(404, {"Error": {"Code": "NoSuchKey", "Message": f"{key} not found"}})
+
+    def _handle(self, model, params, context, **kwargs):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        api_params = context.get("stub_s3_params", {})
+        bucket = api_params.get("Bucket")
+        key = api_params.get("Key")
+
+        if model.name == "PutObject":
+            body = api_params.get("Body", b"")
+            data = body.read() if hasattr(body, "read") else body
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            self.put(bucket, key, data)
+            return self._response(200, {"ETag": f'"{uuid.uuid4().hex}"'})
+
+        if model.name in ("GetObject", "HeadObject"):
+            with self._lock:
+                data = self.objects.get((bucket, key))
+            if data is None:
+                return self._not_found(key)
+            parsed = {"ContentLength": len(data), "ContentType": "application/pdf"}
+            if model.name == "GetObject":
+                parsed["Body"] = StreamingBody(io.BytesIO(data), len(data))
+            return self._response(200, parsed)
+
+        if model.name == "DeleteObject":
+            with self._lock:
+                self.objects.pop((bucket, key), None)
+            return self._response(204, {})
+
+        if model.name == "DeleteObjects":
+            with self._lock:
+                for item in api_params.get("Delete", {}).get("Objects", []):
+                    self.objects.pop((bucket, item["Key"]), None)
+            return self._response(200, {"Deleted": api_params.get("Delete", {}).get("Objects", [])})
+
+        return self._response(501, {"Error": {"Code": "NotImplemented", "Message": model.name}})
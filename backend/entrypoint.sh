@@ -1,32 +1,19 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
-# DBが起動して接続可能になるまで待機（必要に応じて調整）
+# DBの接続を待ち、リビジョンが head と異なる場合のみ Alembic でマイグレーション & データシード（データはリビジョンに記述）
 # 例: Postgres を想定。環境変数 DATABASE_URL=postgresql+psycopg2://user:pass@db:5432/dbname
-echo "Waiting for database..."
-python - <<'PY'
-import os, time
-import sqlalchemy
-url = os.getenv("DATABASE_URL")
-assert url, "DATABASE_URL is not set"
-engine = sqlalchemy.create_engine(url)
-for i in range(60):
-    try:
-        with engine.connect() as conn:
-            conn.execute(sqlalchemy.text("SELECT 1"))
-        print("Database is ready.")
-        break
-    except Exception as e:
-        print(f"DB not ready ({e}), retry {i+1}/60")
-        time.sleep(1)
-else:
-    raise RuntimeError("Database not ready in time")
-PY
-
-# Alembic によるマイグレーション & データシード（データはリビジョンに記述）
-echo "Running alembic upgrade head..."
-alembic upgrade head
+# 複数のレプリカが同時に起動しても、advisory lock で1つだけが実行する（app/scripts/migrate.py）
+python app/scripts/migrate.py
 
 # アプリ起動
+# 本番（APP_ENV=production）は gunicorn で複数ワーカーを起動する（設定は gunicorn_conf.py）
+if [ "${APP_ENV:-}" = "production" ]; then
+  # 各ワーカーのメトリクスを集計するディレクトリ（prometheus_client の import 前に設定する必要がある）
+  export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/metrics}"
+  echo "Starting Gunicorn..."
+  exec gunicorn main:app -c gunicorn_conf.py
+fi
+
 echo "Starting Uvicorn..."
 exec uvicorn main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
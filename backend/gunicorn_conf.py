@@ -0,0 +1,71 @@
+# gunicorn_conf.py
+# 本番用の起動設定（gunicorn + uvicorn ワーカー）
+# 実行例（backendディレクトリで）:
+#   gunicorn main:app -c gunicorn_conf.py
+# entrypoint.sh は APP_ENV=production のときにこの設定で起動する
+# uvicorn ワーカーは uvloop / httptools がインストールされていれば自動で使う（uvicorn[standard]）
+
+import multiprocessing
+import os
+
+from app.core.metrics import PROMETHEUS_MULTIPROC_DIR
+
+_cores = multiprocessing.cpu_count()
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+worker_class = "uvicorn.workers.UvicornWorker"
+# ワーカー数: 既定はコア数の2倍（同期エンドポイントのDB・S3待ちを考慮）を WEB_MAX_WORKERS で頭打ち
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or max(2, min(_cores * 2, int(os.getenv("WEB_MAX_WORKERS", "8"))))
+# レート制限の等分（app/core/rate_limit.py）はワーカー数を WEB_CONCURRENCY から読む
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# 一定数のリクエストを処理したワーカーを入れ替える（メモリの断片化・リークの影響を抑える）
+# jitter で全ワーカーが同時に再起動しないようにする
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# PDFエクスポートやLLM呼び出しは数十秒かかることがあるため長めにする
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# SIGTERM 後、処理中のリクエストとログの送信を待つ時間
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# マスターでアプリを読み込んでから fork する（起動が速くメモリを共有できる）
+# import 時にはDB接続・スレッドを作らない（ログ送信スレッドやキャッシュの購読は各ワーカーで遅延開始）ため安全
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+accesslog = None  # アクセスログは LoggingMiddleware が記録する
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "*")
+
+
+def on_starting(server):
+    # 前回の起動時のメトリクスのファイルを削除
+    from app.core.metrics import clear_multiproc_dir
+
+    if not PROMETHEUS_MULTIPROC_DIR:
+        server.log.warning("PROMETHEUS_MULTIPROC_DIR is not set; /metrics will only show the worker that served it")
+    clear_multiproc_dir()
+
+
+def post_fork(server, worker):
+    # preload でマスターが作った接続を子プロセスで使い回さない
+    from app.db.base import engine
+
+    engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # 通常は lifespan の shutdown でログを送信済み。異常終了時の取りこぼしをスプールに残す
+    from app.core.logging import api_log_buffer, user_log_buffer
+
+    api_log_buffer.shutdown()
+    user_log_buffer.shutdown()
+
+
+def child_exit(server, worker):
+    # 終了したワーカーのゲージを集計から外す（マスタープロセスで実行される。カウンター・ヒストグラムは残す）
+    from app.core.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -1,7 +1,9 @@
 import os
 import time
+import secrets
 # import mysql.connector
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -12,7 +14,12 @@ from app.core.exceptions import (
     validation_exception_handler,
     general_exception_handler
 )
-from app.core.logging import setup_loggers, LoggingMiddleware
+from app.core.logging import setup_loggers, shutdown_loggers, LoggingMiddleware
+from app.core.query_profiler import QueryProfilerMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import METRICS_CONTENT_TYPE, METRICS_TOKEN, render_metrics
+from app.core.warmup import run_startup_warmup
+from app.utils.pagination import NEXT_CURSOR_HEADER
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +31,8 @@ app = FastAPI(
     title="FastAPI NextAuth JWT Backend",
     docs_url="/api/docs",
     openapi_url="/api/openapi.json",
+    # JSON のエンコードに orjson を使う（標準の json より高速、一覧は app/core/serialization.py で直接シリアライズ）
+    default_response_class=ORJSONResponse,
 )
 
 # CORS設定を最初に追加
@@ -38,9 +47,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ETag を使った再検証（If-None-Match）をフロントエンドから行えるようにする
+    expose_headers=["ETag", NEXT_CURSOR_HEADER],
 )
 
 # 他のミドルウェアを追加
+# レスポンス圧縮（br / gzip、設定は app/core/compression.py）。アクセスログの bytes は圧縮後の大きさになる
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(QueryProfilerMiddleware)
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["localhost", "backend", "nginx", "research-tmp.onrender.com", "research-tmp.vercel.app"])
 
@@ -51,7 +65,22 @@ app.include_router(api_router)
 def read_root():
     return {"message": "Welcome to FastAPI backend"}
 
+# Prometheus 形式のメトリクス（Authorization: Bearer <METRICS_TOKEN> が必要。METRICS_TOKEN が未設定なら公開しない）
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # 例外ハンドラを登録
 app.add_exception_handler(HTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
-app.add_exception_handler(Exception, general_exception_handler)
\ No newline at end of file
+app.add_exception_handler(Exception, general_exception_handler)
+
+# DB接続・フォント・外部クライアントを事前に用意する（STARTUP_* で設定、app/core/warmup.py）
+app.add_event_handler("startup", run_startup_warmup)
+
+# 終了時に送信待ちのログを送信する
+app.add_event_handler("shutdown", shutdown_loggers)
\ No newline at end of file
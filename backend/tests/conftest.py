@@ -0,0 +1,138 @@
+# conftest.py
+# APIテストの共通フィクスチャ
+# 実行例（backendディレクトリで、alembic upgrade head 済みのDBの DATABASE_URL を設定して）:
+#   pip install -r requirements-dev.txt
+#   pytest
+# 各テストは1つのトランザクション内で実行し、終了時にロールバックする（CRUD の commit はセーブポイントになる）
+
+import os
+
+# ログは R2 に送らずローカルに保存する（app の import より前に設定する）
+os.environ.setdefault("LOG_STORAGE_BACKEND", "local")
+os.environ.setdefault("LOG_STORAGE_LOCAL_DIR", "logs/test-storage")
+
+from io import BytesIO
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from main import app
+from app.api.deps import get_db
+from app.core.security import create_access_token
+from app.db.base import engine, get_session
+from app.models import Comment, Document, DocumentFile, Highlight, HighlightRect, LLMCommentMetadata, User
+from app.utils.constants import LLM_AUTHOR
+
+pytest_plugins = ["app.testing.query_budget"]
+
+
+@pytest.fixture
+def session():
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def client(session):
+    def override_session():
+        yield session
+
+    app.dependency_overrides[get_session] = override_session
+    app.dependency_overrides[get_db] = override_session
+    try:
+        yield TestClient(app, base_url="http://localhost")
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def user(session) -> User:
+    user = User(name="budget-test", email="budget-test@example.com", hashed_password="x")
+    session.add(user)
+    session.flush()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user) -> dict:
+    token = create_access_token(data={"user_id": user.id, "name": user.name, "email": user.email})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def document_file(session, user) -> DocumentFile:
+    document = Document(user_id=user.id, document_name="budget-test", stage=1)
+    session.add(document)
+    session.flush()
+    document_file = DocumentFile(document_id=document.id, file_name="budget-test.pdf", file_key="test/budget-test.pdf")
+    session.add(document_file)
+    session.flush()
+    return document_file
+
+
+@pytest.fixture
+def make_highlights(session, document_file):
+    """
+    make_highlights(count) で count 件のハイライトを作る
+    （それぞれ矩形2つ、ルートコメント、返信、削除済みのLLMの返信を持つ）
+    """
+    return lambda count: _make_highlights(session, document_file, count)
+
+
+def _make_highlights(session: Session, document_file: DocumentFile, count: int) -> List[Highlight]:
+    highlights = []
+    for i in range(count):
+        highlight = Highlight(document_file_id=document_file.id, created_by="budget-test", memo=f"memo {i}", text=f"text {i}")
+        session.add(highlight)
+        session.flush()
+        session.add_all([
+            HighlightRect(highlight_id=highlight.id, page_num=1 + i % 3, x1=10, y1=10 + i, x2=100, y2=20 + i),
+            HighlightRect(highlight_id=highlight.id, page_num=1 + i % 3, x1=10, y1=30 + i, x2=100, y2=40 + i),
+        ])
+        root = Comment(highlight_id=highlight.id, author="budget-test", text=f"comment {i}")
+        session.add(root)
+        session.flush()
+        reply = Comment(highlight_id=highlight.id, parent_id=root.id, author="budget-test", text=f"reply {i}")
+        llm_reply = Comment(highlight_id=highlight.id, parent_id=root.id, author=LLM_AUTHOR, text=f"llm {i}")
+        session.add_all([reply, llm_reply])
+        session.flush()
+        session.add(LLMCommentMetadata(comment_id=llm_reply.id, deletion_reason="test"))
+        highlights.append(highlight)
+    session.flush()
+    # テスト中のリクエストがDBから読み直すように、作成したオブジェクトを切り離す
+    session.expunge_all()
+    return highlights
+
+
+@pytest.fixture
+def stub_pdf_download(monkeypatch):
+    """エクスポートが S3 から取得するPDFを、生成した pages ページのPDFに差し替える"""
+    from app.api.endpoints import documents as documents_endpoint
+
+    def _stub(pages: int = 3):
+        pdf_bytes = _make_pdf(pages)
+        monkeypatch.setattr(documents_endpoint, "fetch_pdf_bytes", lambda file_key: pdf_bytes)
+
+    return _stub
+
+
+def _make_pdf(pages: int) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for page in range(pages):
+        c.drawString(72, 720, f"page {page + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
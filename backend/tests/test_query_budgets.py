@@ -0,0 +1,74 @@
+# test_query_budgets.py
+# ハイライト一覧とPDFエクスポートが、ハイライト数によらずクエリ予算（DEFAULT_QUERY_BUDGETS）に収まることを確認する
+
+import pytest
+from app.crud import comment as crud_comment
+
+HIGHLIGHT_COUNT = 20
+
+
+def test_highlights_by_file_within_budget(client, document_file, make_highlights, enforce_query_budgets):
+    make_highlights(HIGHLIGHT_COUNT)
+
+    response = client.get(f"/api/v1/highlights/file/{document_file.id}")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body) == HIGHLIGHT_COUNT
+    for item in body:
+        assert len(item["highlight"]["rects"]) == 2
+        # 削除済みのLLMの返信は含まない
+        assert [c["text"].split()[0] for c in item["comments"]] == ["comment", "reply"]
+
+
+def test_highlights_by_file_page_filter_within_budget(client, document_file, make_highlights, enforce_query_budgets):
+    make_highlights(HIGHLIGHT_COUNT)
+
+    response = client.get(f"/api/v1/highlights/file/{document_file.id}", params={"pages": "2", "limit": 5})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert all(r["page_num"] == 2 for item in response.json() for r in item["highlight"]["rects"])
+
+
+def test_export_within_budget(client, document_file, auth_headers, make_highlights, stub_pdf_download,
+                              enforce_query_budgets):
+    make_highlights(HIGHLIGHT_COUNT)
+    stub_pdf_download(pages=3)
+
+    response = client.get(
+        f"/api/v1/documents/{document_file.document_id}/files/{document_file.id}/export",
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+
+
+def test_export_does_not_modify_comments(client, session, document_file, auth_headers, make_highlights,
+                                         stub_pdf_download):
+    highlights = make_highlights(3)
+    stub_pdf_download(pages=1)
+
+    response = client.get(
+        f"/api/v1/documents/{document_file.document_id}/files/{document_file.id}/export",
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    session.expire_all()
+    for highlight in highlights:
+        comments = crud_comment.get_comments_by_highlight_id(session, highlight.id)
+        # 返信もハイライトに紐づいたまま（ルートと返信と削除済みのLLMの返信）
+        assert len(comments) == 3
+
+
+@pytest.mark.parametrize("count", [1, HIGHLIGHT_COUNT])
+def test_active_comments_by_highlights_query_count(session, make_highlights, query_budget, count):
+    highlights = make_highlights(count)
+
+    with query_budget(3):
+        comments = crud_comment.get_active_comments_by_highlights(session, [h.id for h in highlights])
+
+    assert all(len(comments[h.id]) == 2 for h in highlights)